@@ -0,0 +1,157 @@
+"""
+アプリケーションのログ出力を設定するモジュール
+
+各モジュールは logging.getLogger(__name__) でロガーを取得してメッセージを出力する。
+setup_logging はルートロガーに QueueHandler だけを登録し、コンソールやファイルへの書き込みは
+QueueListener のスレッドで行う。処理スレッドはキューに追加するだけで、
+Windowsのコンソールやファイルへの書き込みを待たない。
+
+画像ごとのメッセージ（ファイル名、ツールコメントなど）は DEBUG で出力するため、
+既定のレベル（INFO）では出力されない。モジュールごとにレベルを指定できる。
+
+    setup_logging("INFO", {"save_task_images_CamNum_selection": "DEBUG"}, log_file=default_log_path())
+
+環境変数 TASK_IMAGE_SAVER_LOG でも "DEBUG" や "INFO,copy_executor=DEBUG" の形式で指定できる。
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from config import Constants
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s [%(threadName)s] %(name)s: %(message)s"
+CONSOLE_FORMAT = "%(message)s"
+
+LOG_FILE_NAME = "task_image_saver.log"
+LOG_ENV_VAR = "TASK_IMAGE_SAVER_LOG"
+
+DEFAULT_LEVEL = logging.INFO
+
+# ログファイルのローテーション（1ファイルの上限サイズと保持する世代数）
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 3
+
+Level = Union[int, str]
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def default_log_path() -> Path:
+    """
+    ログファイルの既定のパスを返す（メタデータのキャッシュと同じフォルダ）
+
+    Windowsでは %LOCALAPPDATA%\\TaskImageSaver、それ以外では ~/.cache/TaskImageSaver に保存する。
+    """
+    base = os.environ.get("LOCALAPPDATA")
+    if base:
+        return Path(base) / Constants.APP_CACHE_FOLDER / LOG_FILE_NAME
+    return Path.home() / ".cache" / Constants.APP_CACHE_FOLDER / LOG_FILE_NAME
+
+
+def parse_level_spec(spec: str):
+    """
+    "INFO,copy_executor=DEBUG" 形式のレベル指定を解析する
+
+    Args:
+        spec: カンマ区切りのレベル指定（"モジュール名=レベル" 以外の項目は全体のレベル）
+
+    Returns:
+        (全体のレベル（指定がなければNone）, モジュール名 -> レベル の辞書)
+
+    Raises:
+        ValueError: レベル名が正しくない場合
+    """
+    level = None
+    module_levels: Dict[str, int] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, value = item.partition("=")
+        if sep:
+            module_levels[name.strip()] = _to_level(value)
+        else:
+            level = _to_level(name)
+    return level, module_levels
+
+
+def _to_level(level: Level) -> int:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(level.strip().upper())
+    if not isinstance(value, int):
+        raise ValueError(f"ログレベルが正しくありません: {level}")
+    return value
+
+
+def setup_logging(level: Optional[Level] = None,
+                  module_levels: Optional[Dict[str, Level]] = None,
+                  log_file: Optional[Union[str, Path]] = None,
+                  console: bool = True) -> None:
+    """
+    ログ出力を設定する（再度呼び出した場合は前回の設定を置き換える）
+
+    Args:
+        level: 全体のログレベル（Noneの場合は環境変数、それも無い場合は INFO）
+        module_levels: モジュール名（ロガー名）-> ログレベル の辞書
+        log_file: ログファイルのパス（Noneの場合はファイルに出力しない）
+        console: Falseの場合はコンソールに出力しない
+    """
+    shutdown_logging()
+
+    env_level, env_module_levels = parse_level_spec(os.environ.get(LOG_ENV_VAR, ""))
+    levels = dict(env_module_levels)
+    levels.update({name: _to_level(value) for name, value in (module_levels or {}).items()})
+    root_level = _to_level(level) if level is not None else env_level or DEFAULT_LEVEL
+
+    handlers = []
+    # exe化したGUI（コンソールなし）では sys.stderr が None になる
+    if console and sys.stderr is not None:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+    if log_file is not None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT, encoding="utf-8")
+        except OSError as e:
+            # ログファイルに書き込めなくても処理は続ける
+            if sys.stderr is not None:
+                print(f"ログファイルを開けませんでした: {e}", file=sys.stderr)
+        else:
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            handlers.append(file_handler)
+
+    global _listener, _queue_handler
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(root_level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """キューに残っているメッセージを書き出し、ログ出力のスレッドを終了する"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
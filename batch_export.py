@@ -0,0 +1,460 @@
+"""
+複数のタスクの画像をGUIを使わずに保存するコマンドラインツール
+
+VTV-9000のタスク（グループ番号/タスク番号）、viscotechフォルダに対するglobパターン、
+タスクファイル（.ziq, .zit, .zii）を複数指定し、1回の実行でまとめて保存する。
+コピーは ExportScheduler で全タスクのジョブを優先度順・交互に実行し、
+コピー元のホストごとの同時読み込み数を制限する。最後にタスクごとの結果を表示する。
+タスク指定の末尾に "@優先度" を付けると、そのタスクのジョブを先に処理する（例: g01/02@10）。
+タスクごとの処理時間と件数は保存先フォルダに実行レポート（run_reportモジュール参照）として保存する。
+
+使用例:
+    python batch_export.py -o D:\\export --task g01/02@10 --task g01/03
+    python batch_export.py -o D:\\export --root \\\\VTV01\\viscotech --glob "g01/*" --quality 85
+    python batch_export.py -o D:\\export --task-file "C:\\tasks\\*.ziq" --sync
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import save_task_images_CamNum_selection
+from app_logging import parse_level_spec, setup_logging
+from config import Constants
+from export_scheduler import ExportScheduler
+from export_telemetry import ExportTelemetry
+from image_source import FolderImageSource, ZipImageSource
+from name_registry import NameRegistry
+from run_report import RunReport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VISCO_TECH_ROOT = r"C:\viscotech"
+TASK_FOLDER = "task"
+
+_PAIR_PATTERN = re.compile(r"^g?(\d+)[/\\\-](\d+)$", re.IGNORECASE)
+_PRIORITY_PATTERN = re.compile(r"^(.*)@(-?\d+)$")
+
+
+@dataclass
+class BatchTask:
+    """バッチで保存する1つのタスク"""
+
+    name: str                 # 表示・出力サブフォルダ名（例: "g01_02"、タスクファイル名）
+    img_folder: Optional[str] = None  # imgフォルダのパス（フォルダから保存する場合）
+    task_file: Optional[str] = None   # タスクファイルのパス（タスクファイルから保存する場合）
+    priority: int = 0         # 優先度（大きいほど先に処理する）
+
+    @property
+    def location(self) -> str:
+        """コピー元の場所（タスクファイル、またはimgフォルダのパス）"""
+        return self.task_file or self.img_folder
+
+    def open_source(self):
+        """ImageSource を開く"""
+        if self.task_file is not None:
+            return ZipImageSource(self.task_file)
+        if not os.path.isdir(self.img_folder):
+            raise FileNotFoundError(f"imgフォルダが見つかりませんでした: {self.img_folder}")
+        return FolderImageSource(self.img_folder)
+
+
+@dataclass
+class TaskResult:
+    """1つのタスクの保存結果"""
+
+    name: str
+    source: str
+    output_folder: str
+    status: str = "pending"   # ok / dry-run / cancelled / error
+    copied: int = 0           # 保存したファイル数（dry-run の場合はコピーする予定の数）
+    skipped: int = 0
+    total_bytes: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchOptions:
+    """全タスク共通の保存設定"""
+
+    output_folder: str
+    save_mode: str = Constants.SAVE_MODE_ALL
+    cam_list: Optional[List[List[int]]] = None
+    jpeg_quality: Optional[int] = None
+    filename_templates: Optional[dict] = None  # Noneの場合はデフォルトのテンプレート
+    flat: bool = False
+    resume: bool = False
+    sync: bool = False
+    dry_run: bool = False
+    copy_workers: int = Constants.DEFAULT_COPY_WORKERS
+    reads_per_host: int = Constants.DEFAULT_READS_PER_HOST
+    metadata_workers: Optional[int] = None
+
+
+def split_priority(text: str):
+    """
+    タスク指定の末尾の "@優先度" を取り除く
+
+    Returns:
+        (タスク指定, 優先度) 優先度が無い場合は0
+    """
+    match = _PRIORITY_PATTERN.match(text.strip())
+    if not match:
+        return text, 0
+    return match.group(1), int(match.group(2))
+
+
+def parse_task_pair(text: str, root: str) -> BatchTask:
+    """
+    "g01/02"、"1/2"、"01-02" 形式のグループ番号/タスク番号を BatchTask に変換する
+
+    Args:
+        text: グループ番号とタスク番号（末尾に "@優先度" を付けられる）
+        root: viscotechフォルダのパス
+
+    Raises:
+        argparse.ArgumentTypeError: 形式が正しくない場合
+    """
+    pair, priority = split_priority(text)
+    match = _PAIR_PATTERN.match(pair.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"グループ番号/タスク番号の形式が正しくありません: {text}")
+    group, task = (f"{int(num):02}" for num in match.groups())
+    return BatchTask(name=f"g{group}_{task}",
+                     img_folder=os.path.join(root, TASK_FOLDER, f"g{group}", task, Constants.IMG_FOLDER),
+                     priority=priority)
+
+
+def expand_task_glob(pattern: str, root: str) -> List[BatchTask]:
+    """
+    viscotech/task に対するglobパターン（例: "g01/*"）に一致するタスクを返す
+
+    Args:
+        pattern: globパターン（グループフォルダ/タスクフォルダ、末尾に "@優先度" を付けられる）
+        root: viscotechフォルダのパス
+    """
+    pattern, priority = split_priority(pattern)
+    task_root = os.path.join(root, TASK_FOLDER)
+    tasks = []
+    for task_folder in sorted(glob.glob(os.path.join(task_root, pattern))):
+        img_folder = os.path.join(task_folder, Constants.IMG_FOLDER)
+        if not os.path.isdir(img_folder):
+            continue
+        relative = os.path.relpath(task_folder, task_root)
+        tasks.append(BatchTask(name=relative.replace(os.sep, "_"), img_folder=img_folder, priority=priority))
+    return tasks
+
+
+def expand_task_files(pattern: str) -> List[BatchTask]:
+    """
+    タスクファイルのパス（globパターン可）に一致するタスクを返す
+
+    Args:
+        pattern: タスクファイルのパス、またはglobパターン（末尾に "@優先度" を付けられる）
+    """
+    pattern, priority = split_priority(pattern)
+    paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+    return [BatchTask(name=os.path.splitext(os.path.basename(path))[0], task_file=path, priority=priority)
+            for path in paths]
+
+
+def unique_tasks(tasks: List[BatchTask]) -> List[BatchTask]:
+    """
+    同じコピー元を指す重複したタスクを除き、出力サブフォルダ名が重ならないようにする
+
+    --task と --glob で同じタスクを指定した場合などは、最初に指定したものだけを残す（優先度は高い方を使う）。
+    別のタスクの名前が同じ場合（同じ名前で別のフォルダにあるタスクファイルなど）は、
+    後のタスクの名前に "_2"、"_3" ... を付ける。Windowsではフォルダ名の大文字・小文字を区別しないため、
+    名前の比較も大文字・小文字を区別しない。
+
+    Args:
+        tasks: 指定順のタスクのリスト
+
+    Returns:
+        重複を除いたタスクのリスト（指定順）
+    """
+    by_location = {}
+    for task in tasks:
+        key = os.path.normcase(os.path.abspath(task.location))
+        kept = by_location.get(key)
+        if kept is None:
+            by_location[key] = task
+        else:
+            logger.info("重複したタスクを除きました: %s (%s)", task.name, task.location)
+            kept.priority = max(kept.priority, task.priority)
+    unique = list(by_location.values())
+
+    requested = {task.name.lower() for task in unique}
+    used = set()
+    for task in unique:
+        name = task.name
+        number = 1
+        while name.lower() in used or (name != task.name and name.lower() in requested):
+            number += 1
+            name = f"{task.name}_{number}"
+        if name != task.name:
+            logger.info("タスク名が重複しているため名前を変更しました: %s -> %s (%s)", task.name, name, task.location)
+            task.name = name
+        used.add(name.lower())
+    return unique
+
+
+def parse_cam_list(text: str) -> List[List[int]]:
+    """
+    "1-1,1-2,2-1" 形式のカメラ番号-列番号のリストを変換する
+
+    Raises:
+        argparse.ArgumentTypeError: 形式が正しくない場合
+    """
+    cam_list = []
+    for item in text.split(","):
+        match = re.fullmatch(r"\s*(\d+)[-:](\d+)\s*", item)
+        if not match:
+            raise argparse.ArgumentTypeError(f"カメラ番号-列番号の形式が正しくありません: {item}")
+        cam_list.append([int(match.group(1)), int(match.group(2))])
+    return cam_list
+
+
+def export_task(task: BatchTask, options: BatchOptions, scheduler: ExportScheduler, cancel_event: threading.Event,
+                name_registry: Optional[NameRegistry] = None) -> TaskResult:
+    """
+    1つのタスクの画像を保存する
+
+    Args:
+        task: 保存するタスク
+        options: 保存設定
+        scheduler: 全タスクで共有するコピーのスケジューラ
+        cancel_event: セットされると処理を中断するイベント
+        name_registry: 保存先フォルダを複数のタスクで共有する場合のファイル名レジストリ
+
+    Returns:
+        TaskResult（例外は送出せず、status と error に記録する）
+    """
+    output_folder = options.output_folder if options.flat else os.path.join(options.output_folder, task.name)
+    result = TaskResult(name=task.name, source=task.location, output_folder=output_folder)
+    telemetry = ExportTelemetry()
+    report = RunReport(task=task.name, source=task.location, output_folder=output_folder,
+                       save_mode=options.save_mode, jpeg_quality=options.jpeg_quality,
+                       resume=options.resume, sync=options.sync, priority=task.priority)
+    start = time.perf_counter()
+    executor = None
+    try:
+        with report.span("export"), task.open_source() as source:
+            os.makedirs(output_folder, exist_ok=True)
+            save_cam = Constants.CAM_MODE_ALL if options.cam_list is None else Constants.CAM_MODE_SELECT
+            with scheduler.create_executor(task.name, task.location, task.priority, cancel_event.is_set) as executor:
+                plan = save_task_images_CamNum_selection.process_images(
+                    source, output_folder, options.save_mode, save_cam,
+                    preselected_cam_list=options.cam_list,
+                    filename_templates=options.filename_templates,
+                    cancel_check=cancel_event.is_set,
+                    copy_executor=executor,
+                    dry_run=options.dry_run,
+                    name_registry=name_registry,
+                    jpeg_quality=options.jpeg_quality,
+                    metadata_workers=options.metadata_workers,
+                    resume=options.resume,
+                    sync=options.sync,
+                    telemetry=telemetry,
+                    report=report,
+                )
+        if plan is None:
+            result.status = "cancelled"
+        else:
+            result.status = "dry-run" if options.dry_run else "ok"
+            result.skipped = plan.skipped_count
+            result.total_bytes = plan.total_bytes
+    except Exception as e:
+        result.status = "error"
+        result.error = f"{type(e).__name__}: {e}"
+    if options.dry_run:
+        result.copied = plan.file_count if result.status == "dry-run" else 0
+    elif executor is not None:
+        # 計画した件数ではなく、実際に保存したファイル数（キャンセル・エラーの場合はそれまでの件数）
+        result.copied = executor.copied_count
+    result.seconds = time.perf_counter() - start
+    if not options.dry_run:
+        # 保存先フォルダを共有する場合は、タスクごとに別のファイル名で保存する
+        report.set_info(result=result.status, error=result.error)
+        report.add_telemetry(telemetry.snapshot())
+        report.write_to(output_folder, tag=task.name if options.flat else None)
+    return result
+
+
+def run_batch(tasks: List[BatchTask], options: BatchOptions, parallel_tasks: int = 2,
+              cancel_event: Optional[threading.Event] = None) -> List[TaskResult]:
+    """
+    複数のタスクを保存する
+
+    優先度の高い順に parallel_tasks 個のタスクを同時に処理する。
+    コピーは全タスクで共有する ExportScheduler（options.copy_workers スレッド）で実行し、
+    同時に処理中のタスクのジョブを交互に実行するため、大きなタスクが小さなタスクを待たせない。
+    options.flat の場合は全タスクが同じ保存先フォルダに保存するため、
+    ファイル名レジストリを共有し、タスクは1つずつ処理する（コピーは並列に行う）。
+
+    Args:
+        tasks: 保存するタスクのリスト（unique_tasks で重複を除いたもの）
+        options: 保存設定
+        parallel_tasks: 同時に処理するタスク数
+        cancel_event: セットされると処理を中断するイベント
+
+    Returns:
+        タスクごとの TaskResult（tasks と同じ順番）
+    """
+    cancel_event = cancel_event or threading.Event()
+    name_registry = None
+    if options.flat:
+        os.makedirs(options.output_folder, exist_ok=True)
+        name_registry = NameRegistry.from_folder(options.output_folder)
+        parallel_tasks = 1
+    # 優先度の高いタスクから着手する（同じ優先度は指定順）
+    order = sorted(range(len(tasks)), key=lambda index: -tasks[index].priority)
+    with ExportScheduler(options.copy_workers, options.reads_per_host) as scheduler:
+        with ThreadPoolExecutor(max_workers=max(1, parallel_tasks), thread_name_prefix="task") as task_pool:
+            futures = {index: task_pool.submit(export_task, tasks[index], options, scheduler,
+                                               cancel_event, name_registry)
+                       for index in order}
+            try:
+                # Ctrl+Cを受け付けるため、タイムアウト付きで待つ
+                while not all(future.done() for future in futures.values()):
+                    wait(futures.values(), timeout=0.2)
+            except KeyboardInterrupt:
+                # 未着手のタスクを取り消し、実行中のタスクにはキャンセルを通知する
+                cancel_event.set()
+                for future in futures.values():
+                    future.cancel()
+                raise
+            return [futures[index].result() for index in range(len(tasks))]
+
+
+def format_summary(results: List[TaskResult]) -> str:
+    """タスクごとの結果を表形式の文字列にする"""
+    lines = [f"{'タスク':<20} {'結果':<10} {'コピー':>8} {'スキップ':>8} {'MB':>10} {'秒':>8}"]
+    for result in results:
+        lines.append(
+            f"{result.name:<20} {result.status:<10} {result.copied:>8} {result.skipped:>8} "
+            f"{result.total_bytes / (1024 * 1024):>10.1f} {result.seconds:>8.1f}"
+        )
+        if result.error:
+            lines.append(f"    {result.error}")
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="VTV-9000のタスクの画像をまとめて保存します",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("-o", "--output", required=True, help="保存先フォルダ")
+    parser.add_argument("--root", default=DEFAULT_VISCO_TECH_ROOT,
+                        help=f"viscotechフォルダ（デフォルト: {DEFAULT_VISCO_TECH_ROOT}）")
+    parser.add_argument("--task", action="append", default=[], metavar="gXX/YY[@N]",
+                        help="グループ番号/タスク番号（複数指定可、@N で優先度を指定）")
+    parser.add_argument("--glob", action="append", default=[], metavar="PATTERN",
+                        help="viscotech/task に対するglobパターン（例: \"g01/*\"、複数指定可）")
+    parser.add_argument("--task-file", action="append", default=[], metavar="PATH",
+                        help="タスクファイル（.ziq/.zit/.zii、globパターン可、複数指定可）")
+    parser.add_argument("--save-mode", choices=["0", "1", "2"], default=Constants.SAVE_MODE_ALL,
+                        help="0: 全ての画像、1: コメント付き画像、2: ロック画像")
+    parser.add_argument("--cams", type=parse_cam_list, metavar="C-D,...",
+                        help="保存するカメラ番号-列番号（例: \"1-1,1-2\"、省略時は全てのカメラ列）")
+    parser.add_argument("--quality", type=int, metavar="1-99",
+                        help="JPEGに変換して保存する場合の圧縮率（省略時はBMPのまま保存）")
+    parser.add_argument("--template1", help="ファイル名テンプレート（コメントあり + 画像取込XX形式）")
+    parser.add_argument("--template2", help="ファイル名テンプレート（コメントあり + その他）")
+    parser.add_argument("--template3", help="ファイル名テンプレート（コメントなし）")
+    parser.add_argument("--flat", action="store_true",
+                        help="タスクごとのサブフォルダを作らず、保存先フォルダに直接保存する（タスクは1つずつ処理）")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--resume", action="store_true", help="中断した保存の続きから再開する")
+    mode.add_argument("--sync", action="store_true", help="前回から追加・変更された画像のみ保存する")
+    parser.add_argument("--dry-run", action="store_true", help="コピーせずに件数とサイズだけを表示する")
+    parser.add_argument("--workers", type=int, default=Constants.DEFAULT_COPY_WORKERS,
+                        help=f"全タスク共通のコピー並列数（デフォルト: {Constants.DEFAULT_COPY_WORKERS}）")
+    parser.add_argument("--parallel-tasks", type=int, default=2, help="同時に処理するタスク数（デフォルト: 2）")
+    parser.add_argument("--reads-per-host", type=int, default=Constants.DEFAULT_READS_PER_HOST,
+                        help="コピー元のホスト（ドライブ、共有VTVの各PC）ごとの同時読み込み数"
+                             f"（デフォルト: {Constants.DEFAULT_READS_PER_HOST}）")
+    parser.add_argument("--metadata-workers", type=int, help=".txtファイルの読み込み並列数")
+    parser.add_argument("--summary-json", metavar="PATH", help="タスクごとの結果をJSONで保存するファイル")
+    parser.add_argument("--quiet", action="store_true", help="処理中のメッセージを表示しない（警告とエラーのみ表示）")
+    parser.add_argument("--log-level", metavar="SPEC",
+                        help="ログレベル（例: \"DEBUG\"、\"INFO,save_task_images_CamNum_selection=DEBUG\"）")
+    parser.add_argument("--log-file", metavar="PATH", help="ログを保存するファイル")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    tasks: List[BatchTask] = []
+    try:
+        tasks += [parse_task_pair(pair, args.root) for pair in args.task]
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    for pattern in args.glob:
+        tasks += expand_task_glob(pattern, args.root)
+    for pattern in args.task_file:
+        tasks += expand_task_files(pattern)
+    if not tasks:
+        parser.error("保存するタスクがありません（--task、--glob、--task-file のいずれかを指定してください）")
+    if args.quality is not None and not 0 < args.quality < Constants.NO_COMPRESSION_VALUE:
+        parser.error("--quality は1～99で指定してください")
+
+    templates = dict(save_task_images_CamNum_selection.DEFAULT_FILENAME_TEMPLATES)
+    for key in ("template1", "template2", "template3"):
+        if getattr(args, key):
+            templates[key] = getattr(args, key)
+
+    options = BatchOptions(
+        output_folder=args.output,
+        save_mode=args.save_mode,
+        cam_list=args.cams,
+        jpeg_quality=args.quality,
+        filename_templates=templates,
+        flat=args.flat,
+        resume=args.resume,
+        sync=args.sync,
+        dry_run=args.dry_run,
+        copy_workers=args.workers,
+        reads_per_host=args.reads_per_host,
+        metadata_workers=args.metadata_workers,
+    )
+
+    try:
+        level, module_levels = parse_level_spec(args.log_level or "")
+    except ValueError as e:
+        parser.error(str(e))
+    if args.quiet and level is None:
+        level = logging.WARNING
+    setup_logging(level, module_levels, log_file=args.log_file)
+
+    tasks = unique_tasks(tasks)
+
+    print(f"{len(tasks)} タスクを保存します: {args.output}")
+    try:
+        results = run_batch(tasks, options, args.parallel_tasks)
+    except KeyboardInterrupt:
+        print("中断されました", file=sys.stderr)
+        return 130
+
+    print(format_summary(results))
+    if args.summary_json:
+        with open(args.summary_json, "w", encoding="utf-8") as file:
+            json.dump([asdict(result) for result in results], file, indent=4, ensure_ascii=False)
+
+    return 0 if all(result.status in ("ok", "dry-run") for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
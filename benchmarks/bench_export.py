@@ -0,0 +1,225 @@
+"""
+画像保存処理全体のベンチマーク
+
+synthetic_task で合成したVTVタスク（imgフォルダとタスクファイル）に対して、
+get_camera_list、process_images（BMPのままコピー、JPEGに変換）、convert_bmp_to_jpeg、
+extract_task_file を実行して時間を計測する。結果はJSONファイルに保存し、
+--compare で以前の結果（別のコミット、別のPC）と比較できる。
+
+    python benchmarks/bench_export.py --files 500 --width 1024 --height 768
+    python benchmarks/bench_export.py --compare benchmarks/results/20240101_120000_abc1234.json
+
+メタデータのキャッシュは作業フォルダ内に作成し、アプリケーションのキャッシュは使用しない。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Callable, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import save_task_images_CamNum_selection  # noqa: E402
+from cammaster_log import get_default_cache  # noqa: E402
+from image_source import ZipImageSource  # noqa: E402
+from metadata_index import get_default_index  # noqa: E402
+from synthetic_task import TASK_FILE_EXTENSIONS, SyntheticTaskSpec, build_task_archive, generate_task  # noqa: E402
+from utils import convert_bmp_to_jpeg, extract_task_file  # noqa: E402
+
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def _fresh_folder(path: str) -> str:
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    return path
+
+
+def _clear_caches(img_folder: Optional[str] = None) -> None:
+    # 初回の処理（キャッシュなし）を計測するため、メタデータとログの解析結果を削除する
+    get_default_index().invalidate(os.path.abspath(img_folder) if img_folder else None)
+    get_default_cache().clear()
+
+
+def measure(name: str, func: Callable[[], None], repeat: int,
+            setup: Optional[Callable[[], None]] = None, **info) -> dict:
+    """
+    func を repeat 回実行し、各回の時間を記録する（setup の時間は含めない）
+
+    Returns:
+        計測結果の辞書（best, mean, runs と info の内容）
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    result = {"name": name, "best": min(runs), "mean": statistics.mean(runs), "runs": runs}
+    result.update(info)
+    print(f"{name:<36} best {result['best']:8.3f} s   mean {result['mean']:8.3f} s")
+    return result
+
+
+def git_revision() -> Optional[str]:
+    """ベンチマークを実行したコミット（gitが無い場合はNone）"""
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def run_benchmarks(spec: SyntheticTaskSpec, work_root: str, repeat: int, quality: int,
+                   archive_extensions: List[str]) -> List[dict]:
+    """合成タスクを作成し、各処理を計測する"""
+    print(f"合成タスクを作成中: {spec.image_count} 画像 ({spec.width}x{spec.height}) -> {work_root}")
+    task_root = os.path.join(work_root, "task")
+    img_folder = generate_task(task_root, spec)
+    image_bytes = sum(entry.stat().st_size for entry in os.scandir(img_folder) if entry.name.endswith(".bmp"))
+    info = {"images": spec.image_count, "image_bytes": image_bytes}
+    out = os.path.join(work_root, "out")
+    results = []
+
+    results.append(measure(
+        "get_camera_list (cold)",
+        lambda: save_task_images_CamNum_selection.get_camera_list(img_folder),
+        repeat, setup=lambda: _clear_caches(img_folder)))
+    results.append(measure(
+        "get_camera_list (cached)",
+        lambda: save_task_images_CamNum_selection.get_camera_list(img_folder), repeat))
+
+    def export(jpeg_quality=None, source=img_folder):
+        save_task_images_CamNum_selection.process_images(
+            source, out, "0", "0", jpeg_quality=jpeg_quality, write_journal=False)
+
+    results.append(measure("process_images bmp (cold)", export, repeat,
+                           setup=lambda: (_fresh_folder(out), _clear_caches(img_folder)), **info))
+    results.append(measure("process_images bmp (cached)", export, repeat,
+                           setup=lambda: _fresh_folder(out), **info))
+    results.append(measure(f"process_images jpeg q={quality}", lambda: export(quality), repeat,
+                           setup=lambda: _fresh_folder(out), **info))
+
+    # 保存済みのBMPをコピーしてから変換する（コピーの時間は含めない）
+    bmp_out = os.path.join(work_root, "bmp_out")
+    _fresh_folder(bmp_out)
+    save_task_images_CamNum_selection.process_images(img_folder, bmp_out, "0", "0", write_journal=False)
+    convert_folder = os.path.join(work_root, "convert")
+
+    def copy_bmp_out():
+        if os.path.exists(convert_folder):
+            shutil.rmtree(convert_folder)
+        shutil.copytree(bmp_out, convert_folder)
+
+    results.append(measure(f"convert_bmp_to_jpeg q={quality}", lambda: convert_bmp_to_jpeg(convert_folder, quality),
+                           repeat, setup=copy_bmp_out, **info))
+
+    first_archive = None
+    for extension in archive_extensions:
+        # 拡張子が違うだけで中身は同じZIPのため、2つ目以降は最初に作成したものをコピーする
+        archive_path = os.path.join(work_root, "task" + extension)
+        if first_archive is None:
+            first_archive = build_task_archive(task_root, archive_path)
+        else:
+            shutil.copyfile(first_archive, archive_path)
+        archive_info = dict(info, archive_bytes=os.path.getsize(archive_path))
+        extract_folder = os.path.join(work_root, "extract")
+        results.append(measure(f"extract_task_file {extension}",
+                               lambda: extract_task_file(archive_path, extract_folder),
+                               repeat, setup=lambda: _fresh_folder(extract_folder), **archive_info))
+
+        def export_archive():
+            with ZipImageSource(archive_path) as source:
+                export(source=source)
+
+        results.append(measure(f"process_images {extension} (direct)", export_archive, repeat,
+                               setup=lambda: (_fresh_folder(out), _clear_caches()), **archive_info))
+    return results
+
+
+def compare(results: List[dict], baseline_path: str) -> None:
+    """以前の結果と best の時間を比較して表示する"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    print(f"\n比較: {baseline_path}")
+    print(f"{'':<36} {'以前':>10} {'今回':>10} {'比':>8}")
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None:
+            continue
+        print(f"{result['name']:<36} {old['best']:10.3f} {result['best']:10.3f} {old['best'] / result['best']:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="画像保存処理全体のベンチマーク")
+    parser.add_argument("--files", type=int, default=100, help=".txtメタデータの数（画像数はカメラ構成の数倍）")
+    parser.add_argument("--width", type=int, default=320, help="BMP画像の幅")
+    parser.add_argument("--height", type=int, default=240, help="BMP画像の高さ")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG保存時の圧縮率")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数")
+    parser.add_argument("--archive", action="append", choices=TASK_FILE_EXTENSIONS,
+                        help="計測するタスクファイルの拡張子（省略時は全て）")
+    parser.add_argument("--work-dir", help="合成タスクを作成するフォルダ（省略時は一時フォルダ、終了時に削除）")
+    parser.add_argument("--output", help="結果を保存するJSONファイル（省略時は benchmarks/results/日時_コミット.json）")
+    parser.add_argument("--compare", metavar="PATH", help="比較する以前の結果のJSONファイル")
+    args = parser.parse_args()
+
+    spec = SyntheticTaskSpec(metadata_files=args.files, width=args.width, height=args.height)
+    temp_root = tempfile.mkdtemp(prefix="task_image_saver_bench_")
+    # メタデータのキャッシュ（%LOCALAPPDATA%）を作業フォルダに向ける
+    # （キャッシュは最初に使用する時に場所を決めるため、計測の前に設定すればよい）
+    previous_local_app_data = os.environ.get("LOCALAPPDATA")
+    os.environ["LOCALAPPDATA"] = os.path.join(temp_root, "cache")
+    try:
+        results = run_benchmarks(spec, args.work_dir or temp_root, args.repeat, args.quality,
+                                 args.archive or list(TASK_FILE_EXTENSIONS))
+    finally:
+        if previous_local_app_data is None:
+            del os.environ["LOCALAPPDATA"]
+        else:
+            os.environ["LOCALAPPDATA"] = previous_local_app_data
+        # --work-dir を指定した場合も、作業用のメタデータのキャッシュは削除する
+        shutil.rmtree(temp_root, ignore_errors=True)
+
+    revision = git_revision()
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": revision,
+        "machine": {
+            "node": platform.node(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "spec": asdict(spec),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        output = os.path.join(DEFAULT_RESULTS_DIR,
+                              f"{datetime.now():%Y%m%d_%H%M%S}_{revision or 'unknown'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n結果を保存しました: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+ファイル名テンプレート適用のマイクロベンチマーク
+
+従来の1件ごとにテンプレートを解析する実装（正規表現のコンパイル、値の辞書の作成、
+正規表現によるサニタイズ）と、filename_template の解析済みテンプレートを比較する。
+
+    python benchmarks/bench_filename_template.py --names 100000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filename_template import compile_template  # noqa: E402
+
+TEMPLATES = [
+    "{comment}_{index}",
+    "{comment}_{tool}",
+    "{original}",
+    "{comment}_{cam}-{div:02}_{index:05}",
+    "検査/{tool}:{original}_{unknown}",
+]
+
+
+def legacy_sanitize_filename(filename):
+    # 変更前の sanitize_filename
+    sanitized = re.sub(r'[\\/:*?"<>|]', '_', str(filename))
+    sanitized = sanitized.strip(' .')
+    if not sanitized:
+        sanitized = 'unnamed'
+    return sanitized
+
+
+def legacy_apply_filename_template(template, comment, tool_comment, original_name, cam, div, index):
+    # 変更前の apply_filename_template
+    values = {
+        "comment": "" if comment is None else str(comment),
+        "tool": "" if tool_comment is None else str(tool_comment),
+        "original": "" if original_name is None else str(original_name),
+        "cam": "" if cam is None else str(cam),
+        "div": "" if div is None else str(div),
+        "index": "" if index is None else str(index),
+    }
+    pattern = re.compile(r"\{([a-zA-Z0-9_]+)(?::([^{}]+))?\}")
+
+    def _replace(match):
+        name = match.group(1)
+        fmt = match.group(2)
+        if name not in values:
+            return ""
+        raw = values.get(name, "")
+        if fmt:
+            try:
+                as_int = int(raw) if str(raw).strip() != "" else 0
+                return format(as_int, fmt)
+            except Exception:
+                try:
+                    return format(raw, fmt)
+                except Exception:
+                    return str(raw)
+        return str(raw)
+
+    result = pattern.sub(_replace, str(template) if template is not None else "")
+    return legacy_sanitize_filename(result)
+
+
+def make_arguments(count):
+    # (コメント, ツールコメント, 元のファイル名, カメラ番号, DIV番号, 連番)
+    comments = ["ng", "キズ", "", "a?b", " .dot. "]
+    tools = ["画像取込01", "Tool1", None, "A/B"]
+    return [
+        (comments[i % len(comments)], tools[i % len(tools)], f"{i % 8 + 1}_1_2401010{i:06d}",
+         i % 8 + 1, i % 3 + 1, i)
+        for i in range(count)
+    ]
+
+
+def measure(func, arguments, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for template, args in arguments:
+            func(template, *args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compiled_apply(template, *args):
+    # 本処理と同じく、解析済みのテンプレートを使用する
+    return compile_template(template).render(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ファイル名テンプレート適用のベンチマーク")
+    parser.add_argument("--names", type=int, default=100000, help="生成するファイル名の数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最短時間を採用）")
+    args = parser.parse_args()
+
+    arguments = [(TEMPLATES[i % len(TEMPLATES)], values) for i, values in enumerate(make_arguments(args.names))]
+
+    # 同じ結果になることを確認してから計測する
+    for template, values in arguments[:1000]:
+        assert legacy_apply_filename_template(template, *values) == compiled_apply(template, *values)
+
+    legacy = measure(legacy_apply_filename_template, arguments, args.repeat)
+    compiled = measure(compiled_apply, arguments, args.repeat)
+    print(f"names: {args.names}")
+    print(f"legacy   : {legacy:.3f} s ({args.names / legacy:,.0f} names/s)")
+    print(f"compiled : {compiled:.3f} s ({args.names / compiled:,.0f} names/s)")
+    print(f"speedup  : {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
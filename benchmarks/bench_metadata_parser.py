@@ -0,0 +1,96 @@
+"""
+.txtメタデータ解析のマイクロベンチマーク
+
+従来の行ごとの部分文字列検索（Comment= / Locked= / FILE= / .DIV）と、
+metadata_parser の1パス解析を同じ合成データで比較する。
+
+    python benchmarks/bench_metadata_parser.py --files 5000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metadata_parser import parse_metadata_text  # noqa: E402
+
+
+def make_metadata_text(index, cams=8, extra_lines=40):
+    # VTVの.txtに近い構成（ヘッダ行、コメント、ロック、カメラ定義、画像ファイル）
+    lines = ["[INFO]", f"Date=2024/01/01 00:00:{index % 60:02d}"]
+    lines += [f"Param{i}={i * index}" for i in range(extra_lines)]
+    lines.append(f"Comment=comment{index}" if index % 3 else "Comment=この画像は自動で保存されました。")
+    lines.append(f"Locked={index % 2}")
+    for cam in range(1, cams + 1):
+        lines.append(f"CAM{cam}.DIV{cam}=1")
+    for cam in range(1, cams + 1):
+        lines.append(f"FILE={cam}_{cam}_2401010{index:05d}.bmp")
+    return "\n".join(lines) + "\n"
+
+
+# 合成データ以外で従来の判定と結果が変わりやすい形式の.txt
+EDGE_CASE_TEXTS = [
+    "\ufeffComment=BOM付き\nLocked=1\nCAM1.DIV1=1\nFILE=1_1_240101000000.bmp\n",
+    "\ufeffFILE=1_1_240101000000.bmp\nComment=ng\n",
+    "\ufeffCAM2.DIV3=1\nFILE=2_3_240101000000.bmp\n",
+    "Name=CAM1.DIV2\nTarget = cam3.DIV4\nFILE=1_2_240101000000.bmp\n",
+    "Comment=CAM1.DIV2 の画像\nLocked=0\nFILE=1_2_240101000000.bmp\n",
+    "CAM1.DIV2=CAM1.DIV3\nCAM2.DIV1=1\nFILE=1_2_240101000000.bmp",
+    "  CAM1.DIV1=1\r\n\tFILE=1_1_240101000000.bmp\r\nComment=\r\n",
+    "",
+]
+
+
+def legacy_parse(text):
+    # 変更前の行ごとの部分文字列検索（process_file / process_first_file と同じ判定）
+    record = {'comment': None, 'lockMode': None, 'files': [], 'divs': []}
+    for line in text.splitlines(keepends=True):
+        if 'Comment=' in line:
+            record['comment'] = line.replace('Comment=', '').strip()
+        if 'Locked=' in line:
+            record['lockMode'] = line.replace('Locked=', '').strip()
+        if 'FILE=' in line:
+            record['files'].append(line.replace('FILE=', '').strip())
+        if '.DIV' in line:
+            record['divs'].append([int(num) for num in re.findall(r'\d+', line)[:2]])
+    return record
+
+
+def measure(func, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=".txtメタデータ解析のベンチマーク")
+    parser.add_argument("--files", type=int, default=5000, help="解析する.txtファイル数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数（最短時間を採用）")
+    args = parser.parse_args()
+
+    texts = [make_metadata_text(i) for i in range(args.files)]
+
+    # 同じ結果になることを確認してから計測する
+    for text in texts[:50] + EDGE_CASE_TEXTS:
+        # 従来はBOMが最初の行の値に残っていたため、BOMを除いた（utf-8-sigで読んだ）内容と比較する
+        old = legacy_parse(text.lstrip("\ufeff"))
+        new = parse_metadata_text(text)
+        assert (old['comment'], old['lockMode'], old['files']) == (new.comment, new.lock_mode, new.files)
+        assert old['divs'] == [list(cam_div) for cam_div in new.cam_divs]
+
+    legacy = measure(legacy_parse, texts, args.repeat)
+    single_pass = measure(parse_metadata_text, texts, args.repeat)
+    print(f"files: {args.files}")
+    print(f"legacy      : {legacy:.3f} s ({args.files / legacy:,.0f} files/s)")
+    print(f"single pass : {single_pass:.3f} s ({args.files / single_pass:,.0f} files/s)")
+    print(f"speedup     : {legacy / single_pass:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
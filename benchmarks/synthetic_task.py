@@ -0,0 +1,193 @@
+"""
+ベンチマーク用の合成VTVタスクを作成するモジュール
+
+VTV-9000のタスクフォルダと同じ構成（viscotech/task/gXX/YY/img と cammaster_seq.log）を作成し、
+.txtメタデータ・BMP画像の数、画像サイズ、カメラ・DIV構成、コメント・ロックの割合を指定できる。
+作成したフォルダからタスクファイル（.ziq, .zit, .zii）も作成できる。
+
+    python benchmarks/synthetic_task.py D:\\bench --files 2000 --width 1024 --height 768 --archive .ziq
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import sys
+import zipfile
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Constants  # noqa: E402
+from task_archive import CAMMASTER_LOG_NAME  # noqa: E402
+
+# 自動保存された画像のコメント（保存モード1では保存しない）
+AUTO_COMMENT = "この画像は自動で保存されました。"
+
+# 既定のカメラ・DIV構成（カメラ2のDIV番号が飛んでいるため adjust_save_CAM_list の調整も通る）
+DEFAULT_LAYOUT = [(1, 1), (1, 2), (2, 1), (2, 3), (3, 1), (4, 1), (4, 2), (4, 3)]
+
+TASK_FILE_EXTENSIONS = (".ziq", ".zit", ".zii")
+
+
+@dataclass
+class SyntheticTaskSpec:
+    """合成タスクの構成"""
+
+    metadata_files: int = 200                  # .txtメタデータの数（1つの.txtにカメラ構成の数だけBMPがある）
+    layout: List[Tuple[int, int]] = field(default_factory=lambda: list(DEFAULT_LAYOUT))  # (カメラ番号, DIV番号)
+    width: int = 640                           # BMP画像の幅
+    height: int = 480                          # BMP画像の高さ
+    comment_ratio: float = 0.4                 # 任意のコメントを持つ.txtの割合
+    auto_comment_ratio: float = 0.3            # 自動保存のコメントを持つ.txtの割合（残りはコメントなし）
+    lock_ratio: float = 0.2                    # ロックされた.txtの割合
+    extra_lines: int = 40                      # .txtの解析対象外の行数
+    log_noise_lines: int = 2000                # cammaster_seq.log の画像取込以外の行数
+    seed: int = 1
+
+    @property
+    def image_count(self) -> int:
+        """BMP画像の数"""
+        return self.metadata_files * len(self.layout)
+
+
+def _make_bmp(width: int, height: int, seed: int) -> bytes:
+    # グラデーションにノイズを重ね、実際の検査画像に近いJPEG圧縮の負荷にする
+    gradient = Image.linear_gradient("L").resize((width, height)).rotate(seed * 37 % 360)
+    noise = Image.effect_noise((width, height), 40 + seed % 20)
+    gray = Image.blend(gradient, noise, 0.35)
+    img = Image.merge("RGB", (gray, gray.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+                                gray.transpose(Image.Transpose.FLIP_TOP_BOTTOM)))
+    buffer = io.BytesIO()
+    img.save(buffer, "BMP")
+    return buffer.getvalue()
+
+
+def _metadata_text(spec: SyntheticTaskSpec, rng: random.Random, stamp: str, files: List[str]) -> str:
+    lines = ["[INFO]", f"Date=20{stamp[:2]}/{stamp[2:4]}/{stamp[4:6]}"]
+    lines += [f"Param{i}={rng.randint(0, 9999)}" for i in range(spec.extra_lines)]
+    r = rng.random()
+    if r < spec.comment_ratio:
+        lines.append(f"Comment={rng.choice(['ng', 'キズ', '打痕', 'a/b?', '再検査'])}")
+    elif r < spec.comment_ratio + spec.auto_comment_ratio:
+        lines.append(f"Comment={AUTO_COMMENT}")
+    lines.append(f"Locked={'1' if rng.random() < spec.lock_ratio else '0'}")
+    lines += [f"CAM{cam}.DIV{div}=1" for cam, div in spec.layout]
+    lines += [f"FILE={name}" for name in files]
+    return "\n".join(lines) + "\n"
+
+
+def _log_text(spec: SyntheticTaskSpec, rng: random.Random) -> str:
+    # 画像取込の行は adjust_save_CAM_list 適用後のカメラ・DIV番号で記録されている
+    capture_lines = []
+    previous = None
+    for index, (cam, div) in enumerate(spec.layout):
+        if previous is not None and previous[0] == cam:
+            div = previous[1] + 1
+        previous = (cam, div)
+        name = f"画像取込{index:02d}" if index % 2 == 0 else f"Tool{index}"
+        capture_lines.append(f"2024/01/01 00:00:{index % 60:02d} ({cam}, {div}:0) : 画像取込, name = {name}")
+    noise = [f"2024/01/01 00:{i // 60 % 60:02d}:{i % 60:02d} seq step {i} : 検査, result = OK"
+             for i in range(spec.log_noise_lines)]
+    # 画像取込の行をログ全体に散らばらせる
+    for line in capture_lines:
+        noise.insert(rng.randint(0, len(noise)), line)
+    return "\n".join(noise) + "\n"
+
+
+def generate_task(root: str, spec: Optional[SyntheticTaskSpec] = None,
+                  group: str = "g01", task: str = "01") -> str:
+    """
+    合成タスクのフォルダを作成する（既に存在する場合は作り直す）
+
+    Args:
+        root: 作成先のフォルダ（この下に viscotech/task/gXX/YY を作成する）
+        spec: タスクの構成（Noneの場合は既定値）
+        group: グループフォルダ名
+        task: タスクフォルダ名
+
+    Returns:
+        imgフォルダのパス
+    """
+    spec = spec or SyntheticTaskSpec()
+    rng = random.Random(spec.seed)
+    viscotech = os.path.join(root, Constants.VISCO_TECH_FOLDER)
+    if os.path.exists(viscotech):
+        shutil.rmtree(viscotech)
+    task_folder = os.path.join(viscotech, "task", group, task)
+    img_folder = os.path.join(task_folder, Constants.IMG_FOLDER)
+    os.makedirs(img_folder)
+
+    with open(os.path.join(task_folder, CAMMASTER_LOG_NAME), "w", encoding="utf-8") as f:
+        f.write(_log_text(spec, rng))
+
+    # 画像はカメラごとに1枚作成して使い回す（作成時間を抑える）
+    bmp_data = {cam_div: _make_bmp(spec.width, spec.height, index) for index, cam_div in enumerate(spec.layout)}
+    for index in range(spec.metadata_files):
+        stamp = f"2401{index // 86400 % 28 + 1:02d}{index % 86400:06d}{index % 1000:03d}"
+        files = [f"{cam}_{div}_{stamp}.bmp" for cam, div in spec.layout]
+        for (cam, div), name in zip(spec.layout, files):
+            with open(os.path.join(img_folder, name), "wb") as f:
+                f.write(bmp_data[(cam, div)])
+        with open(os.path.join(img_folder, stamp + Constants.TXT_EXTENSION), "w", encoding="utf-8") as f:
+            f.write(_metadata_text(spec, rng, stamp, files))
+    return img_folder
+
+
+def build_task_archive(root: str, archive_path: str, compression: int = zipfile.ZIP_DEFLATED) -> str:
+    """
+    generate_task で作成したフォルダからタスクファイルを作成する
+
+    Args:
+        root: generate_task の作成先フォルダ
+        archive_path: タスクファイルのパス（.ziq, .zit, .zii）
+        compression: ZIPの圧縮方式
+
+    Returns:
+        タスクファイルのパス
+    """
+    viscotech = os.path.join(root, Constants.VISCO_TECH_FOLDER)
+    # 作成時間を抑えるため最も速い圧縮レベルにする（展開の速さは圧縮レベルにほとんど依存しない）
+    with zipfile.ZipFile(archive_path, "w", compression, compresslevel=1) as archive:
+        for folder, _, files in os.walk(viscotech):
+            for name in sorted(files):
+                path = os.path.join(folder, name)
+                archive.write(path, os.path.relpath(path, root).replace(os.sep, "/"))
+    return archive_path
+
+
+def parse_layout(text: str) -> List[Tuple[int, int]]:
+    """"1-1,1-2,2-1" 形式のカメラ・DIV構成を変換する"""
+    layout = []
+    for item in text.split(","):
+        cam, _, div = item.strip().partition("-")
+        layout.append((int(cam), int(div)))
+    return layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成VTVタスクを作成します")
+    parser.add_argument("root", help="作成先のフォルダ")
+    parser.add_argument("--files", type=int, default=200, help=".txtメタデータの数")
+    parser.add_argument("--layout", type=parse_layout, help="カメラ-DIV構成（例: \"1-1,1-2,2-1\"）")
+    parser.add_argument("--width", type=int, default=640, help="BMP画像の幅")
+    parser.add_argument("--height", type=int, default=480, help="BMP画像の高さ")
+    parser.add_argument("--archive", action="append", default=[], choices=TASK_FILE_EXTENSIONS,
+                        help="タスクファイルも作成する（拡張子、複数指定可）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    spec = SyntheticTaskSpec(metadata_files=args.files, width=args.width, height=args.height, seed=args.seed)
+    if args.layout:
+        spec.layout = args.layout
+    print(asdict(spec))
+    print(generate_task(args.root, spec))
+    for extension in args.archive:
+        print(build_task_archive(args.root, os.path.join(args.root, "task" + extension)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+cammaster_seq.log から画像取込ツールのコメントを取得するモジュール
+
+ログは長時間稼働するラインでは大きくなるため、"画像取込" を含む行だけを正規表現で解析する。
+解析結果はログの場所・サイズ・更新日時をキーにキャッシュし、
+同じログに対する保存・プレビュー・カメラ選択では再解析しない。
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from image_source import ImageSource
+
+# 行の絞り込みに使用する文字列（_TOOL_COMMENT_PATTERN に必ず含まれる）
+_CAPTURE_MARKER = "画像取込"
+_TOOL_COMMENT_PATTERN = re.compile(r'\((\d+),\s*(\d+):\d+\)\s*:\s*画像取込,\s*name\s*=\s*(\w+)')
+
+# キャッシュするログの数
+_CACHE_SIZE = 32
+
+ToolComments = Dict[Tuple[int, int], str]
+
+
+def parse_tool_comments(lines: Iterable[str]) -> ToolComments:
+    """
+    cammaster_seq.log の各行からカメラ番号・DIV番号とツールコメントの対応を抽出する
+
+    Args:
+        lines: ログの各行（開いたファイルでもよい）
+
+    Returns:
+        (カメラ番号, DIV番号) -> ツールコメント の辞書（同じカメラ列は後の行を優先）
+    """
+    tool_comments = {}
+    search = _TOOL_COMMENT_PATTERN.search
+    for line in lines:
+        if _CAPTURE_MARKER not in line:
+            continue
+        match = search(line)
+        if match:
+            tool_comments[(int(match.group(1)), int(match.group(2)))] = match.group(3)
+    return tool_comments
+
+
+class ToolCommentCache:
+    """ログごとの解析結果を保持するキャッシュ（複数スレッドから使用可能）"""
+
+    def __init__(self, max_entries: int = _CACHE_SIZE):
+        """
+        初期化
+
+        Args:
+            max_entries: 保持するログの数（古いものから削除する）
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, ToolComments]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, source: ImageSource) -> ToolComments:
+        """
+        ImageSource の cammaster_seq.log を解析する（変更されていなければキャッシュを返す）
+
+        返す辞書はキャッシュと共有するため、呼び出し側で変更しないこと。
+
+        Args:
+            source: ImageSource
+
+        Raises:
+            FileNotFoundError: ログが存在しない場合
+        """
+        key = source.log_stamp()
+        if key is not None:
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    return cached
+        with source.open_log() as log_file:
+            tool_comments = parse_tool_comments(log_file)
+        if key is not None:
+            with self._lock:
+                self._entries[key] = tool_comments
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return tool_comments
+
+    def clear(self) -> None:
+        """キャッシュを空にする"""
+        with self._lock:
+            self._entries.clear()
+
+
+_default_cache: Optional[ToolCommentCache] = None
+
+
+def get_default_cache() -> ToolCommentCache:
+    """アプリケーション共通のキャッシュを返す"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ToolCommentCache()
+    return _default_cache
+
+
+def load_tool_comments(source: ImageSource) -> ToolComments:
+    """
+    アプリケーション共通のキャッシュを使用して cammaster_seq.log を解析する
+
+    Args:
+        source: ImageSource
+
+    Raises:
+        FileNotFoundError: ログが存在しない場合
+    """
+    return get_default_cache().load(source)
@@ -1,11 +1,14 @@
 """
 設定管理と定数を定義するモジュール
 """
+import logging
 import os
 import json
 from typing import Dict, Any
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 
 class Constants:
     """アプリケーション全体で使用する定数"""
@@ -50,6 +53,18 @@ class Constants:
     MAX_JPEG_QUALITY = 100
     NO_COMPRESSION_VALUE = 100
 
+    # コピー並列数（共有VTVなどネットワーク越しのコピーを想定）
+    DEFAULT_COPY_WORKERS = 8
+
+    # .txtメタデータの先読み並列数（共有VTVでは1ファイルごとの往復待ちを重ねる）
+    DEFAULT_METADATA_READ_WORKERS = 8
+
+    # 複数タスクを保存する時の、コピー元ホスト（ドライブ、共有VTVの各PC）ごとの同時読み込み数
+    DEFAULT_READS_PER_HOST = 4
+
+    # メタデータのキャッシュ・ログファイルを保存するフォルダ名（%LOCALAPPDATA% の下）
+    APP_CACHE_FOLDER = "TaskImageSaver"
+
 
 class ConfigManager:
     """設定ファイルの読み込み・保存を管理するクラス"""
@@ -77,9 +92,9 @@ class ConfigManager:
             try:
                 with open(self.config_file, "r", encoding="utf-8") as file:
                     self._config = json.load(file)
-                    print(f"設定ファイルを読み込みました: {self.config_file}")
+                    logger.info("設定ファイルを読み込みました: %s", self.config_file)
             except (json.JSONDecodeError, IOError) as e:
-                print(f"設定ファイルの読み込みエラー: {e}")
+                logger.warning("設定ファイルの読み込みエラー: %s", e)
                 self._config = {}
         else:
             self._config = {}
@@ -91,9 +106,9 @@ class ConfigManager:
         try:
             with open(self.config_file, "w", encoding="utf-8") as file:
                 json.dump(self._config, file, indent=4, ensure_ascii=False)
-            print(f"設定ファイルを保存しました: {self.config_file}")
+            logger.info("設定ファイルを保存しました: %s", self.config_file)
         except IOError as e:
-            print(f"設定ファイルの保存エラー: {e}")
+            logger.warning("設定ファイルの保存エラー: %s", e)
     
     def get(self, key: str, default: Any = None) -> Any:
         """
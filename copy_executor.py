@@ -0,0 +1,299 @@
+"""
+画像ファイルのコピーを実行するエグゼキュータを定義するモジュール
+
+process_images はコピー先のファイル名をメインスレッドで確定させてから
+エグゼキュータにコピーを依頼する。ファイル名の決定順序はこれまでと同じため、
+並列にコピーしても出力ファイル名は逐次実行時と一致する。
+
+JPEG品質を指定した場合は、コピーの代わりにBMPを読み込んでJPEGとして直接保存する。
+コピー元にはファイルパスの他に、バイナリストリームを開く関数を指定できる
+（タスクファイル内の画像を展開せずにコピーする場合など）。
+
+コピー先には一時ファイル名で書き込んでから名前を変更するため、処理が中断されても
+書きかけのファイルがコピー先のファイル名で残ることはない。
+
+telemetry（ExportTelemetry）を指定した場合は、読み込み・書き込みのバイト数と時間を
+copy（コピー元からの読み込み）と compress（JPEGへの変換）に分けて記録する。
+"""
+import io
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from config import Constants
+from export_telemetry import STAGE_COMPRESS, STAGE_COPY, ExportTelemetry
+from image_source import CopySource
+
+# ストリームからコピーする際のバッファサイズ
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# 書き込み中のコピー先ファイルに付ける拡張子
+PARTIAL_SUFFIX = ".part"
+
+
+class CopyCancelledError(Exception):
+    """キャンセルによりコピーが中断されたことを示す例外"""
+
+
+def copy_or_transcode(src: CopySource, dst: str, jpeg_quality: Optional[int] = None,
+                      telemetry: Optional[ExportTelemetry] = None) -> None:
+    """
+    ファイルをコピーする（JPEG品質が指定された場合はJPEGに変換して保存する）
+
+    Args:
+        src: コピー元ファイルのパス、またはバイナリストリームを開く関数
+        dst: コピー先ファイルのパス
+        jpeg_quality: JPEG保存時の圧縮率（Noneの場合はそのままコピー）
+        telemetry: 処理量を記録する ExportTelemetry（Noneの場合は記録しない）
+    """
+    partial = dst + PARTIAL_SUFFIX
+    try:
+        if jpeg_quality is None:
+            started = time.perf_counter()
+            _copy_file(src, partial)
+            if telemetry is not None:
+                size = os.path.getsize(partial)
+                telemetry.record(STAGE_COPY, size, size, time.perf_counter() - started)
+        else:
+            _transcode(src, partial, jpeg_quality, telemetry)
+        os.replace(partial, dst)
+    except BaseException:
+        try:
+            os.unlink(partial)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_file(src: CopySource, dst: str) -> None:
+    if isinstance(src, str):
+        shutil.copy(src, dst)
+        return
+    with src() as fsrc, open(dst, 'wb') as fdst:
+        shutil.copyfileobj(fsrc, fdst, COPY_BUFFER_SIZE)
+
+
+def _transcode(src: CopySource, dst: str, jpeg_quality: int,
+               telemetry: Optional[ExportTelemetry]) -> None:
+    # 圧縮なしで使う場合にPillowを必須にしないよう、必要になった時点で読み込む
+    from jpeg_encoder import transcode_bmp_to_jpeg
+
+    # コピー元をメモリに読み込んでから変換し、読み込み（共有フォルダとの通信）と変換の時間を分けて計測する
+    started = time.perf_counter()
+    if isinstance(src, str):
+        with open(src, 'rb') as fsrc:
+            data = fsrc.read()
+    else:
+        with src() as fsrc:
+            data = fsrc.read()
+    read_done = time.perf_counter()
+    transcode_bmp_to_jpeg(io.BytesIO(data), dst, jpeg_quality)
+    if telemetry is not None:
+        telemetry.record(STAGE_COPY, bytes_read=len(data), seconds=read_done - started)
+        telemetry.record(STAGE_COMPRESS, len(data), os.path.getsize(dst), time.perf_counter() - read_done)
+
+
+class SerialCopyExecutor:
+    """呼び出し元のスレッドで1ファイルずつコピーするエグゼキュータ"""
+
+    def __init__(self, cancel_check: Optional[Callable[[], bool]] = None):
+        """
+        初期化
+
+        Args:
+            cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+        """
+        self.cancel_check = cancel_check
+        self.copied_count = 0
+
+    def submit(self, src: CopySource, dst: str, jpeg_quality: Optional[int] = None,
+               on_complete: Optional[Callable[[], None]] = None,
+               telemetry: Optional[ExportTelemetry] = None) -> None:
+        """
+        コピーを実行する
+
+        Args:
+            src: コピー元ファイルのパス、またはバイナリストリームを開く関数
+            dst: コピー先ファイルのパス
+            jpeg_quality: JPEG保存時の圧縮率（Noneの場合はそのままコピー）
+            on_complete: コピーが完了した時に呼び出す関数
+            telemetry: 処理量を記録する ExportTelemetry
+        """
+        if self.cancel_check and self.cancel_check():
+            return
+        copy_or_transcode(src, dst, jpeg_quality, telemetry)
+        self.copied_count += 1
+        if on_complete is not None:
+            on_complete()
+
+    def wait(self) -> None:
+        """全てのコピーの完了を待つ（逐次実行なので何もしない）"""
+
+    def cancel(self) -> None:
+        """未実行のコピーを取り消す（逐次実行なので何もしない）"""
+
+    def close(self) -> None:
+        """エグゼキュータを終了する"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.cancel()
+        self.close()
+        return False
+
+
+class ThreadPoolCopyExecutor(SerialCopyExecutor):
+    """
+    スレッドプールでコピーを並列実行するエグゼキュータ
+
+    共有VTV（SMB）上のコピーは1ファイルごとの往復待ちが支配的なため、
+    複数のコピーを同時に発行して待ち時間を重ねる。
+    実行待ちのコピー数は max_in_flight で制限し、submit はそれを超えるとブロックする。
+
+    複数のタスクを同時に処理する場合は、1つのスレッドプールを共有した
+    エグゼキュータをタスクごとに作成する（create_shared_copy_pool 参照）。
+    wait・cancel は自分が依頼したコピーだけを対象にし、全体の並列数はプールのスレッド数で制限される。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 cancel_check: Optional[Callable[[], bool]] = None,
+                 max_in_flight: Optional[int] = None,
+                 pool: Optional[ThreadPoolExecutor] = None):
+        """
+        初期化
+
+        Args:
+            max_workers: ワーカースレッド数（Noneの場合は Constants.DEFAULT_COPY_WORKERS）
+            cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+            max_in_flight: 同時に保持する未完了コピー数の上限（Noneの場合はワーカー数の4倍）
+            pool: 共有するスレッドプール（Noneの場合は作成し、close で終了する）
+        """
+        super().__init__(cancel_check)
+        self.max_workers = max_workers or Constants.DEFAULT_COPY_WORKERS
+        self.max_in_flight = max_in_flight or self.max_workers * 4
+        self._owns_pool = pool is None
+        self._pool = pool if pool is not None else ThreadPoolExecutor(max_workers=self.max_workers,
+                                                                      thread_name_prefix="copy")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    def _copy(self, src: CopySource, dst: str, jpeg_quality: Optional[int],
+              on_complete: Optional[Callable[[], None]], telemetry: Optional[ExportTelemetry]) -> None:
+        # ワーカー側でもキャンセルを確認し、キャンセル後のコピーは行わない
+        if self.cancel_check and self.cancel_check():
+            raise CopyCancelledError()
+        copy_or_transcode(src, dst, jpeg_quality, telemetry)
+        with self._lock:
+            self.copied_count += 1
+        if on_complete is not None:
+            on_complete()
+
+    def _collect(self, done) -> None:
+        # 完了したコピーの例外を記録（最初の1件のみ保持）
+        for future in done:
+            self._pending.discard(future)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None and not isinstance(error, CopyCancelledError) and self._error is None:
+                self._error = error
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            self.cancel()
+            raise error
+
+    def submit(self, src: CopySource, dst: str, jpeg_quality: Optional[int] = None,
+               on_complete: Optional[Callable[[], None]] = None,
+               telemetry: Optional[ExportTelemetry] = None) -> None:
+        """
+        コピーを依頼する（未完了数が上限に達している場合は空きが出るまで待つ）
+
+        Args:
+            src: コピー元ファイルのパス、またはバイナリストリームを開く関数
+            dst: コピー先ファイルのパス
+            jpeg_quality: JPEG保存時の圧縮率（Noneの場合はそのままコピー）
+            on_complete: コピーが完了した時にワーカースレッドで呼び出す関数
+            telemetry: 処理量を記録する ExportTelemetry
+
+        Raises:
+            先に依頼したコピーで発生した例外
+        """
+        self._raise_if_failed()
+        while len(self._pending) >= self.max_in_flight:
+            done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+            self._collect(done)
+            self._raise_if_failed()
+        self._pending.add(self._pool.submit(self._copy, src, dst, jpeg_quality, on_complete, telemetry))
+
+    def wait(self) -> None:
+        """
+        依頼済みのコピーが全て完了するまで待つ
+
+        Raises:
+            コピー中に発生した例外
+        """
+        if self._pending:
+            done, _ = wait(self._pending)
+            self._collect(done)
+        self._raise_if_failed()
+
+    def cancel(self) -> None:
+        """未実行のコピーを取り消し、実行中のコピーの終了を待つ"""
+        for future in list(self._pending):
+            future.cancel()
+        if self._pending:
+            done, _ = wait(self._pending)
+            for future in done:
+                self._pending.discard(future)
+
+    def close(self) -> None:
+        """スレッドプールを終了する（共有のプールの場合は何もしない）"""
+        if self._owns_pool:
+            self._pool.shutdown(wait=True)
+
+
+def create_copy_executor(max_workers: Optional[int] = None,
+                         cancel_check: Optional[Callable[[], bool]] = None,
+                         pool: Optional[ThreadPoolExecutor] = None) -> SerialCopyExecutor:
+    """
+    ワーカー数に応じたコピーエグゼキュータを生成する
+
+    Args:
+        max_workers: ワーカースレッド数（Noneの場合はデフォルト値、1以下の場合は逐次実行）
+            pool を指定した場合は未完了コピー数の上限の計算にのみ使用する
+        cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+        pool: 共有するスレッドプール（create_shared_copy_pool 参照）
+
+    Returns:
+        コピーエグゼキュータ
+    """
+    if pool is not None:
+        return ThreadPoolCopyExecutor(max_workers, cancel_check, pool=pool)
+    if max_workers is None:
+        max_workers = Constants.DEFAULT_COPY_WORKERS
+    if max_workers <= 1:
+        return SerialCopyExecutor(cancel_check)
+    return ThreadPoolCopyExecutor(max_workers, cancel_check)
+
+
+def create_shared_copy_pool(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """
+    複数のエグゼキュータで共有するコピー用のスレッドプールを生成する
+
+    Args:
+        max_workers: 全体のワーカースレッド数（Noneの場合は Constants.DEFAULT_COPY_WORKERS）
+
+    Returns:
+        スレッドプール（使用後は呼び出し元で shutdown する）
+    """
+    return ThreadPoolExecutor(max_workers=max_workers or Constants.DEFAULT_COPY_WORKERS,
+                              thread_name_prefix="copy")
@@ -0,0 +1,161 @@
+"""
+画像保存の完了ジャーナルを定義するモジュール
+
+コピーが完了するたびに、コピー元・コピー先・コピー元のサイズと更新日時（タスクファイルの場合はCRC）を
+出力フォルダのジャーナル（JSON Lines形式）に1行ずつ追記する。
+処理が中断された場合でも、再開モードではジャーナルに記録されたコピーをスキップし、
+残りのファイルだけをコピーできる。
+差分同期モードではジャーナルを前回の保存内容の一覧として使用し、
+追加・変更された画像だけをコピーする（変更された画像は前回のファイルを上書きする）。
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+JOURNAL_FILE_NAME = ".task_image_saver_journal.jsonl"
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    """完了したコピー1件の記録"""
+
+    location: str             # コピー元のimgフォルダの場所（絶対パス）
+    source: str               # imgフォルダ内の元ファイル名
+    dest: str                 # 出力フォルダでのファイル名（拡張子付き）
+    size: int                 # コピー元のサイズ（バイト）
+    stamp: object             # コピー元の更新日時（ナノ秒）、またはタスクファイル内のCRC
+    quality: Optional[int] = None  # JPEGに変換した場合の圧縮率
+    completed_at: float = 0.0
+
+    def matches(self, size: int, stamp: object, quality: Optional[int]) -> bool:
+        """コピー元と保存形式が記録時から変わっていないかどうか"""
+        return self.size == size and self.stamp == stamp and self.quality == quality
+
+
+class ExportJournal:
+    """出力フォルダの完了ジャーナルを読み書きするクラス"""
+
+    def __init__(self, output_folder: str):
+        """
+        初期化
+
+        Args:
+            output_folder: 保存先フォルダのパス
+        """
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, JOURNAL_FILE_NAME)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def entries(self) -> Iterable[JournalEntry]:
+        """
+        ジャーナルの記録を古い順に返す
+
+        中断時に書きかけになった行など、読み込めない行は無視する。
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield JournalEntry(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+
+    def completed_files(self, location: str) -> Dict[str, JournalEntry]:
+        """
+        指定したimgフォルダからのコピーの記録を返す（同じファイルは最新の記録）
+
+        Args:
+            location: コピー元のimgフォルダの場所
+
+        Returns:
+            imgフォルダ内の元ファイル名 -> JournalEntry の辞書
+        """
+        location = os.path.abspath(location)
+        return {entry.source: entry for entry in self.entries() if entry.location == location}
+
+    def compare(self, location: str, source_stats: Dict[str, Tuple[int, object]],
+                quality: Optional[int], existing_names) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        コピー元を前回の記録と比較する
+
+        コピー先のファイルが残っていて保存形式が同じ記録だけを対象にし、
+        コピー元のサイズ・更新日時が記録時と同じものを「変更なし」、異なるものを「変更あり」とする。
+        記録の無いファイル（新しい画像）はどちらにも含まれない。
+
+        Args:
+            location: コピー元のimgフォルダの場所
+            source_stats: 元ファイル名 -> (サイズ, 更新日時またはCRC) の辞書
+            quality: 今回のJPEG圧縮率（BMPのまま保存する場合はNone）
+            existing_names: 出力フォルダのファイル名を判定する NameRegistry
+
+        Returns:
+            (変更なし, 変更あり) それぞれ 元ファイル名 -> 出力フォルダでのファイル名 の辞書
+        """
+        unchanged = {}
+        changed = {}
+        for source, entry in self.completed_files(location).items():
+            stat = source_stats.get(source)
+            if stat is None or entry.quality != quality or not existing_names.is_taken(entry.dest):
+                continue
+            if entry.matches(stat[0], stat[1], quality):
+                unchanged[source] = entry.dest
+            else:
+                changed[source] = entry.dest
+        return unchanged, changed
+
+    def resumable_files(self, location: str, source_stats: Dict[str, Tuple[int, object]],
+                        quality: Optional[int], existing_names) -> Dict[str, str]:
+        """
+        再開時にスキップできるコピー（compare の「変更なし」）を返す
+
+        Args:
+            location: コピー元のimgフォルダの場所
+            source_stats: 元ファイル名 -> (サイズ, 更新日時またはCRC) の辞書
+            quality: 今回のJPEG圧縮率（BMPのまま保存する場合はNone）
+            existing_names: 出力フォルダのファイル名を判定する NameRegistry
+
+        Returns:
+            元ファイル名 -> 出力フォルダでのファイル名 の辞書
+        """
+        return self.compare(location, source_stats, quality, existing_names)[0]
+
+    def record(self, location: str, source: str, dest: str, size: int, stamp: object,
+               quality: Optional[int] = None) -> None:
+        """
+        完了したコピーを追記する（複数スレッドから呼び出し可能）
+
+        Args:
+            location: コピー元のimgフォルダの場所
+            source: imgフォルダ内の元ファイル名
+            dest: 出力フォルダでのファイル名（拡張子付き）
+            size: コピー元のサイズ（バイト）
+            stamp: コピー元の更新日時、またはCRC
+            quality: JPEGに変換した場合の圧縮率
+        """
+        entry = JournalEntry(os.path.abspath(location), source, dest, size, stamp, quality, time.time())
+        line = json.dumps(asdict(entry), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            # 異常終了に備えて1件ごとに書き出す
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        """ジャーナルファイルを閉じる"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,106 @@
+"""
+画像保存処理の実行計画（コピージョブの一覧）を定義するモジュール
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from image_source import CopySource, ImageSource
+
+
+@dataclass(frozen=True)
+class CopyJob:
+    """1枚の画像をコピーするジョブ"""
+
+    source_name: str          # imgフォルダ内の元ファイル名（例: "1_1_xxx.bmp"）
+    dest_name: str            # 出力フォルダでのファイル名（拡張子付き）
+    cam: object               # カメラ番号（取得できない場合は空文字）
+    div: object               # DIV番号（取得できない場合は空文字）
+    comment: str              # 画像コメント
+    tool_comment: Optional[str] = None  # ツールコメント（cammaster_seq.log由来）
+    index: int = 0            # .txtファイル内での連番
+
+
+@dataclass
+class ExportPlan:
+    """
+    process_images の計画フェーズで作成される実行計画
+
+    計画はファイルのコピーを行わずに作成されるため、コピー前の件数表示や
+    ドライランに利用でき、同じ計画を任意のエグゼキュータで実行できる。
+    """
+
+    source: ImageSource
+    output_folder: str
+    jobs: List[CopyJob] = field(default_factory=list)
+    metadata_file_count: int = 0  # 解析した.txtファイル数
+    jpeg_quality: Optional[int] = None  # JPEGに変換して保存する場合の圧縮率
+    completed_jobs: List[CopyJob] = field(default_factory=list)  # 前回までに完了済みのためスキップするジョブ
+    _source_stats: Optional[Dict[str, Tuple[int, object]]] = field(default=None, repr=False)
+
+    @property
+    def file_count(self) -> int:
+        """コピーするファイル数"""
+        return len(self.jobs)
+
+    @property
+    def skipped_count(self) -> int:
+        """完了済みのためスキップするファイル数"""
+        return len(self.completed_jobs)
+
+    @property
+    def source_folder(self) -> str:
+        """コピー元（imgフォルダ、またはタスクファイル内のimgフォルダ）の場所"""
+        return self.source.location
+
+    def source_path(self, job: CopyJob) -> CopySource:
+        """ジョブのコピー元（ファイルパス、またはバイナリストリームを開く関数）を返す"""
+        return self.source.copy_source(job.source_name)
+
+    def dest_path(self, job: CopyJob) -> str:
+        """ジョブのコピー先パスを返す"""
+        return os.path.join(self.output_folder, job.dest_name)
+
+    def source_stats(self) -> Dict[str, Tuple[int, object]]:
+        """
+        コピー元のファイルサイズと更新日時（タスクファイルの場合はCRC）の一覧を返す
+
+        ファイルごとにstatを発行せず、フォルダを1回列挙して取得する（結果はキャッシュ）。
+
+        Returns:
+            ファイル名 -> (サイズ, 更新日時またはCRC) の辞書
+        """
+        if self._source_stats is None:
+            self._source_stats = self.source.file_stats()
+        return self._source_stats
+
+    def set_source_stats(self, stats: Dict[str, Tuple[int, object]]) -> None:
+        """
+        コピー元のファイル情報を設定する（フォルダを列挙せずに分かる場合に使用）
+
+        Args:
+            stats: ファイル名 -> (サイズ, 更新日時またはCRC) の辞書
+        """
+        self._source_stats = dict(stats)
+
+    def source_sizes(self) -> Dict[str, int]:
+        """
+        コピー元のファイルサイズ一覧を返す
+
+        Returns:
+            ファイル名 -> サイズ（バイト）の辞書
+        """
+        return {name: stat[0] for name, stat in self.source_stats().items()}
+
+    @property
+    def total_bytes(self) -> int:
+        """コピーするファイルの合計サイズ（バイト）"""
+        stats = self.source_stats()
+        return sum(stats.get(job.source_name, (0, None))[0] for job in self.jobs)
+
+    def summary(self) -> str:
+        """件数と合計サイズを表す文字列を返す"""
+        text = f"{self.file_count} ファイル ({self.total_bytes / (1024 * 1024):.1f} MB)"
+        if self.completed_jobs:
+            text += f"、完了済み {self.skipped_count} ファイルはスキップ"
+        return text
@@ -0,0 +1,273 @@
+"""
+複数タスクのコピー・圧縮を1つのワーカープールで実行するスケジューラ
+
+タスクごとにレーン（ScheduledCopyExecutor）を作成し、各タスクの process_images に
+copy_executor として渡す。ワーカーは次の順でジョブを取り出す。
+
+1. 優先度の高いレーンを先に処理する
+2. 同じ優先度のレーンからは1ジョブずつ順番に取り出す（大きなタスクが小さなタスクを待たせない）
+3. コピー元のホスト（オフラインPCのドライブ、共有VTVの各PC）ごとに同時読み込み数を制限し、
+   上限に達したホストのジョブは飛ばして他のホストのジョブを実行する
+"""
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from config import Constants
+from copy_executor import CopyCancelledError, copy_or_transcode
+from export_telemetry import ExportTelemetry
+from image_source import CopySource
+
+
+def source_host(location: str) -> str:
+    """
+    コピー元の場所から同時読み込み数を制限する単位（ホスト）を求める
+
+    UNCパス（\\\\VTV01\\viscotech\\...）はホスト名、ドライブ付きのパスはドライブ名を返す。
+
+    Args:
+        location: imgフォルダ、またはタスクファイルの場所
+    """
+    normalized = location.replace("/", "\\")
+    if normalized.startswith("\\\\"):
+        return normalized[2:].split("\\", 1)[0].lower()
+    drive, _ = os.path.splitdrive(location)
+    return drive.upper() or "local"
+
+
+class _Lane:
+    """1つのタスクのジョブキュー"""
+
+    def __init__(self, name: str, host: str, priority: int, cancel_check, max_queued: int):
+        self.name = name
+        self.host = host
+        self.priority = priority
+        self.cancel_check = cancel_check
+        self.max_queued = max_queued
+        self.queue: Deque[Tuple[CopySource, str, Optional[int], Optional[Callable[[], None]], Optional[ExportTelemetry]]] = deque()
+        self.running = 0
+        self.copied_count = 0
+        self.error: Optional[BaseException] = None
+
+
+class ExportScheduler:
+    """
+    複数タスクのジョブを優先度・公平性・ホストごとの上限に従って実行するスケジューラ
+
+    使用例:
+        with ExportScheduler(max_workers=8, max_reads_per_host=4) as scheduler:
+            with scheduler.create_executor("g01_02", img_folder) as executor:
+                process_images(img_folder, output, "0", "0", copy_executor=executor)
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_reads_per_host: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            max_workers: ワーカースレッド数（Noneの場合は Constants.DEFAULT_COPY_WORKERS）
+            max_reads_per_host: ホストごとの同時読み込み数の上限（Noneの場合は Constants.DEFAULT_READS_PER_HOST）
+        """
+        self.max_workers = max_workers or Constants.DEFAULT_COPY_WORKERS
+        self.max_reads_per_host = max_reads_per_host or Constants.DEFAULT_READS_PER_HOST
+        self._condition = threading.Condition()
+        self._lanes: List[_Lane] = []
+        self._host_active: Dict[str, int] = defaultdict(int)
+        self._next_index = 0
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"scheduler-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def create_executor(self, name: str, location: str, priority: int = 0,
+                        cancel_check: Optional[Callable[[], bool]] = None,
+                        max_queued: Optional[int] = None) -> "ScheduledCopyExecutor":
+        """
+        タスク用のコピーエグゼキュータ（レーン）を作成する
+
+        Args:
+            name: タスク名（表示用）
+            location: コピー元の場所（ホストの判定に使用）
+            priority: 優先度（大きいほど先に処理する）
+            cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+            max_queued: キューに保持する未実行ジョブ数の上限（Noneの場合はワーカー数の4倍）
+        """
+        lane = _Lane(name, source_host(location), priority, cancel_check, max_queued or self.max_workers * 4)
+        with self._condition:
+            self._lanes.append(lane)
+        return ScheduledCopyExecutor(self, lane)
+
+    def _pick(self) -> Optional[_Lane]:
+        # 優先度の高い順に、前回の続きのレーンから順番に探す（呼び出し元でロックを取得済み）
+        count = len(self._lanes)
+        if count == 0:
+            return None
+        best = None
+        for offset in range(count):
+            index = (self._next_index + offset) % count
+            lane = self._lanes[index]
+            if not lane.queue or self._host_active[lane.host] >= self.max_reads_per_host:
+                continue
+            if best is None or lane.priority > best[1].priority:
+                best = (index, lane)
+        if best is None:
+            return None
+        self._next_index = best[0] + 1
+        return best[1]
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                lane = self._pick()
+                while lane is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    lane = self._pick()
+                src, dst, jpeg_quality, on_complete, telemetry = lane.queue.popleft()
+                lane.running += 1
+                self._host_active[lane.host] += 1
+                # キューに空きができたことを submit 側に通知する
+                self._condition.notify_all()
+
+            error = None
+            copied = False
+            try:
+                if lane.cancel_check and lane.cancel_check():
+                    raise CopyCancelledError()
+                copy_or_transcode(src, dst, jpeg_quality, telemetry)
+                copied = True
+                if on_complete is not None:
+                    on_complete()
+            except CopyCancelledError:
+                pass
+            except BaseException as e:
+                error = e
+
+            with self._condition:
+                lane.running -= 1
+                self._host_active[lane.host] -= 1
+                if error is not None:
+                    if lane.error is None:
+                        lane.error = error
+                    # エラーが発生したタスクの残りのジョブは実行しない
+                    lane.queue.clear()
+                # キャンセルの前後に関係なく、保存先に書き込んだコピーは数える
+                if copied:
+                    lane.copied_count += 1
+                self._condition.notify_all()
+
+    def _remove(self, lane: _Lane) -> None:
+        with self._condition:
+            if lane in self._lanes:
+                self._lanes.remove(lane)
+                self._next_index = 0
+
+    def close(self) -> None:
+        """全てのワーカーを終了する（未実行のジョブが残っている場合は実行してから終了する）"""
+        with self._condition:
+            while any(lane.queue or lane.running for lane in self._lanes):
+                self._condition.wait()
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            with self._condition:
+                for lane in self._lanes:
+                    lane.queue.clear()
+        self.close()
+        return False
+
+
+class ScheduledCopyExecutor:
+    """
+    ExportScheduler のレーンにジョブを追加するコピーエグゼキュータ
+
+    copy_executor モジュールのエグゼキュータと同じインターフェースを持ち、
+    wait・cancel は同じレーンのジョブだけを対象にする。
+    """
+
+    def __init__(self, scheduler: ExportScheduler, lane: _Lane):
+        self._scheduler = scheduler
+        self._lane = lane
+
+    @property
+    def copied_count(self) -> int:
+        """完了したコピー数"""
+        return self._lane.copied_count
+
+    def _raise_if_failed(self) -> None:
+        if self._lane.error is not None:
+            error, self._lane.error = self._lane.error, None
+            raise error
+
+    def submit(self, src: CopySource, dst: str, jpeg_quality: Optional[int] = None,
+               on_complete: Optional[Callable[[], None]] = None,
+               telemetry: Optional[ExportTelemetry] = None) -> None:
+        """
+        コピーを依頼する（レーンのキューが上限に達している場合は空きが出るまで待つ）
+
+        Args:
+            src: コピー元ファイルのパス、またはバイナリストリームを開く関数
+            dst: コピー先ファイルのパス
+            jpeg_quality: JPEG保存時の圧縮率（Noneの場合はそのままコピー）
+            on_complete: コピーが完了した時にワーカースレッドで呼び出す関数
+            telemetry: 処理量を記録する ExportTelemetry
+
+        Raises:
+            先に依頼したコピーで発生した例外
+        """
+        lane = self._lane
+        condition = self._scheduler._condition
+        with condition:
+            while len(lane.queue) >= lane.max_queued and lane.error is None:
+                condition.wait()
+            self._raise_if_failed()
+            lane.queue.append((src, dst, jpeg_quality, on_complete, telemetry))
+            condition.notify_all()
+
+    def wait(self) -> None:
+        """
+        依頼済みのコピーが全て完了するまで待つ
+
+        Raises:
+            コピー中に発生した例外
+        """
+        lane = self._lane
+        condition = self._scheduler._condition
+        with condition:
+            while lane.queue or lane.running:
+                condition.wait()
+            self._raise_if_failed()
+
+    def cancel(self) -> None:
+        """未実行のコピーを取り消し、実行中のコピーの終了を待つ"""
+        lane = self._lane
+        condition = self._scheduler._condition
+        with condition:
+            lane.queue.clear()
+            while lane.running:
+                condition.wait()
+
+    def close(self) -> None:
+        """レーンをスケジューラから取り除く"""
+        self._scheduler._remove(self._lane)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.cancel()
+        self.close()
+        return False
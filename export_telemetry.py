@@ -0,0 +1,222 @@
+"""
+画像保存の処理量（バイト数・処理速度・残り時間）を計測するモジュール
+
+処理段階ごとに StageMeter を持ち、ワーカースレッドから完了した処理を記録する。
+
+    scan     : .txtメタデータの読み込み
+    copy     : コピー元からの読み込み（JPEGに変換する場合は変換前の読み込み）とコピー先への書き込み
+    compress : JPEGへの変換と書き込み
+
+copy の処理時間が長い場合は共有VTVとの通信、compress の処理時間が長い場合は
+このPCでのJPEG変換が処理全体の速度を決めている。
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+STAGE_SCAN = "scan"
+STAGE_COPY = "copy"
+STAGE_COMPRESS = "compress"
+STAGES = (STAGE_SCAN, STAGE_COPY, STAGE_COMPRESS)
+
+# 処理速度を求める期間（秒）
+ROLLING_WINDOW_SECONDS = 5.0
+
+# 律速している段階の表示名
+BOTTLENECK_LABELS = {
+    STAGE_COPY: "共有フォルダの読み込み",
+    STAGE_COMPRESS: "JPEG圧縮",
+}
+
+
+@dataclass(frozen=True)
+class StageSnapshot:
+    """ある時点の1つの処理段階の計測値"""
+
+    items: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    busy_seconds: float = 0.0          # ワーカースレッドがこの段階の処理に費やした時間の合計
+    bytes_per_second: float = 0.0      # 直近の読み込み速度（ROLLING_WINDOW_SECONDS 秒間）
+
+
+@dataclass(frozen=True)
+class TelemetrySnapshot:
+    """ある時点の全体の計測値"""
+
+    stages: Dict[str, StageSnapshot] = field(default_factory=dict)
+    done_bytes: int = 0                # 完了したジョブのコピー元のバイト数
+    planned_bytes: int = 0             # 計画に含まれるジョブのコピー元のバイト数
+    bytes_per_second: float = 0.0      # 直近のジョブ完了の速度
+    eta_seconds: Optional[float] = None  # 直近の速度から求めた残り時間（求められない場合はNone）
+
+    @property
+    def bottleneck(self) -> Optional[str]:
+        """処理時間の長い段階（STAGE_COPY または STAGE_COMPRESS、計測前はNone）"""
+        copy = self.stages.get(STAGE_COPY, StageSnapshot()).busy_seconds
+        compress = self.stages.get(STAGE_COMPRESS, StageSnapshot()).busy_seconds
+        if copy <= 0 and compress <= 0:
+            return None
+        return STAGE_COPY if copy >= compress else STAGE_COMPRESS
+
+
+class _RollingRate:
+    # 直近 ROLLING_WINDOW_SECONDS 秒間のバイト数から速度を求める（呼び出し元でロックを取得済み）
+
+    def __init__(self):
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._total = 0
+
+    def add(self, now: float, size: int) -> None:
+        self._events.append((now, size))
+        self._total += size
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._events and now - self._events[0][0] > ROLLING_WINDOW_SECONDS:
+            self._total -= self._events.popleft()[1]
+
+    def rate(self, now: float) -> float:
+        self._trim(now)
+        if not self._events:
+            return 0.0
+        # 期間の始まりは最初のイベント（計測開始直後の過大評価を避けるため最低1秒とする）
+        elapsed = max(now - self._events[0][0], 1.0)
+        return self._total / elapsed
+
+
+class StageMeter:
+    """1つの処理段階の計測値（ExportTelemetry のロックで保護される）"""
+
+    def __init__(self):
+        self.items = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.busy_seconds = 0.0
+        self.rate = _RollingRate()
+
+    def snapshot(self, now: float) -> StageSnapshot:
+        return StageSnapshot(self.items, self.bytes_read, self.bytes_written,
+                             self.busy_seconds, self.rate.rate(now))
+
+
+class ExportTelemetry:
+    """画像保存の処理量を計測するクラス（複数スレッドから呼び出し可能）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {stage: StageMeter() for stage in STAGES}
+        self._done = _RollingRate()
+        self._done_bytes = 0
+        self._planned_bytes = 0
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """
+        計測値が変わった時に呼び出す関数を登録する（記録したスレッドから呼び出される）
+
+        Args:
+            callback: 引数なしの関数
+        """
+        self._listeners.append(callback)
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            callback()
+
+    def record(self, stage: str, bytes_read: int = 0, bytes_written: int = 0,
+               seconds: float = 0.0, items: int = 1) -> None:
+        """
+        完了した処理を記録する
+
+        Args:
+            stage: 処理段階（STAGE_SCAN / STAGE_COPY / STAGE_COMPRESS）
+            bytes_read: 読み込んだバイト数
+            bytes_written: 書き込んだバイト数
+            seconds: 処理にかかった時間
+            items: 処理したファイル数
+        """
+        now = time.monotonic()
+        with self._lock:
+            meter = self._stages[stage]
+            meter.items += items
+            meter.bytes_read += bytes_read
+            meter.bytes_written += bytes_written
+            meter.busy_seconds += seconds
+            meter.rate.add(now, bytes_read)
+        self._notify()
+
+    def set_planned(self, total_bytes: int) -> None:
+        """
+        計画に含まれるジョブのコピー元のバイト数を設定する（残り時間の計算に使用）
+
+        Args:
+            total_bytes: コピー元のバイト数の合計
+        """
+        with self._lock:
+            self._planned_bytes = total_bytes
+            self._done_bytes = 0
+            self._done = _RollingRate()
+
+    def job_done(self, source_bytes: int) -> None:
+        """
+        ジョブ（コピーまたは変換）の完了を記録する
+
+        Args:
+            source_bytes: コピー元のバイト数
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._done_bytes += source_bytes
+            self._done.add(now, source_bytes)
+        self._notify()
+
+    def snapshot(self) -> TelemetrySnapshot:
+        """現在の計測値を返す"""
+        now = time.monotonic()
+        with self._lock:
+            rate = self._done.rate(now)
+            remaining = self._planned_bytes - self._done_bytes
+            eta = remaining / rate if rate > 0 and remaining >= 0 else None
+            return TelemetrySnapshot(
+                stages={stage: meter.snapshot(now) for stage, meter in self._stages.items()},
+                done_bytes=self._done_bytes,
+                planned_bytes=self._planned_bytes,
+                bytes_per_second=rate,
+                eta_seconds=eta,
+            )
+
+
+def _format_rate(bytes_per_second: float) -> str:
+    return f"{bytes_per_second / (1024 * 1024):.1f} MB/s"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    if minutes >= 60:
+        return f"{minutes // 60}時間{minutes % 60}分"
+    if minutes:
+        return f"{minutes}分{seconds}秒"
+    return f"{seconds}秒"
+
+
+def format_telemetry(snapshot: TelemetrySnapshot) -> str:
+    """
+    計測値を進捗ダイアログに表示する1行の文字列にする
+
+    例: "読込 12.3 MB/s ・ 圧縮 45.6 MB/s ・ 残り約 1分23秒 ・ 律速: 共有フォルダの読み込み"
+    """
+    parts = []
+    for stage, label in ((STAGE_SCAN, "解析"), (STAGE_COPY, "読込"), (STAGE_COMPRESS, "圧縮")):
+        stage_snapshot = snapshot.stages.get(stage)
+        if stage_snapshot is not None and stage_snapshot.bytes_per_second > 0:
+            parts.append(f"{label} {_format_rate(stage_snapshot.bytes_per_second)}")
+    if snapshot.eta_seconds is not None:
+        parts.append(f"残り約 {_format_duration(snapshot.eta_seconds)}")
+    bottleneck = snapshot.bottleneck
+    if bottleneck is not None and snapshot.stages[STAGE_COMPRESS].items:
+        # 圧縮しない場合は読み込みしか無いため、律速している段階は表示しない
+        parts.append(f"律速: {BOTTLENECK_LABELS[bottleneck]}")
+    return " ・ ".join(parts)
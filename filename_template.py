@@ -0,0 +1,141 @@
+"""
+ファイル名テンプレートを解析・適用するモジュール
+
+テンプレート（例: "{comment}_{index:03}"）は最初に1回だけ解析し、
+固定文字列とプレースホルダーの並びに変換して保持する。
+画像ごとの処理では、解析済みの並びに値を埋め込むだけでファイル名を生成する。
+
+    template = compile_template("{comment}_{index:03}")
+    template.render(comment="ng", tool_comment="画像取込01", original_name="1_1_xxx", cam=1, div=1, index=5)
+    # -> "ng_005"
+"""
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# 使用できるプレースホルダー（render の引数の順番）
+PLACEHOLDERS = ("comment", "tool", "original", "cam", "div", "index")
+
+# {name} / {name:03} の簡易フォーマット指定
+PLACEHOLDER_PATTERN = re.compile(r"\{([a-zA-Z0-9_]+)(?::([^{}]+))?\}")
+
+# Windowsで使用できない文字: \ / : * ? " < > | をアンダースコアに置換する
+_INVALID_CHARS_TABLE = str.maketrans({char: "_" for char in '\\/:*?"<>|'})
+
+_SLOTS = {name: slot for slot, name in enumerate(PLACEHOLDERS)}
+
+
+def sanitize_filename(filename) -> str:
+    """
+    Windowsで使用できない文字をファイル名から除去・置換する関数
+
+    Args:
+        filename: サニタイズするファイル名
+
+    Returns:
+        無効な文字を除去したファイル名
+    """
+    # 無効な文字をアンダースコアに置換し、先頭・末尾の空白とドットを除去（Windowsの制限）
+    sanitized = str(filename).translate(_INVALID_CHARS_TABLE).strip(' .')
+    # 空文字列になった場合はデフォルト名を返す
+    return sanitized or 'unnamed'
+
+
+def _format_value(value, spec: str) -> str:
+    # 数値ゼロ埋め目的を想定し、まずint変換を試す
+    if type(value) is int:
+        try:
+            return format(value, spec)
+        except Exception:
+            pass
+    raw = "" if value is None else str(value)
+    try:
+        as_int = int(raw) if raw.strip() != "" else 0
+        return format(as_int, spec)
+    except Exception:
+        # 文字列などはフォーマットに失敗する可能性があるためフォールバック
+        try:
+            return format(raw, spec)
+        except Exception:
+            return raw
+
+
+class FilenameTemplate:
+    """解析済みのファイル名テンプレート"""
+
+    def __init__(self, template: Optional[str]):
+        """
+        テンプレートを解析する
+
+        未対応のプレースホルダーは空文字として扱う（プレビュー/本処理の両方で安全に）。
+
+        Args:
+            template: ファイル名テンプレート（例: "{comment}_{index}"）
+        """
+        self.template = "" if template is None else str(template)
+        # (固定文字列, プレースホルダーの位置, フォーマット指定) の並び
+        # 固定文字列は解析時にサニタイズ済み、プレースホルダーの位置は固定文字列の場合None
+        self._segments: List[Tuple[str, Optional[int], Optional[str]]] = []
+        unknown = set()
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(self.template):
+            if match.start() > position:
+                self._add_literal(self.template[position:match.start()])
+            position = match.end()
+            name, spec = match.group(1), match.group(2)
+            if name in _SLOTS:
+                self._segments.append(("", _SLOTS[name], spec))
+            else:
+                unknown.add(name)
+        if position < len(self.template):
+            self._add_literal(self.template[position:])
+        self.unknown_placeholders = sorted(unknown)
+
+    def _add_literal(self, text: str) -> None:
+        literal = text.translate(_INVALID_CHARS_TABLE)
+        if self._segments and self._segments[-1][1] is None:
+            literal = self._segments.pop()[0] + literal
+        self._segments.append((literal, None, None))
+
+    def render(self, comment, tool_comment, original_name, cam, div, index) -> str:
+        """
+        プレースホルダーに値を埋め込んでファイル名を生成する
+
+        Args:
+            comment: 画像コメント
+            tool_comment: ツールコメント
+            original_name: 元のファイル名（拡張子なし）
+            cam: カメラ番号
+            div: DIV番号（列番号）
+            index: 連番
+
+        Returns:
+            プレースホルダーを置換したファイル名（サニタイズ済み）
+        """
+        values = (comment, tool_comment, original_name, cam, div, index)
+        parts = []
+        for literal, slot, spec in self._segments:
+            if slot is None:
+                parts.append(literal)
+                continue
+            value = values[slot]
+            if spec:
+                text = _format_value(value, spec)
+            else:
+                text = "" if value is None else str(value)
+            parts.append(text.translate(_INVALID_CHARS_TABLE))
+        return "".join(parts).strip(' .') or 'unnamed'
+
+    def __repr__(self) -> str:
+        return f"FilenameTemplate({self.template!r})"
+
+
+@lru_cache(maxsize=64)
+def compile_template(template: Optional[str]) -> FilenameTemplate:
+    """
+    テンプレートを解析する（同じテンプレートは解析結果を再利用する）
+
+    Args:
+        template: ファイル名テンプレート
+    """
+    return FilenameTemplate(template)
@@ -0,0 +1,142 @@
+"""
+フォルダの内容を os.scandir で1回だけ列挙して保持するモジュール
+
+共有VTV（SMB）上のフォルダは数万ファイルになることがあり、列挙のたびにネットワークの往復が発生する。
+FolderListing は os.scandir の結果（Windowsではサイズ・更新日時を含む）を保持し、
+.txtファイル一覧、画像のサイズ・更新日時、出力フォルダの既存ファイル名など、
+同じ処理の中の各段階で同じ列挙結果を使用する。
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class FolderEntry:
+    """列挙したフォルダ内の1項目"""
+
+    name: str
+    is_file: bool
+    size: int = 0        # ファイルサイズ（バイト、stat を取得しなかった場合は0）
+    mtime_ns: int = 0    # 更新日時（ナノ秒、stat を取得しなかった場合は0）
+
+
+class FolderListing:
+    """フォルダを1回列挙した結果"""
+
+    def __init__(self, path: str, entries: Optional[List[FolderEntry]] = None):
+        """
+        初期化
+
+        Args:
+            path: フォルダのパス
+            entries: 列挙した項目（列挙した順番）
+        """
+        self.path = path
+        self._entries: Dict[str, FolderEntry] = {entry.name: entry for entry in entries or ()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def scan(cls, path: str, with_stats: bool = True, missing_ok: bool = False) -> "FolderListing":
+        """
+        フォルダを os.scandir で列挙する
+
+        Args:
+            path: フォルダのパス
+            with_stats: Falseの場合はサイズ・更新日時を取得しない（ファイル名だけが必要な場合）
+            missing_ok: Trueの場合はフォルダが存在しなければ空の結果を返す
+
+        Raises:
+            FileNotFoundError: フォルダが存在しない場合（missing_ok=False）
+        """
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    is_file = entry.is_file()
+                    if with_stats and is_file:
+                        # scandirの結果はWindowsではサイズ・更新日時を含むため、ファイルごとのstatは発生しない
+                        stat = entry.stat()
+                        entries.append(FolderEntry(entry.name, True, stat.st_size, stat.st_mtime_ns))
+                    else:
+                        entries.append(FolderEntry(entry.name, is_file))
+        except FileNotFoundError:
+            if not missing_ok:
+                raise
+        return cls(path, entries)
+
+    def names(self) -> List[str]:
+        """フォルダ内の全ての項目名（サブフォルダを含む）"""
+        with self._lock:
+            return list(self._entries)
+
+    def file_names(self, extension: Optional[str] = None) -> List[str]:
+        """
+        ファイル名の一覧を返す
+
+        Args:
+            extension: 指定した場合はその拡張子のファイルだけを返す
+        """
+        with self._lock:
+            return [name for name, entry in self._entries.items()
+                    if entry.is_file and (extension is None or name.endswith(extension))]
+
+    def files(self, extension: Optional[str] = None) -> List[FolderEntry]:
+        """
+        ファイルの項目を返す
+
+        Args:
+            extension: 指定した場合はその拡張子のファイルだけを返す
+        """
+        with self._lock:
+            return [entry for name, entry in self._entries.items()
+                    if entry.is_file and (extension is None or name.endswith(extension))]
+
+    def stats(self) -> Dict[str, Tuple[int, int]]:
+        """ファイル名 -> (サイズ, 更新日時) の辞書を返す"""
+        with self._lock:
+            return {name: (entry.size, entry.mtime_ns) for name, entry in self._entries.items() if entry.is_file}
+
+    def paths(self, extension: Optional[str] = None) -> List[str]:
+        """
+        ファイルのパスの一覧を返す
+
+        Args:
+            extension: 指定した場合はその拡張子のファイルだけを返す
+        """
+        return [os.path.join(self.path, name) for name in self.file_names(extension)]
+
+    def add(self, name: str, size: int = 0, mtime_ns: int = 0) -> None:
+        """
+        この処理で作成したファイルを追加する（フォルダを列挙し直さずに結果を最新に保つ）
+
+        Args:
+            name: ファイル名
+            size: ファイルサイズ
+            mtime_ns: 更新日時
+        """
+        with self._lock:
+            self._entries[name] = FolderEntry(name, True, size, mtime_ns)
+
+    def discard(self, name: str) -> None:
+        """
+        この処理で削除したファイルを取り除く
+
+        Args:
+            name: ファイル名
+        """
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._entries
+
+    def __iter__(self) -> Iterator[FolderEntry]:
+        with self._lock:
+            return iter(list(self._entries.values()))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,283 @@
+"""
+imgフォルダ（.txtメタデータ、画像、cammaster_seq.log）の読み出し元を定義するモジュール
+
+process_images は ImageSource を通してimgフォルダを読むため、
+通常のフォルダとタスクファイル（ZIP）を同じように扱える。
+ZipImageSource はタスクファイルを展開せず、メンバーを直接読み出す。
+"""
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, TextIO, Tuple, Union
+
+from folder_listing import FolderListing
+from task_archive import CAMMASTER_LOG_NAME, TaskArchive
+
+# コピー元の指定: ファイルパス、またはバイナリストリームを開く関数
+CopySource = Union[str, Callable[[], BinaryIO]]
+
+
+def _fingerprint(entries: Iterable[Tuple[str, int, object]]) -> str:
+    # ファイル名・サイズ・更新日時（またはCRC）からフィンガープリントを求める
+    digest = hashlib.sha1()
+    for name, size, stamp in entries:
+        digest.update(f"{name}\0{size}\0{stamp}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ImageSource:
+    """imgフォルダの読み出し元の基底クラス"""
+
+    # 表示・ログ用の場所（フォルダの場合はimgフォルダのパス）
+    location: str = ""
+
+    def list_files(self, extension: str = ".txt") -> List[str]:
+        """
+        指定した拡張子のファイル名の一覧を返す
+
+        Args:
+            extension: 拡張子（デフォルトは.txt）
+        """
+        raise NotImplementedError
+
+    def list_files_with_fingerprint(self, extension: str = ".txt") -> Tuple[List[str], str]:
+        """
+        指定した拡張子のファイル名の一覧と、その一覧のフィンガープリントを返す
+
+        フィンガープリントはファイル名・サイズ・更新日時から求めるため、
+        ファイルの追加・削除・変更があると変わる。
+
+        Args:
+            extension: 拡張子（デフォルトは.txt）
+
+        Returns:
+            (ファイル名のリスト, フィンガープリント)
+        """
+        raise NotImplementedError
+
+    def open_text(self, file_name: str) -> TextIO:
+        """imgフォルダ内のファイルをUTF-8のテキストとして開く"""
+        raise NotImplementedError
+
+    def open_binary(self, file_name: str) -> BinaryIO:
+        """imgフォルダ内のファイルをバイナリとして開く"""
+        raise NotImplementedError
+
+    def open_log(self) -> TextIO:
+        """
+        imgフォルダと同じ階層の cammaster_seq.log を開く
+
+        Raises:
+            FileNotFoundError: ログが存在しない場合
+        """
+        raise NotImplementedError
+
+    def log_stamp(self) -> Optional[Tuple]:
+        """
+        cammaster_seq.log の場所・サイズ・更新日時（タスクファイルの場合はCRC）を返す
+
+        ログの解析結果のキャッシュキーに使用する（Noneの場合はキャッシュしない）。
+
+        Raises:
+            FileNotFoundError: ログが存在しない場合
+        """
+        return None
+
+    def file_sizes(self) -> Dict[str, int]:
+        """imgフォルダ内のファイル名 -> サイズ（バイト）の辞書を返す"""
+        return {name: stat[0] for name, stat in self.file_stats().items()}
+
+    def file_stats(self) -> Dict[str, Tuple[int, object]]:
+        """
+        imgフォルダ内のファイル名 -> (サイズ, 変更検出用の値) の辞書を返す
+
+        変更検出用の値はフォルダの場合は更新日時（ナノ秒）、タスクファイルの場合はCRC。
+        """
+        raise NotImplementedError
+
+    def copy_source(self, file_name: str) -> CopySource:
+        """
+        コピーエグゼキュータに渡すコピー元を返す
+
+        Args:
+            file_name: imgフォルダ内のファイル名
+
+        Returns:
+            ファイルパス、またはバイナリストリームを開く関数
+        """
+        return lambda: self.open_binary(file_name)
+
+    def close(self) -> None:
+        """読み出し元を閉じる"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __str__(self) -> str:
+        return self.location
+
+
+class FolderImageSource(ImageSource):
+    """
+    ファイルシステム上のimgフォルダを読み出すクラス
+
+    imgフォルダは最初に必要になった時に1回だけ列挙し（FolderListing）、
+    .txtファイル一覧・フィンガープリント・画像のサイズと更新日時は同じ列挙結果から求める。
+    フォルダの変更を反映する場合は refresh() を呼ぶ。
+    """
+
+    def __init__(self, folder_path: str):
+        """
+        初期化
+
+        Args:
+            folder_path: imgフォルダのパス
+        """
+        self.folder_path = folder_path
+        self.location = folder_path
+        self._listing: Optional[FolderListing] = None
+        self._listing_lock = threading.Lock()
+
+    def listing(self) -> FolderListing:
+        """imgフォルダの列挙結果（初回のみ列挙する）"""
+        with self._listing_lock:
+            if self._listing is None:
+                self._listing = FolderListing.scan(self.folder_path)
+            return self._listing
+
+    def refresh(self) -> None:
+        """次に必要になった時にimgフォルダを列挙し直す"""
+        with self._listing_lock:
+            self._listing = None
+
+    def list_files(self, extension: str = ".txt") -> List[str]:
+        return self.listing().file_names(extension)
+
+    def list_files_with_fingerprint(self, extension: str = ".txt") -> Tuple[List[str], str]:
+        entries = self.listing().files(extension)
+        return ([entry.name for entry in entries],
+                _fingerprint((entry.name, entry.size, entry.mtime_ns) for entry in entries))
+
+    def open_text(self, file_name: str) -> TextIO:
+        return open(os.path.join(self.folder_path, file_name), 'r', encoding='utf-8')
+
+    def open_binary(self, file_name: str) -> BinaryIO:
+        return open(os.path.join(self.folder_path, file_name), 'rb')
+
+    @property
+    def log_path(self) -> str:
+        """cammaster_seq.log のパス"""
+        return os.path.join(os.path.dirname(self.folder_path), CAMMASTER_LOG_NAME)
+
+    def open_log(self) -> TextIO:
+        return open(self.log_path, 'r', encoding='utf-8')
+
+    def log_stamp(self) -> Optional[Tuple]:
+        stat = os.stat(self.log_path)
+        return os.path.abspath(self.log_path), stat.st_size, stat.st_mtime_ns
+
+    def file_stats(self) -> Dict[str, Tuple[int, object]]:
+        # ファイルごとにstatを発行せず、列挙済みの結果を使用する
+        return self.listing().stats()
+
+    def copy_source(self, file_name: str) -> CopySource:
+        # ローカルのファイルはパスで渡し、shutil.copy で高速にコピーする
+        return os.path.join(self.folder_path, file_name)
+
+
+class ZipImageSource(ImageSource):
+    """
+    タスクファイル（ZIP）内のimgフォルダを展開せずに読み出すクラス
+
+    ZipFileはスレッドごとに最初に読み出す時に開き、close() まで開いたままにする。
+    1つのZipFileを複数スレッドで共有すると、メンバーを開く・閉じる時のファイルの参照カウントが
+    ロックなしで更新されるため、コピーとメタデータの先読みのスレッドごとに別のZipFileを使用する。
+    """
+
+    def __init__(self, task_file: Union[str, TaskArchive]):
+        """
+        初期化
+
+        Args:
+            task_file: タスクファイルのパス、または TaskArchive
+        """
+        self.archive = task_file if isinstance(task_file, TaskArchive) else TaskArchive(task_file)
+        if self.archive.img_prefix is None:
+            raise FileNotFoundError(f"imgフォルダが見つかりませんでした: {self.archive.task_file_path}")
+        self.location = os.path.join(self.archive.task_file_path, *self.archive.img_prefix.rstrip("/").split("/"))
+        self._local = threading.local()
+        # 全てのスレッドで開いたZipFile（close() で閉じる）
+        self._zips: List[zipfile.ZipFile] = []
+        self._lock = threading.Lock()
+
+    def _zip_file(self) -> zipfile.ZipFile:
+        zip_file = getattr(self._local, "zip", None)
+        # close() で閉じられた場合（fp が None）は開き直す
+        if zip_file is None or zip_file.fp is None:
+            zip_file = zipfile.ZipFile(self.archive.task_file_path, "r")
+            self._local.zip = zip_file
+            with self._lock:
+                self._zips.append(zip_file)
+        return zip_file
+
+    def _open_member(self, member: str) -> BinaryIO:
+        info = self.archive.member_info(member)
+        if info is None:
+            raise FileNotFoundError(f"{member} がタスクファイル内に見つかりませんでした")
+        return self._zip_file().open(info, "r")
+
+    def list_files(self, extension: str = ".txt") -> List[str]:
+        return self.archive.img_member_names(extension)
+
+    def list_files_with_fingerprint(self, extension: str = ".txt") -> Tuple[List[str], str]:
+        names = self.archive.img_member_names(extension)
+        entries = []
+        for name in names:
+            info = self.archive.member_info(f"{self.archive.img_prefix}{name}")
+            entries.append((name, info.file_size, info.CRC))
+        return names, _fingerprint(entries)
+
+    def open_text(self, file_name: str) -> TextIO:
+        return io.TextIOWrapper(self.open_binary(file_name), encoding='utf-8')
+
+    def open_binary(self, file_name: str) -> BinaryIO:
+        return self._open_member(f"{self.archive.img_prefix}{file_name}")
+
+    def open_log(self) -> TextIO:
+        if self.archive.log_member is None:
+            raise FileNotFoundError(f"{CAMMASTER_LOG_NAME} がタスクファイル内に見つかりませんでした")
+        return io.TextIOWrapper(self._open_member(self.archive.log_member), encoding='utf-8')
+
+    def log_stamp(self) -> Optional[Tuple]:
+        if self.archive.log_member is None:
+            raise FileNotFoundError(f"{CAMMASTER_LOG_NAME} がタスクファイル内に見つかりませんでした")
+        info = self.archive.member_info(self.archive.log_member)
+        return os.path.abspath(self.archive.task_file_path), self.archive.log_member, info.file_size, info.CRC
+
+    def file_stats(self) -> Dict[str, Tuple[int, object]]:
+        # 中央ディレクトリの展開後サイズとCRCを使用する
+        return self.archive.file_stats(self.archive.img_member_names())
+
+    def close(self) -> None:
+        with self._lock:
+            zips, self._zips = self._zips, []
+        for zip_file in zips:
+            zip_file.close()
+
+
+def as_image_source(source: Union[str, ImageSource]) -> ImageSource:
+    """
+    imgフォルダのパスまたは ImageSource を ImageSource に変換する
+
+    Args:
+        source: imgフォルダのパス、または ImageSource
+    """
+    if isinstance(source, ImageSource):
+        return source
+    return FolderImageSource(source)
@@ -0,0 +1,90 @@
+"""
+BMP画像をJPEGに変換する処理を定義するモジュール
+
+画像の保存時にJPEGに変換する場合（process_images の jpeg_quality）は、コピーのスレッドから
+transcode_bmp_to_jpeg を呼び出す（PillowはJPEGエンコード中にGILを解放するため、スレッドで並列に変換できる）。
+convert_files は保存済みのBMPファイルをまとめて変換する。
+"""
+import logging
+import os
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def transcode_bmp_to_jpeg(src, dst: str, quality: int) -> None:
+    """
+    BMP画像を読み込み、JPEGとして保存する
+
+    Args:
+        src: BMPファイルのパス（またはバイナリモードのファイルオブジェクト）
+        dst: 保存先JPEGファイルのパス
+        quality: JPEG保存時の圧縮率（1～100）
+    """
+    with Image.open(src) as img:
+        img = img.convert("RGB")  # JPEGはRGBモードをサポート
+        img.save(dst, "JPEG", quality=quality)
+
+
+def convert_bmp_file(bmp_path: str, quality: int) -> Optional[str]:
+    """
+    BMPファイルを同じフォルダにJPEGとして保存し、元のBMPファイルを削除する
+
+    Args:
+        bmp_path: BMPファイルのパス
+        quality: JPEG保存時の圧縮率（1～100）
+
+    Returns:
+        BMPファイルの削除に失敗した場合はエラーメッセージ、成功した場合はNone
+    """
+    jpg_path = os.path.splitext(bmp_path)[0] + ".jpg"
+    transcode_bmp_to_jpeg(bmp_path, jpg_path, quality)
+    try:
+        os.unlink(bmp_path)
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def convert_files(
+    bmp_paths: Sequence[str],
+    quality: int,
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+) -> Tuple[List[str], List[Tuple[str, BaseException]], bool]:
+    """
+    複数のBMPファイルをJPEGに変換する
+
+    変換が完了するたびに progress_callback を呼び出す。cancel_check がTrueを返すと
+    残りのファイルを変換せずに戻る。
+
+    Args:
+        bmp_paths: BMPファイルのパスのリスト
+        quality: JPEG保存時の圧縮率（1～100）
+        progress_callback: 進捗を報告するコールバック関数 (current, total, message) -> None
+        cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+
+    Returns:
+        (変換したBMPファイルのパスのリスト, (パス, 例外) のリスト, キャンセルされたかどうか)
+    """
+    total_files = len(bmp_paths)
+    converted: List[str] = []
+    errors: List[Tuple[str, BaseException]] = []
+    for path in bmp_paths:
+        if cancel_check and cancel_check():
+            return converted, errors, True
+        name = os.path.basename(path)
+        try:
+            delete_error = convert_bmp_file(path, quality)
+        except Exception as e:
+            logger.error("変換エラー (%s): %s", name, e)
+            errors.append((path, e))
+        else:
+            converted.append(path)
+            if delete_error:
+                logger.warning("BMPファイルを削除できませんでした (%s): %s", name, delete_error)
+        if progress_callback:
+            progress_callback(len(converted) + len(errors), total_files, f"圧縮中: {name}")
+    return converted, errors, False
@@ -1,23 +1,30 @@
 import flet as ft
 import os
 import sys
-from PIL import Image
-import shutil
-import zipfile
 import json
+import logging
 import threading
-import traceback
 import time
 import asyncio
-import re
 from datetime import datetime
 import save_task_images_CamNum_selection
+from folder_listing import FolderListing
+from export_telemetry import ExportTelemetry, format_telemetry
+from progress_channel import ProgressChannel
+from run_report import RunReport
+from app_logging import default_log_path, setup_logging
+from image_source import ZipImageSource, as_image_source
+from export_journal import JOURNAL_FILE_NAME
+from filename_template import compile_template
 from collections import defaultdict
 
 # tkinterのfiledialogを使用
 import tkinter as tk
 from tkinter import filedialog
 
+# スクリプトとして実行した場合も同じロガー名を使用する（モジュールごとのレベル指定のため）
+logger = logging.getLogger("main_save_task_images_flet")
+
 # スクリプトの実行ディレクトリを取得
 script_dir = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE = os.path.join(script_dir, "共有VTVフォルダパス.json")
@@ -27,7 +34,7 @@ def load_config():
     """設定を読み込む関数"""
     if os.path.exists(CONFIG_FILE):
         with open(CONFIG_FILE, "r") as file:
-            print("Config file is loaded to:", os.path.abspath(CONFIG_FILE))
+            logger.info("Config file is loaded to: %s", os.path.abspath(CONFIG_FILE))
             return json.load(file)
     return {}
 
@@ -35,7 +42,7 @@ def load_config():
 def save_config(config):
     """設定を保存する関数"""
     with open(CONFIG_FILE, "w") as file:
-        print("Config file will be saved to:", os.path.abspath(CONFIG_FILE))
+        logger.info("Config file will be saved to: %s", os.path.abspath(CONFIG_FILE))
         json.dump(config, file, indent=4)
 
 
@@ -47,55 +54,6 @@ def format_value(value):
         return "00"
 
 
-def convert_bmp_to_jpeg(folder, quality=85, progress_callback=None, cancel_check=None):
-    """
-    指定フォルダ内のBMPファイルをJPEGに変換し、元のBMPファイルを削除する関数。
-    
-    Args:
-        progress_callback: 進捗を報告するコールバック関数 (current, total, message) -> None
-        cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
-    """
-    if not os.path.exists(folder):
-        print(f"Folder '{folder}' does not exist. No files were converted.")
-        return
-
-    # BMPファイルのリストを取得
-    bmp_files = [f for f in os.listdir(folder) if f.endswith(".bmp")]
-    total_files = len(bmp_files)
-    
-    for i, filename in enumerate(bmp_files):
-        # キャンセルチェック
-        if cancel_check and cancel_check():
-            print("圧縮処理がキャンセルされました")
-            if progress_callback:
-                progress_callback(i, total_files, "キャンセルされました")
-            return
-        
-        if progress_callback:
-            progress_callback(i, total_files, f"圧縮中: {filename}")
-            
-        bmp_path = os.path.join(folder, filename)
-        jpg_filename = filename.replace(".bmp", ".jpg")
-        jpg_path = os.path.join(folder, jpg_filename)
-
-        with Image.open(bmp_path) as img:
-            img = img.convert("RGB")
-            img.save(jpg_path, "JPEG", quality=quality)
-
-        print(f"Converted {filename} to {jpg_filename} with quality={quality}")
-
-        try:
-            os.unlink(bmp_path)
-            print(f"Deleted original BMP file: {filename}")
-        except Exception as e:
-            print(f"Failed to delete {filename}: {e}")
-
-    if progress_callback:
-        progress_callback(total_files, total_files, "圧縮完了")
-        
-    print("Conversion completed!")
-
-
 def select_folder_dialog():
     """tkinterでフォルダ選択ダイアログを表示"""
     root = tk.Tk()
@@ -179,6 +137,7 @@ def main(page: ft.Page):
     camera_mode_ref = ft.Ref[ft.RadioGroup]()
     compression_slider_ref = ft.Ref[ft.Slider]()
     compression_label_ref = ft.Ref[ft.Text]()
+    export_mode_ref = ft.Ref[ft.RadioGroup]()
     
     # ファイル名テンプレート用
     template1_ref = ft.Ref[ft.TextField]()  # コメントあり + 画像取込XX形式
@@ -414,12 +373,23 @@ def main(page: ft.Page):
             compression_label_ref.current.value = f"現在の値: {value}"
             page.update()
 
-    def show_settings_dialog(img_folder_path: str, output_folder: str):
-        """設定ダイアログを表示"""
+    def show_settings_dialog(img_folder_path, output_folder: str):
+        """
+        設定ダイアログを表示
+
+        img_folder_path: imgフォルダのパス（Option 2の場合はタスクファイルの ZipImageSource）
+        """
         
         # ダイアログを開いていることをマーク
         app_state['is_dialog_open'] = True
 
+        # imgフォルダの列挙結果をカメラ選択と保存処理で共有するため、ImageSource は1つだけ作成する
+        image_source = as_image_source(img_folder_path)
+
+        def release_image_source():
+            """タスクファイルを開いている場合は閉じる"""
+            image_source.close()
+
         # プレビュー用サンプル値（YYMMDDhhmmssSSS）
         now = datetime.now()
         preview_original_default = f"{now.strftime('%y%m%d%H%M%S')}{now.microsecond // 1000:03d}"
@@ -428,20 +398,20 @@ def main(page: ft.Page):
         progress_bar_ref = ft.Ref[ft.ProgressBar]()
         progress_text_ref = ft.Ref[ft.Text]()
         progress_detail_ref = ft.Ref[ft.Text]()
+        progress_rate_ref = ft.Ref[ft.Text]()
         progress_dialog_ref = ft.Ref[ft.AlertDialog]()
         
         # 処理状態を管理
         processing_state = {
             'is_processing': False,
-            'current': 0,
-            'total': 0,
-            'message': '準備中...',
+            'progress': ProgressChannel('準備中...'),  # 処理スレッドからの進捗（ProgressChannel）
             'completed': False,
             'error': None,
             'started': False,  # 重複実行防止フラグ
             'cancelled': False,  # キャンセルフラグ
             'created_files': [],  # 処理中に作成されたファイルのリスト
-            'output_folder': ''  # 出力フォルダパス
+            'output_folder': '',  # 出力フォルダパス
+            'output_listing': None,  # 出力フォルダの列挙結果（処理中に作成したファイルを追加する）
         }
         
         def show_progress_dialog():
@@ -450,8 +420,8 @@ def main(page: ft.Page):
             def on_cancel_click(e):
                 """キャンセルボタンクリック時の処理"""
                 processing_state['cancelled'] = True
-                processing_state['message'] = 'キャンセル中...'
-                print("キャンセルボタンがクリックされました")
+                processing_state['progress'].set_message('キャンセル中...')
+                logger.info("キャンセルボタンがクリックされました")
                 # ボタンを無効化
                 if e.control:
                     e.control.disabled = True
@@ -485,6 +455,13 @@ def main(page: ft.Page):
                             size=11,
                             color=ft.Colors.GREY_600,
                         ),
+                        # 読み込み・圧縮の処理速度と残り時間（共有フォルダとJPEG圧縮のどちらが遅いかを表示）
+                        ft.Text(
+                            ref=progress_rate_ref,
+                            value="",
+                            size=11,
+                            color=ft.Colors.GREY_600,
+                        ),
                     ],
                     horizontal_alignment=ft.CrossAxisAlignment.CENTER,
                     ),
@@ -505,23 +482,17 @@ def main(page: ft.Page):
             page.update()
             return progress_dialog
         
-        def update_progress_ui():
+        def update_progress_ui(snapshot):
             """UIを更新する"""
             try:
                 if progress_bar_ref.current and progress_text_ref.current and progress_detail_ref.current:
-                    progress = processing_state['current'] / processing_state['total'] if processing_state['total'] > 0 else 0
-                    progress_bar_ref.current.value = progress
-                    progress_text_ref.current.value = processing_state['message']
-                    progress_detail_ref.current.value = f"{processing_state['current']} / {processing_state['total']} ファイル"
+                    progress_bar_ref.current.value = snapshot.fraction
+                    progress_text_ref.current.value = snapshot.message
+                    progress_detail_ref.current.value = f"{snapshot.current} / {snapshot.total} ファイル"
+                if progress_rate_ref.current and snapshot.telemetry is not None:
+                    progress_rate_ref.current.value = format_telemetry(snapshot.telemetry)
             except Exception as e:
-                print(f"UI更新エラー: {e}")
-        
-        def update_progress(current, total, message):
-            """進捗を更新（別スレッドから呼び出される）"""
-            processing_state['current'] = current
-            processing_state['total'] = total
-            processing_state['message'] = message
-            print(f"進捗: {current}/{total} - {message}")
+                logger.warning("UI更新エラー: %s", e)
         
         def close_progress_dialog():
             """進捗ダイアログを閉じる"""
@@ -530,7 +501,7 @@ def main(page: ft.Page):
                 if progress_dialog_ref.current:
                     progress_dialog_ref.current.open = False
             except Exception as e:
-                print(f"ダイアログ閉じエラー: {e}")
+                logger.warning("ダイアログ閉じエラー: %s", e)
         
         def show_cancel_confirm_dialog(created_files, output_folder_path):
             """キャンセル時の確認ダイアログを表示"""
@@ -548,9 +519,9 @@ def main(page: ft.Page):
                         if os.path.exists(file_path):
                             os.unlink(file_path)
                             deleted_count += 1
-                            print(f"削除: {filename}")
+                            logger.info("削除: %s", filename)
                     except Exception as ex:
-                        print(f"削除失敗: {filename} - {ex}")
+                        logger.warning("削除失敗: %s - %s", filename, ex)
                 
                 show_message_dialog("キャンセル完了", f"処理がキャンセルされました。\n{deleted_count}件のファイルを削除しました。")
             
@@ -594,40 +565,24 @@ def main(page: ft.Page):
         
         async def progress_monitor_async():
             """進捗を監視してUIを更新する(非同期版)"""
-            print("監視タスク開始")
-            loop_count = 0
+            logger.debug("監視タスク開始")
             
-            # 処理が完了するまでUIを更新し続ける
-            while True:
-                update_progress_ui()
+            # 進捗が変わった時だけUIを更新する（処理スレッドが終了するとループを抜ける）
+            stage = None
+            async for snapshot in processing_state['progress'].updates(min_interval=0.1):
+                update_progress_ui(snapshot)
                 page.update()
-                loop_count += 1
-                
-                # 5回ごとに状態をログ出力
-                if loop_count % 5 == 0:
-                    print(f"監視タスク: ループ{loop_count}回目 - is_processing={processing_state['is_processing']}, completed={processing_state['completed']}, error={processing_state['error']}")
-                
-                # 処理が完了、エラー、またはキャンセルの場合、ループを抜ける
-                if not processing_state['is_processing']:
-                    print(f"監視タスク: is_processing=False を検知 - completed={processing_state['completed']}, error={processing_state['error']}, cancelled={processing_state['cancelled']}")
-                    if processing_state['completed'] or processing_state['error'] or processing_state['cancelled']:
-                        print("監視タスク: ループを抜けます")
-                        break
-                    else:
-                        print("監視タスク: completedもerrorもcancelledも設定されていないため、待機を継続")
-                
-                await asyncio.sleep(0.1)  # 100msごとにUIを更新
-            
-            print("監視タスク: 処理完了を検知、最終処理開始")
+                if snapshot.stage != stage:
+                    stage = snapshot.stage
+                    logger.info("進捗: %d/%d - %s", snapshot.current, snapshot.total, snapshot.message)
             
-            # 処理完了後の最終更新
-            update_progress_ui()
-            page.update()
+            logger.debug("監視タスク: 処理終了を検知 - completed=%s, error=%s, cancelled=%s",
+                         processing_state['completed'], processing_state['error'], processing_state['cancelled'])
             await asyncio.sleep(0.2)
             
             # 完了/エラー/キャンセル処理
             if processing_state['cancelled']:
-                print("監視タスク: キャンセル処理")
+                logger.debug("監視タスク: キャンセル処理")
                 close_progress_dialog()
                 page.update()
                 
@@ -635,17 +590,17 @@ def main(page: ft.Page):
                 created_files = processing_state.get('created_files', [])
                 output_folder_path = processing_state.get('output_folder', '')
                 if created_files and output_folder_path:
-                    print(f"作成されたファイル: {len(created_files)}件 - 確認ダイアログを表示")
+                    logger.info("作成されたファイル: %d件 - 確認ダイアログを表示", len(created_files))
                     show_cancel_confirm_dialog(created_files, output_folder_path)
                 else:
                     show_message_dialog("キャンセル", "処理がキャンセルされました。")
             elif processing_state['error']:
-                print(f"監視タスク: エラー処理 - {processing_state['error']}")
+                logger.debug("監視タスク: エラー処理 - %s", processing_state['error'])
                 close_progress_dialog()
                 page.update()
                 show_message_dialog("エラー", f"処理中にエラーが発生しました:\n{processing_state['error']}")
             elif processing_state['completed']:
-                print("監視タスク: 完了処理")
+                logger.debug("監視タスク: 完了処理")
                 close_progress_dialog()
                 page.update()
                 show_success_dialog(processing_state.get('output_folder', ''))
@@ -653,14 +608,18 @@ def main(page: ft.Page):
             # 次回の実行を許可するためにフラグをリセット
             processing_state['started'] = False
             app_state['is_dialog_open'] = False
-            print("監視タスク終了")
+            logger.debug("監視タスク終了")
         
-        def execute_image_processing(save_mode, save_cam, compression, selected_cam_list=None, filename_templates=None):
-            """画像処理を実行"""
+        def execute_image_processing(save_mode, save_cam, compression, selected_cam_list=None, filename_templates=None, export_mode="normal", task_scan=None):
+            """
+            画像処理を実行
+
+            task_scan: カメラ選択ダイアログで作成した TaskScan（フォルダの列挙などを再利用する）
+            """
             
             # 重複実行を防止
             if processing_state['started']:
-                print("警告: 処理は既に開始されています。重複実行をスキップします。")
+                logger.warning("処理は既に開始されています。重複実行をスキップします。")
                 return
             processing_state['started'] = True
             
@@ -678,69 +637,75 @@ def main(page: ft.Page):
             
             def run_processing():
                 """別スレッドで画像処理を実行"""
-                print(f"処理スレッド開始: img_folder={img_folder_path}, output={output_folder}")
+                logger.info("処理スレッド開始: img_folder=%s, output=%s", img_folder_path, output_folder)
+                # 圧縮する場合はコピー時にJPEGへ直接変換する（BMPを出力フォルダに書き出さない）
+                jpeg_quality = compression if 0 < compression < 100 else None
+                # 処理時間と件数を記録し、終了時に出力フォルダへ実行レポートとして保存する
+                report = RunReport(source=img_folder_path, output_folder=output_folder, save_mode=save_mode,
+                                   save_cam=save_cam, jpeg_quality=jpeg_quality, export_mode=export_mode)
                 try:
                     # 画像処理を実行（事前選択されたカメラリストとテンプレートを渡す）
-                    save_task_images_CamNum_selection.process_images(
-                        img_folder_path, output_folder, save_mode, save_cam, 
-                        preselected_cam_list=selected_cam_list,
-                        progress_callback=update_progress,
-                        filename_templates=filename_templates,
-                        cancel_check=check_cancelled
-                    )
+                    with report.span("export"):
+                        save_task_images_CamNum_selection.process_images(
+                            image_source, output_folder, save_mode, save_cam, 
+                            preselected_cam_list=selected_cam_list,
+                            progress_callback=processing_state['progress'],
+                            filename_templates=filename_templates,
+                            cancel_check=check_cancelled,
+                            jpeg_quality=jpeg_quality,
+                            resume=export_mode == "resume",
+                            sync=export_mode == "sync",
+                            task_scan=task_scan,
+                            output_listing=processing_state['output_listing'],
+                            telemetry=processing_state['progress'].telemetry,
+                            report=report,
+                        )
                     
                     # キャンセルされた場合は完了フラグを立てない
                     if processing_state['cancelled']:
-                        print("処理スレッド: キャンセルされました")
+                        logger.info("処理スレッド: キャンセルされました")
                         return
                     
-                    print("画像処理完了")
-
-                    # 圧縮処理
-                    if 0 < compression < 100:
-                        print("圧縮処理開始")
-                        convert_bmp_to_jpeg(output_folder, compression, progress_callback=update_progress, cancel_check=check_cancelled)
-                        
-                        # キャンセルされた場合は完了フラグを立てない
-                        if processing_state['cancelled']:
-                            print("処理スレッド: 圧縮中にキャンセルされました")
-                            return
-                        
-                        print("圧縮処理完了")
+                    logger.info("画像処理完了")
                     
-                    print("処理スレッド: completed = True を設定")
+                    logger.debug("処理スレッド: completed = True を設定")
                     processing_state['completed'] = True
                     
                 except Exception as ex:
                     # キャンセルによる例外は無視
                     if processing_state['cancelled']:
-                        print("処理スレッド: キャンセルによる中断")
+                        logger.info("処理スレッド: キャンセルによる中断")
                         return
                     
-                    # エラーの詳細をコンソールに出力
-                    print("=" * 50)
-                    print("エラーが発生しました:")
-                    traceback.print_exc()
-                    print("=" * 50)
+                    # エラーの詳細（トレースバック）をログに出力
+                    logger.exception("エラーが発生しました")
                     
                     processing_state['error'] = f"{type(ex).__name__}: {ex}"
                 
                 finally:
-                    # 新しく作成されたファイルを特定
-                    if os.path.exists(output_folder):
-                        current_files = set(os.listdir(output_folder))
-                        new_files = current_files - processing_state.get('existing_files', set())
-                        processing_state['created_files'] = list(new_files)
-                        print(f"新しく作成されたファイル: {len(new_files)}件")
+                    release_image_source()
+
+                    result = ("cancelled" if processing_state['cancelled'] else
+                              "error" if processing_state['error'] else "ok")
+                    report.set_info(result=result, error=processing_state['error'])
+                    report.add_telemetry(processing_state['progress'].telemetry.snapshot())
+                    report.write_to(output_folder)
+
+                    # 新しく作成されたファイルを特定（処理中に追加された列挙結果を使用し、出力フォルダは列挙し直さない）
+                    current_files = set(processing_state['output_listing'].names())
+                    new_files = current_files - processing_state.get('existing_files', set()) - {JOURNAL_FILE_NAME}
+                    processing_state['created_files'] = list(new_files)
+                    logger.info("新しく作成されたファイル: %d件", len(new_files))
                     
-                    print(f"処理スレッド終了: completed={processing_state['completed']}, error={processing_state['error']}, cancelled={processing_state['cancelled']}")
+                    logger.debug("処理スレッド終了: completed=%s, error=%s, cancelled=%s",
+                                 processing_state['completed'], processing_state['error'], processing_state['cancelled'])
                     processing_state['is_processing'] = False
+                    # 監視タスクに終了を通知する
+                    processing_state['progress'].close()
             
             # 状態を初期化
             processing_state['is_processing'] = True
-            processing_state['current'] = 0
-            processing_state['total'] = 0
-            processing_state['message'] = '準備中...'
+            processing_state['progress'] = ProgressChannel('準備中...', telemetry=ExportTelemetry())
             processing_state['completed'] = False
             processing_state['error'] = None
             processing_state['cancelled'] = False
@@ -748,11 +713,10 @@ def main(page: ft.Page):
             processing_state['output_folder'] = output_folder
             # started はここではリセットしない（重複防止のため）
             
-            # 処理開始前の既存ファイルリストを記録
-            existing_files = set()
-            if os.path.exists(output_folder):
-                existing_files = set(os.listdir(output_folder))
-            processing_state['existing_files'] = existing_files
+            # 処理開始前の既存ファイルリストを記録（ファイル名の衝突判定にも同じ列挙結果を使用する）
+            output_listing = FolderListing.scan(output_folder, with_stats=False, missing_ok=True)
+            processing_state['output_listing'] = output_listing
+            processing_state['existing_files'] = set(output_listing.names())
             
             # 進捗ダイアログを表示
             show_progress_dialog()
@@ -763,10 +727,11 @@ def main(page: ft.Page):
             # 非同期で進捗監視タスクを実行（メインスレッドでUI更新）
             page.run_task(progress_monitor_async)
         
-        def show_camera_selection_dialog(save_mode, compression, filename_templates):
+        def show_camera_selection_dialog(save_mode, compression, filename_templates, export_mode="normal"):
             """カメラ選択ダイアログを表示"""
-            # カメラリストを取得
-            camera_arrays = save_task_images_CamNum_selection.get_camera_list(img_folder_path)
+            # imgフォルダを調べてカメラリストを取得（結果は保存処理でも使用する）
+            task_scan = save_task_images_CamNum_selection.scan_task(image_source)
+            camera_arrays = task_scan.camera_list
             
             if not camera_arrays:
                 show_message_dialog("エラー", "カメラリストを取得できませんでした。")
@@ -810,9 +775,10 @@ def main(page: ft.Page):
                         result_list.append([i + 1, item])
                 camera_dialog.open = False
                 page.update()
-                execute_image_processing(save_mode, "1", compression, result_list, filename_templates=filename_templates)
+                execute_image_processing(save_mode, "1", compression, result_list, filename_templates=filename_templates, export_mode=export_mode, task_scan=task_scan)
             
             def on_camera_cancel(e):
+                release_image_source()
                 camera_dialog.open = False
                 app_state['is_dialog_open'] = False
                 page.update()
@@ -869,16 +835,11 @@ def main(page: ft.Page):
             camera_dialog.open = True
             page.update()
         
-        allowed_placeholders = {"comment", "tool", "original", "cam", "div", "index"}
-        placeholder_pattern = re.compile(r"\{([a-zA-Z0-9_]+)(?::[^{}]+)?\}")
-
         def extract_unknown_placeholders(template: str):
             """未対応プレースホルダーを抽出（{name} / {name:03} 形式対応）"""
             if not template:
                 return []
-            names = {m.group(1) for m in placeholder_pattern.finditer(str(template))}
-            unknown = sorted([n for n in names if n not in allowed_placeholders])
-            return unknown
+            return compile_template(template).unknown_placeholders
 
         def _parse_int_from_textfield(tf: ft.TextField, default_value: int):
             """TextFieldからintを取得。不正ならerror_textを出してデフォルトにフォールバック。"""
@@ -915,8 +876,7 @@ def main(page: ft.Page):
 
             # 実処理と同じ置換ロジックを使用
             try:
-                return save_task_images_CamNum_selection.apply_filename_template(
-                    template=template or "",
+                return compile_template(template or "").render(
                     comment=comment_value,
                     tool_comment=tool_value,
                     original_name=sample_original,
@@ -967,6 +927,7 @@ def main(page: ft.Page):
             save_mode = save_mode_ref.current.value
             save_cam = camera_mode_ref.current.value
             compression = int(compression_slider_ref.current.value)
+            export_mode = export_mode_ref.current.value if export_mode_ref.current else "normal"
             
             # ファイル名テンプレートを取得
             filename_templates = {
@@ -980,13 +941,14 @@ def main(page: ft.Page):
 
             if save_cam == "1":
                 # カメラ選択ダイアログを表示
-                show_camera_selection_dialog(save_mode, compression, filename_templates)
+                show_camera_selection_dialog(save_mode, compression, filename_templates, export_mode=export_mode)
             else:
                 # 全てのカメラを保存
-                execute_image_processing(save_mode, save_cam, compression, filename_templates=filename_templates)
+                execute_image_processing(save_mode, save_cam, compression, filename_templates=filename_templates, export_mode=export_mode)
 
         def on_settings_cancel(e):
             """設定ダイアログキャンセル"""
+            release_image_source()
             settings_dialog.open = False
             app_state['is_dialog_open'] = False
             page.update()
@@ -1069,6 +1031,26 @@ def main(page: ft.Page):
                     ),
                     ft.Container(height=8),
 
+                    # 保存方法（通常 / 中断した保存の再開 / 差分同期）
+                    ft.Text("保存方法", size=13, weight=ft.FontWeight.W_500),
+                    ft.Container(
+                        bgcolor=ft.Colors.GREY_50,
+                        padding=10,
+                        border_radius=8,
+                        content=ft.RadioGroup(
+                            ref=export_mode_ref,
+                            value="normal",
+                            content=ft.Column([
+                                ft.Radio(value="normal", label="全て保存"),
+                                ft.Radio(value="resume", label="中断した保存の続きから再開（保存済みの画像はスキップ）"),
+                                ft.Radio(value="sync", label="前回から追加・変更された画像のみ保存"),
+                            ],
+                            spacing=2,
+                            ),
+                        ),
+                    ),
+                    ft.Container(height=8),
+
                     # 出力ファイル名テンプレート
                     ft.ExpansionTile(
                         title=ft.Text("出力ファイル名テンプレート", size=13, weight=ft.FontWeight.W_500),
@@ -1291,7 +1273,7 @@ def main(page: ft.Page):
         """OKボタンクリック時の処理"""
         # 重複クリック防止
         if app_state['is_dialog_open']:
-            print("警告: ダイアログは既に開いています。重複クリックをスキップします。")
+            logger.warning("ダイアログは既に開いています。重複クリックをスキップします。")
             return
         
         option = selected_option.current.value
@@ -1375,30 +1357,13 @@ def main(page: ft.Page):
             def process_task_file():
                 """タスクファイルを処理（別スレッド）"""
                 try:
-                    update_loading_status("タスクファイルをコピー中...")
-                    copied_file_path = shutil.copy(task_file, output_folder)
-                    zip_file_path = os.path.splitext(copied_file_path)[0] + ".zip"
-                    os.rename(copied_file_path, zip_file_path)
-
-                    update_loading_status("タスクファイルを展開中...")
-                    with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
-                        zip_ref.extractall(output_folder)
-
-                    os.remove(zip_file_path)
-
-                    update_loading_status("画像フォルダを検索中...")
-                    viscotech_folder_path = os.path.join(output_folder, "viscotech")
-                    
-                    found_img_path = None
-                    for walk_root, dirs, files in os.walk(viscotech_folder_path):
-                        if "img" in dirs:
-                            found_img_path = os.path.join(walk_root, "img")
-                            break
-
-                    if not found_img_path:
+                    update_loading_status("タスクファイルを読み込み中...")
+                    # タスクファイルは展開せず、元の場所のままZIPとして開いて直接読み出す
+                    # （保存先にviscotechフォルダを作成しない）
+                    try:
+                        loading_result['img_folder_path'] = ZipImageSource(task_file)
+                    except FileNotFoundError:
                         loading_result['error'] = "imgフォルダが見つかりませんでした。"
-                    else:
-                        loading_result['img_folder_path'] = found_img_path
 
                 except Exception as ex:
                     loading_result['error'] = f"処理中にエラーが発生しました: {ex}"
@@ -1606,4 +1571,6 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    # exe化した場合はコンソールが無いため、ログファイルにも出力する
+    setup_logging(log_file=default_log_path())
     ft.app(target=main)  # Flet 0.80以降はft.app()内部でrun()が呼ばれる
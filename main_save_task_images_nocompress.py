@@ -9,6 +9,7 @@ import zipfile
 import json
 import save_task_images_CamNum_selection
 from selection_window import show_selection_window
+from app_logging import default_log_path, setup_logging
 
 # スクリプトの実行ディレクトリを取得
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -252,6 +253,10 @@ def select_folder_for_var(folder_var):
         save_config(config)
 
 
+# 保存処理のメッセージ（save_task_images_CamNum_selection などのログ）を表示する
+# exe化した場合はコンソールが無いため、ログファイルにも出力する
+setup_logging(log_file=default_log_path())
+
 # メインウィンドウの設定
 root = tk.Tk()
 root.title("タスク画像保存フロー")
@@ -0,0 +1,158 @@
+"""
+imgフォルダの.txtメタデータの解析結果をキャッシュするモジュール
+
+解析結果はSQLiteファイルに保存し、imgフォルダの場所と、.txtファイルの
+名前・サイズ・更新日時から求めたフィンガープリントをキーにする。
+同じタスクを保存モードやカメラ、テンプレートを変えて処理し直す場合は、
+.txtファイルを開かずにキャッシュから解析結果を読み出す。
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import Constants
+from metadata_parser import MetadataRecord
+
+logger = logging.getLogger(__name__)
+
+# キャッシュの形式や.txtの解析結果を変更した場合に古いキャッシュを無視するためのバージョン
+INDEX_FORMAT_VERSION = 3
+
+INDEX_FILE_NAME = "metadata_index.sqlite3"
+
+
+def default_index_path() -> Path:
+    """
+    キャッシュファイルの既定のパスを返す
+
+    Windowsでは %LOCALAPPDATA%\\TaskImageSaver、それ以外では ~/.cache/TaskImageSaver に保存する。
+    """
+    base = os.environ.get("LOCALAPPDATA")
+    if base:
+        return Path(base) / Constants.APP_CACHE_FOLDER / INDEX_FILE_NAME
+    return Path.home() / ".cache" / Constants.APP_CACHE_FOLDER / INDEX_FILE_NAME
+
+
+class MetadataIndex:
+    """.txtメタデータの解析結果をSQLiteに保存・読み出すクラス"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            db_path: キャッシュファイルのパス（Noneの場合は default_index_path()）
+        """
+        self.db_path = Path(db_path) if db_path else default_index_path()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # 接続は処理ごとに開く（GUIの処理スレッドなど複数のスレッドから使われるため）
+        connection = sqlite3.connect(str(self.db_path), timeout=5)
+        if not self._initialized:
+            with self._lock:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS metadata_index ("
+                    " location TEXT PRIMARY KEY,"
+                    " fingerprint TEXT NOT NULL,"
+                    " version INTEGER NOT NULL,"
+                    " records TEXT NOT NULL,"
+                    " updated_at REAL NOT NULL)"
+                )
+                connection.commit()
+                self._initialized = True
+        return connection
+
+    def load(self, location: str, fingerprint: str) -> Optional[Dict[str, MetadataRecord]]:
+        """
+        キャッシュされた解析結果を読み出す
+
+        Args:
+            location: imgフォルダの場所
+            fingerprint: .txtファイル一覧のフィンガープリント
+
+        Returns:
+            .txtファイル名 -> MetadataRecord の辞書（キャッシュが無い・古い場合はNone）
+        """
+        if not self.db_path.exists():
+            return None
+        try:
+            connection = self._connect()
+            try:
+                row = connection.execute(
+                    "SELECT fingerprint, version, records FROM metadata_index WHERE location = ?",
+                    (location,),
+                ).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.warning("メタデータキャッシュの読み込みエラー: %s", e)
+            return None
+        if row is None or row[0] != fingerprint or row[1] != INDEX_FORMAT_VERSION:
+            return None
+        return {name: MetadataRecord.from_dict(data) for name, data in json.loads(row[2]).items()}
+
+    def save(self, location: str, fingerprint: str, records: Dict[str, MetadataRecord]) -> None:
+        """
+        解析結果を保存する（同じ場所の古いキャッシュは置き換える）
+
+        Args:
+            location: imgフォルダの場所
+            fingerprint: .txtファイル一覧のフィンガープリント
+            records: .txtファイル名 -> MetadataRecord の辞書
+        """
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = self._connect()
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO metadata_index (location, fingerprint, version, records, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (location, fingerprint, INDEX_FORMAT_VERSION,
+                     json.dumps({name: record.to_dict() for name, record in records.items()}, ensure_ascii=False), time.time()),
+                )
+                connection.commit()
+            finally:
+                connection.close()
+        except (sqlite3.Error, OSError) as e:
+            # キャッシュに保存できなくても処理は継続する
+            logger.warning("メタデータキャッシュの保存エラー: %s", e)
+
+    def invalidate(self, location: Optional[str] = None) -> None:
+        """
+        キャッシュを削除する
+
+        Args:
+            location: 削除するimgフォルダの場所（Noneの場合は全て削除）
+        """
+        if not self.db_path.exists():
+            return
+        try:
+            connection = self._connect()
+            try:
+                if location is None:
+                    connection.execute("DELETE FROM metadata_index")
+                else:
+                    connection.execute("DELETE FROM metadata_index WHERE location = ?", (location,))
+                connection.commit()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.warning("メタデータキャッシュの削除エラー: %s", e)
+
+
+_default_index: Optional[MetadataIndex] = None
+
+
+def get_default_index() -> MetadataIndex:
+    """アプリケーション共通のキャッシュを返す"""
+    global _default_index
+    if _default_index is None:
+        _default_index = MetadataIndex()
+    return _default_index
@@ -0,0 +1,166 @@
+"""
+imgフォルダの.txtメタデータを解析するモジュール
+
+.txtファイルは "キー=値" 形式の行で構成される。ファイルの内容を1回だけ走査し、
+行頭のキーで処理を振り分けるため、行ごとに複数の部分文字列検索や置換を行わない。
+
+    Comment=コメント
+    Locked=1
+    CAM1.DIV1=...
+    FILE=1_1_240101000000.bmp
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+# 各行の先頭のキーで振り分ける
+#   グループ1, 2: FILE= / Comment= / Locked= のキーと値
+#   グループ3, 4: CAMx.DIVy 形式のカメラ番号とDIV番号
+#   グループ5   : その他の行頭から "=" までに .DIV を含む行
+# 対象外の行は正規表現エンジン内で読み飛ばすため、Pythonのループは対象の行数分だけになる
+# "=" の後ろに .DIV がある行は parse_metadata_text で .DIV の数を比べて検出する
+_TOKEN_PATTERN = re.compile(
+    r"\n[ \t]*(?:(FILE|Comment|Locked)[ \t]*=([^\r\n]*)"
+    r"|CAM(\d+)\.DIV(\d+)"
+    r"|([^\r\n=]*\.DIV[^\r\n]*))"
+)
+_NUMBER_PATTERN = re.compile(r"\d+")
+_DIV_MARKER = ".DIV"
+_BOM = "\ufeff"
+
+
+@dataclass
+class MetadataRecord:
+    """1つの.txtファイルの解析結果"""
+
+    comment: Optional[str] = None     # 画像コメント（Comment=が無い場合はNone）
+    lock_mode: Optional[str] = None   # ロック状態（Locked=の値、無い場合はNone）
+    files: List[str] = field(default_factory=list)           # FILE=の画像ファイル名
+    cam_divs: List[Tuple[int, ...]] = field(default_factory=list)  # .DIV行のカメラ番号とDIV番号
+
+    @property
+    def locked(self) -> bool:
+        """ロックされているかどうか"""
+        return self.lock_mode == "1"
+
+    def to_dict(self) -> dict:
+        """キャッシュ保存用の辞書に変換する"""
+        return {
+            "comment": self.comment,
+            "lockMode": self.lock_mode,
+            "files": self.files,
+            "divs": [list(cam_div) for cam_div in self.cam_divs],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MetadataRecord":
+        """to_dict で変換した辞書から復元する"""
+        return cls(
+            comment=data.get("comment"),
+            lock_mode=data.get("lockMode"),
+            files=list(data.get("files", [])),
+            cam_divs=[tuple(cam_div) for cam_div in data.get("divs", [])],
+        )
+
+
+def parse_cam_div(text: str) -> Tuple[int, ...]:
+    """
+    文字列に含まれる最初の2つの数値（カメラ番号とDIV番号）を返す
+
+    Args:
+        text: .DIV行、または画像ファイル名（例: "CAM1.DIV2=..."、"1_2_xxx.bmp"）
+    """
+    return tuple(int(num) for num in _NUMBER_PATTERN.findall(text)[:2])
+
+
+def parse_file_cam_div(file_name: str) -> Tuple[int, ...]:
+    """
+    画像ファイル名（"カメラ番号_DIV番号_xxx.bmp"）からカメラ番号とDIV番号を返す
+
+    通常の形式は正規表現を使わずに分割し、それ以外の形式は parse_cam_div と同じ結果を返す。
+
+    Args:
+        file_name: 画像ファイル名（例: "1_2_240101000000.bmp"）
+    """
+    parts = file_name.split("_", 2)
+    if len(parts) == 3 and parts[0].isdecimal() and parts[1].isdecimal():
+        return int(parts[0]), int(parts[1])
+    return parse_cam_div(file_name)
+
+
+def parse_metadata_text(text: str) -> MetadataRecord:
+    """
+    .txtメタデータの内容を解析する
+
+    Comment= と Locked= が複数ある場合は最後の値を使用する。
+    .DIV は従来の判定と同じく行のどこにあってもカメラ番号とDIV番号の行として扱う。
+    先頭のBOMは取り除く（BOM付きで保存された.txtでも最初の行のキーを認識する）。
+
+    Args:
+        text: .txtファイルの内容
+
+    Returns:
+        MetadataRecord
+    """
+    if text.startswith(_BOM):
+        text = text[1:]
+    record = MetadataRecord()
+    files = record.files
+    cam_divs = record.cam_divs
+    # 先頭行も "\n" の直後として扱う
+    for key, value, cam, div, div_line in _TOKEN_PATTERN.findall("\n" + text):
+        if key == "FILE":
+            files.append(value.strip())
+        elif key == "Comment":
+            record.comment = value.strip()
+        elif key == "Locked":
+            record.lock_mode = value.strip()
+        elif cam:
+            cam_divs.append((int(cam), int(div)))
+        else:
+            cam_divs.append(parse_cam_div(div_line))
+    # 正規表現で見つけた行以外にも .DIV がある場合（"=" の後ろ、FILE= の値など）は、
+    # 従来の判定と同じく .DIV を含む全ての行から探し直す（通常の.txtでは行わない）
+    if text.count(_DIV_MARKER) != len(cam_divs):
+        record.cam_divs = [parse_cam_div(line) for line in _div_lines(text)]
+    return record
+
+
+def _div_lines(text: str) -> Iterator[str]:
+    # .DIV の出現位置から行を切り出す（1行に複数ある場合も1回だけ返す）
+    end = -1
+    while True:
+        pos = text.find(_DIV_MARKER, end + 1)
+        if pos < 0:
+            return
+        start = text.rfind("\n", 0, pos) + 1
+        end = text.find("\n", pos)
+        if end < 0:
+            end = len(text)
+        yield text[start:end]
+
+
+def parse_metadata_lines(lines: Iterable[str]) -> MetadataRecord:
+    """
+    .txtメタデータの行を解析する
+
+    Args:
+        lines: .txtファイルの各行
+
+    Returns:
+        MetadataRecord
+    """
+    return parse_metadata_text("\n".join(lines))
+
+
+def parse_metadata_file(file: TextIO) -> MetadataRecord:
+    """
+    開いた.txtメタデータファイルを解析する
+
+    Args:
+        file: テキストモードで開いたファイル
+
+    Returns:
+        MetadataRecord
+    """
+    return parse_metadata_text(file.read())
@@ -0,0 +1,72 @@
+"""
+imgフォルダの.txtメタデータを先読みするモジュール
+
+共有VTV（SMB）上では.txtファイルを開くたびにネットワークの往復待ちが発生する。
+prefetch_metadata は複数のファイルをスレッドプールで同時に読み込み、
+解析結果をファイル一覧の順番どおりに返すため、待ち時間が重なって短くなる。
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, Sequence, Tuple
+
+from config import Constants
+from image_source import ImageSource
+from metadata_parser import MetadataRecord, parse_metadata_file
+
+
+def read_metadata(source: ImageSource, file_name: str) -> MetadataRecord:
+    """
+    .txtファイルを1つ読み込んで解析する
+
+    Args:
+        source: ImageSource
+        file_name: .txtファイル名
+    """
+    with source.open_text(file_name) as file:
+        return parse_metadata_file(file)
+
+
+def prefetch_metadata(source: ImageSource, file_names: Sequence[str],
+                      max_workers: Optional[int] = None,
+                      max_in_flight: Optional[int] = None) -> Iterator[Tuple[str, MetadataRecord]]:
+    """
+    .txtファイルを並列に読み込み、(ファイル名, MetadataRecord) をファイル一覧の順番で返す
+
+    読み込み中・読み込み済みで未取得のファイル数は max_in_flight までに制限する。
+    途中で反復をやめた場合（ジェネレータの close）は未着手の読み込みを取り消す。
+
+    Args:
+        source: ImageSource
+        file_names: .txtファイル名のリスト
+        max_workers: ワーカースレッド数（Noneの場合は Constants.DEFAULT_METADATA_READ_WORKERS、1の場合は逐次読み込み）
+        max_in_flight: 先読みするファイル数の上限（Noneの場合はワーカー数の4倍）
+
+    Raises:
+        読み込み中に発生した例外（該当するファイルの順番で送出）
+    """
+    max_workers = max_workers or Constants.DEFAULT_METADATA_READ_WORKERS
+    if max_workers <= 1 or len(file_names) <= 1:
+        for file_name in file_names:
+            yield file_name, read_metadata(source, file_name)
+        return
+
+    max_in_flight = max_in_flight or max_workers * 4
+    pending = deque()
+    remaining = iter(file_names)
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata")
+    try:
+        for file_name in remaining:
+            pending.append((file_name, pool.submit(read_metadata, source, file_name)))
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            file_name, future = pending.popleft()
+            # 先頭のファイルを取り出したら、その分だけ次のファイルの読み込みを依頼する
+            for next_name in remaining:
+                pending.append((next_name, pool.submit(read_metadata, source, next_name)))
+                break
+            yield file_name, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
@@ -0,0 +1,99 @@
+"""
+出力フォルダのファイル名を予約・管理するモジュール
+
+ファイル名の衝突判定のたびに os.path.exists を呼ぶ代わりに、
+出力フォルダを1回だけ列挙した結果をメモリ上に保持して判定する。
+"""
+import os
+import threading
+from typing import Iterable
+
+from folder_listing import FolderListing
+
+
+class NameRegistry:
+    """出力フォルダ内で使用済みのファイル名を管理するクラス"""
+
+    def __init__(self, existing_names: Iterable[str] = ()):
+        """
+        初期化
+
+        Args:
+            existing_names: 既に使用されているファイル名（拡張子付き）
+        """
+        self._lock = threading.Lock()
+        self._taken = {self._key(name) for name in existing_names}
+
+    @classmethod
+    def from_folder(cls, folder: str) -> "NameRegistry":
+        """
+        フォルダを1回列挙し、既存のファイル名で初期化したレジストリを作成する
+
+        Args:
+            folder: 出力フォルダのパス（存在しない場合は空のレジストリ）
+
+        Returns:
+            ファイル名レジストリ
+        """
+        return cls.from_listing(FolderListing.scan(folder, with_stats=False, missing_ok=True))
+
+    @classmethod
+    def from_listing(cls, listing: FolderListing) -> "NameRegistry":
+        """
+        列挙済みのフォルダの内容で初期化したレジストリを作成する
+
+        Args:
+            listing: 出力フォルダの列挙結果
+
+        Returns:
+            ファイル名レジストリ
+        """
+        return cls(listing.names())
+
+    @staticmethod
+    def _key(file_name: str) -> str:
+        # Windowsでは大文字・小文字を区別せずに衝突を判定する（os.path.existsと同じ挙動）
+        return os.path.normcase(file_name)
+
+    def is_taken(self, file_name: str) -> bool:
+        """
+        ファイル名が使用済みかどうかを返す
+
+        Args:
+            file_name: ファイル名（拡張子付き）
+        """
+        with self._lock:
+            return self._key(file_name) in self._taken
+
+    def reserve(self, new_file_name: str, original_file_name: str, extension: str = ".bmp") -> str:
+        """
+        衝突しないファイル名を決定して予約する
+
+        衝突した場合は従来と同じく「_元のファイル名」を末尾に追加し続ける。
+
+        Args:
+            new_file_name: 希望するファイル名（拡張子なし）
+            original_file_name: 元のファイル名（拡張子なし）
+            extension: 拡張子
+
+        Returns:
+            予約したファイル名（拡張子なし）
+        """
+        with self._lock:
+            while self._key(f"{new_file_name}{extension}") in self._taken:
+                new_file_name = f"{new_file_name}_{original_file_name}"
+            self._taken.add(self._key(f"{new_file_name}{extension}"))
+        return new_file_name
+
+    def release(self, file_name: str) -> None:
+        """
+        予約を解除する
+
+        Args:
+            file_name: ファイル名（拡張子付き）
+        """
+        with self._lock:
+            self._taken.discard(self._key(file_name))
+
+    def __len__(self) -> int:
+        return len(self._taken)
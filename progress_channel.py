@@ -0,0 +1,203 @@
+"""
+処理スレッドからUIへ進捗を通知するチャネルを定義するモジュール
+
+処理スレッドは ProgressChannel を progress_callback として呼び出し、最新の状態だけを記録する。
+UI側は updates() で変更があった時だけ、最大でも min_interval 秒に1回の頻度で状態を受け取る。
+ファイルごとの通知はまとめられるため、UIの更新回数は処理するファイル数に依存しない。
+
+    channel = ProgressChannel()
+    threading.Thread(target=lambda: process_images(..., progress_callback=channel)).start()
+    async for snapshot in channel.updates():
+        progress_bar.value = snapshot.fraction
+        page.update()
+
+telemetry（ExportTelemetry）を指定すると、処理済み・全体のバイト数と読み込み・圧縮の処理速度、
+残り時間を snapshot.telemetry で受け取れる（処理スレッドが計測値を記録した時もUIに通知する）。
+"""
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from export_telemetry import ExportTelemetry, TelemetrySnapshot
+
+
+@dataclass(frozen=True)
+class ProgressSnapshot:
+    """ある時点の進捗"""
+
+    current: int = 0
+    total: int = 0
+    message: str = ""
+    stage: str = ""                     # 処理段階（"解析中"、"コピー中" など、メッセージの ":" より前）
+    files_per_second: float = 0.0       # 現在の処理段階での処理速度
+    eta_seconds: Optional[float] = None  # 現在の処理段階の残り時間の見込み（求められない場合はNone）
+    elapsed_seconds: float = 0.0        # 開始からの経過時間
+    closed: bool = False                # 処理が終了したかどうか
+    telemetry: Optional[TelemetrySnapshot] = None  # 処理済み・全体のバイト数と処理速度の計測値（計測しない場合はNone）
+
+    @property
+    def fraction(self) -> float:
+        """進捗の割合（0～1）"""
+        return self.current / self.total if self.total > 0 else 0.0
+
+
+def _stage_of(message: str) -> str:
+    # "コピー中: xxx.bmp" -> "コピー中"
+    return message.split(":", 1)[0].strip()
+
+
+class ProgressChannel:
+    """処理スレッドからUIへ進捗をまとめて通知するチャネル（複数スレッドから呼び出し可能）"""
+
+    def __init__(self, message: str = "準備中...", telemetry: Optional[ExportTelemetry] = None):
+        """
+        初期化
+
+        Args:
+            message: 最初に表示するメッセージ
+            telemetry: 処理量の計測（process_images に同じものを渡す）
+        """
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._current = 0
+        self._total = 0
+        self._message = message
+        self._stage = _stage_of(message)
+        # 処理速度の基準（処理段階が変わるたびにリセットする）
+        self._stage_started_at = self._started_at
+        self._stage_start_count = 0
+        self._version = 0
+        self._closed = False
+        # UI側のイベントループへの通知（通知待ちの間は重ねて通知しない）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._notify_pending = False
+        self.telemetry = telemetry
+        if telemetry is not None:
+            telemetry.add_listener(self._on_telemetry)
+
+    def _on_telemetry(self) -> None:
+        # コピーの完了などで計測値が変わった時にワーカースレッドから呼ばれる
+        with self._lock:
+            self._version += 1
+        self._notify()
+
+    def update(self, current: int, total: int, message: str, stage: Optional[str] = None) -> None:
+        """
+        進捗を記録する（progress_callback と同じ引数で呼び出せる）
+
+        Args:
+            current: 処理済みの件数
+            total: 全体の件数
+            message: 表示するメッセージ
+            stage: 処理段階（Noneの場合はメッセージから求める）
+        """
+        stage = _stage_of(message) if stage is None else stage
+        with self._lock:
+            if stage != self._stage or total != self._total:
+                self._stage_started_at = time.monotonic()
+                self._stage_start_count = current
+            self._current = current
+            self._total = total
+            self._message = message
+            self._stage = stage
+            self._version += 1
+        self._notify()
+
+    __call__ = update
+
+    def set_message(self, message: str) -> None:
+        """
+        件数を変えずにメッセージだけを変更する（"キャンセル中..." の表示など）
+
+        Args:
+            message: 表示するメッセージ
+        """
+        with self._lock:
+            self._message = message
+            self._version += 1
+        self._notify()
+
+    def close(self) -> None:
+        """処理の終了を通知する（updates() は最後の状態を返して終了する）"""
+        with self._lock:
+            self._closed = True
+            self._version += 1
+        self._notify()
+
+    @property
+    def closed(self) -> bool:
+        """処理が終了したかどうか"""
+        with self._lock:
+            return self._closed
+
+    def snapshot(self) -> ProgressSnapshot:
+        """現在の進捗を返す"""
+        now = time.monotonic()
+        telemetry = self.telemetry.snapshot() if self.telemetry is not None else None
+        with self._lock:
+            stage_elapsed = now - self._stage_started_at
+            stage_done = self._current - self._stage_start_count
+            rate = stage_done / stage_elapsed if stage_elapsed > 0 and stage_done > 0 else 0.0
+            eta = (self._total - self._current) / rate if rate > 0 and self._total >= self._current else None
+            return ProgressSnapshot(
+                current=self._current,
+                total=self._total,
+                message=self._message,
+                stage=self._stage,
+                files_per_second=rate,
+                eta_seconds=eta,
+                elapsed_seconds=now - self._started_at,
+                closed=self._closed,
+                telemetry=telemetry,
+            )
+
+    def _notify(self) -> None:
+        # UI側が待っている場合だけ、イベントループに1回通知する
+        with self._lock:
+            if self._loop is None or self._notify_pending:
+                return
+            self._notify_pending = True
+            loop, event = self._loop, self._event
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # イベントループが終了している
+            pass
+
+    async def updates(self, min_interval: float = 0.1) -> AsyncIterator[ProgressSnapshot]:
+        """
+        進捗が変わった時だけ最新の状態を返す非同期イテレータ
+
+        前回から min_interval 秒以上経過するまで待ち、その間の通知は1回にまとめる。
+        close() が呼ばれると最後の状態を返して終了する。
+
+        Args:
+            min_interval: UIを更新する最短の間隔（秒）
+        """
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+            event = self._event
+        last_version = -1
+        try:
+            while True:
+                with self._lock:
+                    version = self._version
+                    self._notify_pending = False
+                    event.clear()
+                if version != last_version:
+                    last_version = version
+                    snapshot = self.snapshot()
+                    yield snapshot
+                    if snapshot.closed:
+                        return
+                    await asyncio.sleep(min_interval)
+                    continue
+                await event.wait()
+        finally:
+            with self._lock:
+                self._loop = None
+                self._event = None
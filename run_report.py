@@ -0,0 +1,194 @@
+"""
+画像保存の処理時間とカウンタを記録し、JSON形式の実行レポートとして保存するモジュール
+
+処理の区間（スパン）ごとの時間と、解析した.txtファイル数・コピーしたバイト数・
+JPEGに変換したファイル数などのカウンタを記録する。レポートは出力フォルダに保存し、
+別のPCや以前のバージョンとの処理時間の比較に使用する。
+
+    report = RunReport(task=img_folder)
+    with report.span("export"):
+        process_images(..., report=report)
+    report.write_to(output_folder)
+
+スパンの中で開始したスパンは "export/plan/metadata" のように親の名前を付けて記録する。
+"""
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from export_telemetry import STAGE_COMPRESS, STAGE_COPY, STAGE_SCAN, TelemetrySnapshot
+
+logger = logging.getLogger(__name__)
+
+RUN_REPORT_FILE_NAME = ".task_image_saver_report.json"
+
+# レポートの形式のバージョン（項目を変更した場合に更新する）
+REPORT_VERSION = 1
+
+
+class RunReport:
+    """1回の保存処理の実行レポート（複数スレッドから呼び出し可能）"""
+
+    def __init__(self, **info):
+        """
+        初期化
+
+        Args:
+            info: レポートに記録する処理の情報（コピー元、保存設定など）
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_at = datetime.now()
+        self._origin = time.perf_counter()
+        self._spans: List[dict] = []
+        self._counters: Dict[str, int] = {}
+        self._stages: Dict[str, dict] = {}
+        self._info = dict(info)
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        with ブロックの処理時間を記録する
+
+        Args:
+            name: 区間の名前
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        path = "/".join(stack + [name])
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            with self._lock:
+                self._spans.append({
+                    "name": path,
+                    "start": round(start - self._origin, 6),
+                    "seconds": round(end - start, 6),
+                    "thread": threading.current_thread().name,
+                })
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        カウンタに加算する
+
+        Args:
+            name: カウンタの名前
+            value: 加算する値
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_info(self, **info) -> None:
+        """処理の情報（結果、保存設定など）を追加する"""
+        with self._lock:
+            self._info.update(info)
+
+    def add_telemetry(self, snapshot: TelemetrySnapshot) -> None:
+        """
+        ExportTelemetry の計測値をカウンタと処理段階ごとの集計に追加する
+
+        Args:
+            snapshot: ExportTelemetry.snapshot() の結果
+        """
+        scan = snapshot.stages.get(STAGE_SCAN)
+        copy = snapshot.stages.get(STAGE_COPY)
+        compress = snapshot.stages.get(STAGE_COMPRESS)
+        with self._lock:
+            for stage, stage_snapshot in snapshot.stages.items():
+                self._stages[stage] = {
+                    "items": stage_snapshot.items,
+                    "bytes_read": stage_snapshot.bytes_read,
+                    "bytes_written": stage_snapshot.bytes_written,
+                    "busy_seconds": round(stage_snapshot.busy_seconds, 6),
+                }
+        if scan is not None:
+            self.count("metadata_bytes_read", scan.bytes_read)
+        if copy is not None:
+            self.count("files_copied", copy.items)
+            self.count("bytes_read", copy.bytes_read)
+            self.count("bytes_written", copy.bytes_written)
+        if compress is not None:
+            self.count("jpegs_encoded", compress.items)
+            self.count("bytes_written", compress.bytes_written)
+
+    def to_dict(self) -> dict:
+        """レポートの内容を辞書として返す"""
+        with self._lock:
+            return {
+                "version": REPORT_VERSION,
+                "started_at": self._started_at.isoformat(timespec="seconds"),
+                "elapsed_seconds": round(time.perf_counter() - self._origin, 6),
+                "machine": {
+                    "node": platform.node(),
+                    "platform": platform.platform(),
+                    "python": platform.python_version(),
+                    "cpu_count": os.cpu_count(),
+                },
+                "info": dict(self._info),
+                "counters": dict(sorted(self._counters.items())),
+                "stages": dict(self._stages),
+                "spans": sorted(self._spans, key=lambda span: span["start"]),
+            }
+
+    def write(self, path: str) -> None:
+        """
+        レポートをJSONファイルに保存する（書きかけのファイルが残らないよう一時ファイルから置き換える）
+
+        Args:
+            path: 保存先のパス
+        """
+        partial = path + ".part"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2, default=str)
+        os.replace(partial, path)
+
+    def write_to(self, output_folder: str, tag: Optional[str] = None) -> Optional[str]:
+        """
+        レポートを出力フォルダに保存する
+
+        Args:
+            output_folder: 出力フォルダ（存在しない場合は保存しない）
+            tag: 同じフォルダに複数のレポートを保存する場合にファイル名に付ける名前（タスク名など）
+
+        Returns:
+            保存したファイルのパス（保存しなかった場合はNone）
+        """
+        if not os.path.isdir(output_folder):
+            return None
+        path = os.path.join(output_folder, run_report_file_name(tag))
+        try:
+            self.write(path)
+        except OSError as e:
+            logger.warning("実行レポートを保存できませんでした: %s", e)
+            return None
+        return path
+
+
+def run_report_file_name(tag: Optional[str] = None) -> str:
+    """出力フォルダに保存する実行レポートのファイル名を返す"""
+    if not tag:
+        return RUN_REPORT_FILE_NAME
+    stem, ext = os.path.splitext(RUN_REPORT_FILE_NAME)
+    return f"{stem}_{tag}{ext}"
+
+
+def report_span(report: Optional[RunReport], name: str):
+    """
+    report の span を返す（report がNoneの場合は何もしないコンテキストマネージャ）
+
+    Args:
+        report: 実行レポート
+        name: 区間の名前
+    """
+    return report.span(name) if report is not None else nullcontext()
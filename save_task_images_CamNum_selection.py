@@ -1,35 +1,34 @@
+import logging
 import sys
 import os
-import shutil
 import re
-
-
-def sanitize_filename(filename):
-    """
-    Windowsで使用できない文字をファイル名から除去・置換する関数
-    
-    Args:
-        filename: サニタイズするファイル名
-    
-    Returns:
-        無効な文字を除去したファイル名
-    """
-    # Windowsで使用できない文字: \ / : * ? " < > |
-    invalid_chars = r'[\\/:*?"<>|]'
-    # 無効な文字をアンダースコアに置換
-    sanitized = re.sub(invalid_chars, '_', str(filename))
-    # 先頭・末尾の空白とドットを除去（Windowsの制限）
-    sanitized = sanitized.strip(' .')
-    # 空文字列になった場合はデフォルト名を返す
-    if not sanitized:
-        sanitized = 'unnamed'
-    return sanitized
+import time
+from contextlib import closing
+
+from app_logging import setup_logging
+from cammaster_log import load_tool_comments, parse_tool_comments
+from copy_executor import create_copy_executor
+from export_journal import ExportJournal
+from export_plan import CopyJob, ExportPlan
+from export_telemetry import STAGE_SCAN
+from filename_template import compile_template, sanitize_filename  # noqa: F401
+from image_source import as_image_source
+from metadata_index import get_default_index
+from metadata_parser import parse_cam_div, parse_file_cam_div, parse_metadata_file, parse_metadata_lines
+from metadata_prefetch import prefetch_metadata
+from name_registry import NameRegistry
+from run_report import report_span
+from task_scan import TaskScan
+
+logger = logging.getLogger(__name__)
 
 
 def apply_filename_template(template, comment, tool_comment, original_name, cam, div, index):
     """
     テンプレートにプレースホルダーを適用してファイル名を生成する関数
     
+    テンプレートの解析結果は filename_template.compile_template で再利用される。
+    
     Args:
         template: ファイル名テンプレート（例: "{comment}_{index}"）
         comment: 画像コメント
@@ -42,185 +41,349 @@ def apply_filename_template(template, comment, tool_comment, original_name, cam,
     Returns:
         プレースホルダーを置換したファイル名（サニタイズ済み）
     """
-    values = {
-        "comment": "" if comment is None else str(comment),
-        "tool": "" if tool_comment is None else str(tool_comment),
-        "original": "" if original_name is None else str(original_name),
-        "cam": "" if cam is None else str(cam),
-        "div": "" if div is None else str(div),
-        "index": "" if index is None else str(index),
-    }
+    return compile_template(template).render(comment, tool_comment, original_name, cam, div, index)
 
-    # {name} / {name:03} の簡易フォーマット指定に対応
-    pattern = re.compile(r"\{([a-zA-Z0-9_]+)(?::([^{}]+))?\}")
 
-    def _replace(match):
-        name = match.group(1)
-        fmt = match.group(2)
+# 指定された拡張子（デフォルトは.txt）のファイルリストを取得
+def get_file_list(folder_path, extension='.txt'):
+    return as_image_source(folder_path).list_files(extension)
 
-        if name not in values:
-            # 未対応プレースホルダーは空文字にする（プレビュー/本処理の両方で安全に）
-            return ""
 
-        raw = values.get(name, "")
-        if fmt:
-            # 数値ゼロ埋め目的を想定し、まずint変換を試す
-            try:
-                as_int = int(raw) if str(raw).strip() != "" else 0
-                return format(as_int, fmt)
-            except Exception:
-                # 文字列などはフォーマットに失敗する可能性があるためフォールバック
-                try:
-                    return format(raw, fmt)
-                except Exception:
-                    return str(raw)
+# ファイル名からカメラ番号とDIV番号を抽出
+def find_cam_and_div(filename):
+    return list(parse_cam_div(filename))
 
-        return str(raw)
 
-    result = pattern.sub(_replace, str(template) if template is not None else "")
-    return sanitize_filename(result)
+# カラー画像の時にDIVを修正するため使用
+def adjust_save_CAM_list(save_CAM_list):
+    # リストが空でないことを確認
+    if not save_CAM_list:
+        return save_CAM_list
 
+    # 1つ目の要素からスタート
+    adjusted_list = [save_CAM_list[0]]
 
-def get_camera_list(folder_path):
+    for i in range(1, len(save_CAM_list)):
+        current_X, current_Y = save_CAM_list[i]
+        previous_X, previous_Y = adjusted_list[-1]  # 調整後のリストの最後の要素
+
+        if current_X == previous_X:  # X_i = X_(i+1) の場合
+            if current_Y != previous_Y + 1:  # Y_(i+1) と Y_i の差が1でない場合
+                current_Y = previous_Y + 1  # Y_(i+1) を Y_i + 1 に調整
+        # 調整後の値をリストに追加
+        adjusted_list.append([current_X, current_Y])
+    return adjusted_list
+
+
+# 最初のファイルを処理して保存すべきカメラ番号をリストアップ
+def process_first_file(file):
+    return [list(cam_div) for cam_div in parse_metadata_lines(file).cam_divs]
+
+
+def load_metadata_records(source, use_metadata_index=True, metadata_index=None, progress_callback=None, cancel_check=None, read_workers=None, task_scan=None, telemetry=None, report=None):
     """
-    imgフォルダからカメラリスト(調整済み)を取得する関数
-    
+    imgフォルダの全ての.txtファイルの解析結果を取得する
+
+    .txtファイル一覧のフィンガープリントが前回と同じ場合はキャッシュから読み出し、
+    .txtファイルを開かない。キャッシュが無い場合は全て解析してキャッシュに保存する。
+    .txtファイルは複数同時に先読みする（metadata_prefetchモジュール参照）。
+
     Args:
-        folder_path: imgフォルダのパス
+        source: ImageSource
+        use_metadata_index: Falseの場合はキャッシュを使用しない
+        metadata_index: 使用するキャッシュ（Noneの場合はアプリケーション共通のキャッシュ）
+        progress_callback: 進捗を報告するコールバック関数 (current, total, message) -> None
+        cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+        read_workers: .txtファイルの読み込み並列数（Noneの場合はデフォルト値、1の場合は逐次読み込み）
+        task_scan: scan_task の結果（指定した場合はフォルダを列挙せず、その.txtファイル一覧を使用する。
+            解析結果のキャッシュも task_scan.records だけを使用し、キャッシュには問い合わせない）
+        telemetry: 読み込んだ.txtファイルのバイト数と時間を記録する ExportTelemetry
+        report: .txtファイル数と解析した件数を記録する RunReport
+
+    Returns:
+        (.txtファイル名のリスト, .txtファイル名 -> MetadataRecord の辞書)。キャンセルされた場合はNone
+    """
+    if task_scan is not None:
+        file_list, fingerprint = task_scan.file_list, task_scan.fingerprint
+        if use_metadata_index and task_scan.records is not None:
+            logger.info("メタデータをキャッシュから読み込みました: %d件", len(task_scan.records))
+            if report is not None:
+                report.count("metadata_files", len(file_list))
+                report.count("metadata_cache_hits", len(task_scan.records))
+            return file_list, task_scan.records
+    if not use_metadata_index:
+        if task_scan is None:
+            file_list = source.list_files()
+    else:
+        if metadata_index is None:
+            metadata_index = get_default_index()
+        if task_scan is None:
+            file_list, fingerprint = source.list_files_with_fingerprint()
+        location = os.path.abspath(source.location)
+        # task_scan に解析結果が無い場合は、scan_task が同じフィンガープリントで問い合わせて見つからなかったため、
+        # キャッシュを再度問い合わせない
+        records = metadata_index.load(location, fingerprint) if task_scan is None else None
+        if records is not None:
+            logger.info("メタデータをキャッシュから読み込みました: %d件", len(records))
+            if report is not None:
+                report.count("metadata_files", len(file_list))
+                report.count("metadata_cache_hits", len(records))
+            return file_list, records
+
+    total_files = len(file_list)
+    records = {}
+    pending_files = file_list
+    if task_scan is not None and task_scan.first_record is not None and file_list:
+        # 最初の.txtファイルは scan_task で解析済み
+        records[file_list[0]] = task_scan.first_record
+        pending_files = file_list[1:]
+    # .txtファイルのサイズは列挙結果から取得する（ファイルごとのstatは発生しない）
+    txt_sizes = source.file_sizes() if telemetry is not None else None
+    last_time = time.perf_counter()
+    with closing(prefetch_metadata(source, pending_files, read_workers)) as prefetched:
+        for processed_count, (filename, record) in enumerate(prefetched, len(records)):
+            if telemetry is not None:
+                # 先読みしているため、1ファイルごとの時間は前のファイルを受け取ってからの経過時間とする
+                now = time.perf_counter()
+                telemetry.record(STAGE_SCAN, bytes_read=txt_sizes.get(filename, 0), seconds=now - last_time)
+                last_time = now
+
+            # キャンセルチェック（先読み中の読み込みは closing で取り消す）
+            if cancel_check and cancel_check():
+                logger.info("画像処理がキャンセルされました")
+                if progress_callback:
+                    progress_callback(processed_count, total_files, "キャンセルされました")
+                return None
+
+            # 進捗を報告
+            if progress_callback:
+                progress_callback(processed_count, total_files, f"解析中: {filename}")
+            records[filename] = record
+
+    if report is not None:
+        report.count("metadata_files", total_files)
+        report.count("metadata_parsed", len(pending_files))
+    if use_metadata_index:
+        metadata_index.save(location, fingerprint, records)
+    return file_list, records
+
+
+def create_mapping(original_list, converted_list):
+    # converted_listの各要素に対応するoriginal_listの要素を記憶する辞書を作成
+    mapping_AB = {}  # converted_list -> original_list のマッピング
+    mapping_BA = {}  # original_list -> converted_list のマッピング
     
+    for original, converted in zip(original_list, converted_list):
+        mapping_AB[tuple(converted)] = tuple(original)
+        mapping_BA[tuple(original)] = tuple(converted)
+        
+    return mapping_AB, mapping_BA
+
+
+def get_original_from_converted(converted_element, mapping_AB):
+    # converted_listの要素からoriginal_listの要素を取得する
+    return mapping_AB.get(tuple(converted_element), None)
+
+
+def get_converted_from_original(original_element, mapping_BA):
+    # original_listの要素からconverted_listの要素を取得する
+    return mapping_BA.get(tuple(original_element), None)
+
+
+# 2D配列内に特定の要素が含まれるかチェック
+def is_element_in_2d_array(target, array_2d):
+    return any(target == element for element in array_2d)
+
+
+def compile_cam_selection(selected_cam_list, mapping_BA):
+    """
+    選択されたカメラ列を、画像ファイル名の (カメラ番号, DIV番号) の集合に変換する
+
+    選択は変換後（adjust_save_CAM_list 適用後）のカメラ番号・列番号で指定されるため、
+    対応関係を1回だけ逆にたどり、画像ごとの判定を集合の検索だけにする。
+
+    Args:
+        selected_cam_list: 選択されたカメラ番号・列番号のリスト（例: [[1, 1], [2, 1]]）
+        mapping_BA: 元の (カメラ番号, DIV番号) -> 変換後 の対応関係（create_mapping 参照）
+
     Returns:
-        カメラリストの2次元配列 例: [[1, 1], [1, 2], [2, 1], [2, 2]]
+        保存する画像の元の (カメラ番号, DIV番号) の frozenset
     """
-    def get_file_list(folder_path, extension='.txt'):
-        return [filename for filename in os.listdir(folder_path) if filename.endswith(extension)]
-
-    def find_cam_and_div(filename):
-        numbers = re.findall(r'\d+', filename)
-        return [int(num) for num in numbers[:2]]
-
-    def adjust_save_CAM_list(save_CAM_list):
-        if not save_CAM_list:
-            return save_CAM_list
-        adjusted_list = [save_CAM_list[0]]
-        for i in range(1, len(save_CAM_list)):
-            current_X, current_Y = save_CAM_list[i]
-            previous_X, previous_Y = adjusted_list[-1]
-            if current_X == previous_X:
-                if current_Y != previous_Y + 1:
-                    current_Y = previous_Y + 1
-            adjusted_list.append([current_X, current_Y])
-        return adjusted_list
-
-    def process_first_file(file_path):
-        save_CAM_list = []
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if '.DIV' in line:
-                    save_CAM_list.append(find_cam_and_div(line))
-        return save_CAM_list
+    selected = frozenset(tuple(cam_div) for cam_div in selected_cam_list)
+    return frozenset(original for original, converted in mapping_BA.items() if converted in selected)
 
-    file_list = get_file_list(folder_path)
-    if not file_list:
-        return []
+
+def is_image_capture_format(text):
+    """
+    入力された文字列が「画像取込XY」の形式に一致するかどうかを判定します。
+    """
+    if not isinstance(text, str):
+        return False  # 文字列でない場合はFalseを返す
+    # 正規表現パターン
+    pattern = r"画像取込\d{2}"
+    # 一致するかどうかを確認
+    match = re.fullmatch(pattern, text)
     
-    first_file = file_list[0]
-    file_path = os.path.join(folder_path, first_file)
-    save_CAM_list = process_first_file(file_path)
+    return match is not None
+
+
+def build_task_scan(source, file_list, first_record, fingerprint=None, records=None, tool_comments=None):
+    """
+    最初の.txtファイルの解析結果からカメラ構成と対応関係を求め、TaskScan を作成する
+
+    Args:
+        source: ImageSource
+        file_list: .txtファイル名の一覧
+        first_record: 最初の.txtファイルの MetadataRecord（.txtファイルが無い場合はNone）
+        fingerprint: .txtファイル一覧のフィンガープリント
+        records: 全ての.txtファイルの解析結果（キャッシュから読み込んだ場合）
+        tool_comments: cammaster_seq.log のツールコメント
+    """
+    save_CAM_list = [list(cam_div) for cam_div in first_record.cam_divs] if first_record is not None else []
     adjust_CAM_list = adjust_save_CAM_list(save_CAM_list)
+    mapping_AB, mapping_BA = create_mapping(save_CAM_list, adjust_CAM_list)
+    return TaskScan(
+        source=source,
+        file_list=file_list,
+        fingerprint=fingerprint,
+        records=records,
+        first_record=first_record,
+        cam_list=save_CAM_list,
+        adjusted_cam_list=adjust_CAM_list,
+        mapping_AB=mapping_AB,
+        mapping_BA=mapping_BA,
+        tool_comments=tool_comments,
+    )
+
+
+def scan_task(folder_path, use_metadata_index=True, metadata_index=None):
+    """
+    imgフォルダを調べ、カメラ選択と保存処理で共有する TaskScan を作成する
+
+    .txtファイル一覧を1回だけ列挙し、キャッシュに解析結果があれば使用する。
+    キャッシュが無い場合は最初の.txtファイルだけを解析する。
+
+    Args:
+        folder_path: imgフォルダのパス（または ImageSource）
+        use_metadata_index: Falseの場合は解析結果のキャッシュを使用しない
+        metadata_index: 使用するキャッシュ（Noneの場合はアプリケーション共通のキャッシュ）
+
+    Returns:
+        TaskScan
+    """
+    source = as_image_source(folder_path)
+    file_list, fingerprint = source.list_files_with_fingerprint()
+    records = None
+    if use_metadata_index and file_list:
+        if metadata_index is None:
+            metadata_index = get_default_index()
+        records = metadata_index.load(os.path.abspath(source.location), fingerprint)
+
+    first_record = None
+    if records is not None:
+        first_record = records[file_list[0]]
+    elif file_list:
+        with source.open_text(file_list[0]) as file:
+            first_record = parse_metadata_file(file)
+
+    # ログが無い場合は保存処理の開始時にエラーにする（カメラ選択は表示できる）
+    try:
+        tool_comments = load_tool_comments(source)
+    except FileNotFoundError:
+        tool_comments = None
+    return build_task_scan(source, file_list, first_record, fingerprint, records, tool_comments)
+
+
+def get_camera_list(folder_path):
+    """
+    imgフォルダからカメラリスト(調整済み)を取得する関数
+    
+    Args:
+        folder_path: imgフォルダのパス、ImageSource、または TaskScan
     
-    return adjust_CAM_list
+    Returns:
+        カメラリストの2次元配列 例: [[1, 1], [1, 2], [2, 1], [2, 2]]
+    """
+    task_scan = folder_path if isinstance(folder_path, TaskScan) else scan_task(folder_path)
+    return task_scan.camera_list
 
 
 # 画像取込ツールのコメントを取得する関数:cammaster_seq.logから情報を抽出
 def parse_cammaster_log(log_file_path):
-    cam_info_dict = {}
     with open(log_file_path, 'r', encoding='utf-8') as file:
-        print("read cammaster_seq.log")
-        for line in file:
-            match = re.search(r'\((\d+),\s*(\d+):\d+\)\s*:\s*画像取込,\s*name\s*=\s*(\w+)', line)
-            if match:
-                x = int(match.group(1))
-                y = int(match.group(2))
-                zzz = match.group(3)
-                cam_info_dict[(x, y)] = zzz
-    return cam_info_dict
+        return parse_cammaster_lines(file)
 
-# 画像を処理するためのメイン関数
-def process_images(folder_path, output_folder, save_mode, save_cam, output_file_path=None, preselected_cam_list=None, progress_callback=None, filename_templates=None, cancel_check=None):
+
+# cammaster_seq.logの各行からカメラ番号・DIV番号とツールコメントの対応を抽出
+def parse_cammaster_lines(file):
+    logger.debug("read cammaster_seq.log")
+    return parse_tool_comments(file)
+
+
+# デフォルトのファイル名テンプレート
+DEFAULT_FILENAME_TEMPLATES = {
+    'template1': "{comment}_{index}",
+    'template2': "{comment}_{tool}",
+    'template3': "{original}",
+}
+
+
+def plan_images(folder_path, output_folder, save_mode, save_cam, preselected_cam_list=None, progress_callback=None, filename_templates=None, cancel_check=None, name_registry=None, jpeg_quality=None, use_metadata_index=True, metadata_index=None, metadata_workers=None, completed=None, overwrite=None, task_scan=None, telemetry=None, report=None):
     """
-    画像を処理してコピーするメイン関数
-    
+    コピーするファイルとコピー先のファイル名を決定し、実行計画を作成する（計画フェーズ）
+
+    ファイルのコピーは行わない。コピー先のファイル名は出力フォルダの既存ファイルと
+    計画内の他のジョブの両方を避けて決定するため、計画をそのまま実行すれば
+    逐次コピーした場合と同じファイル名になる。
+
+    .txtファイルの解析結果はキャッシュ（metadata_indexモジュール参照）に保存され、
+    同じimgフォルダを再度処理する場合は.txtファイルを開かずに計画を作成する。
+    保存条件（コメント・ロック状態）は.txtファイル内の最終的な値で判定する。
+
     Args:
+        folder_path: imgフォルダのパス（または ImageSource）
+        output_folder: 保存先フォルダのパス
+        save_mode: 保存モード（'0': 全て, '1': コメント付き, '2': ロック画像）
+        save_cam: カメラ保存モード（'0': 全てのカメラ, '1': 選択したカメラ）
+        preselected_cam_list: 事前に選択されたカメラリスト（save_cam='1'の場合）
         progress_callback: 進捗を報告するコールバック関数 (current, total, message) -> None
-        filename_templates: ファイル名テンプレートの辞書
-            - template1: コメントあり + 画像取込XX形式
-            - template2: コメントあり + その他
-            - template3: コメントなし
+        filename_templates: ファイル名テンプレートの辞書（process_images参照）
         cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+        name_registry: 出力フォルダのファイル名レジストリ
+            Noneの場合は出力フォルダを1回列挙して作成する
+        jpeg_quality: 指定した場合はJPEGに変換して保存する（拡張子は.jpg）
+        use_metadata_index: Falseの場合は解析結果のキャッシュを使用しない
+        metadata_index: 使用するキャッシュ（Noneの場合はアプリケーション共通のキャッシュ）
+        metadata_workers: .txtファイルの読み込み並列数（Noneの場合はデフォルト値、1の場合は逐次読み込み）
+        completed: 前回までに完了済みのコピー（元ファイル名 -> 出力フォルダでのファイル名）
+            該当するファイルは新しいファイル名を割り当てず、plan.completed_jobs に追加する
+        overwrite: 前回のファイルを上書きするコピー（元ファイル名 -> 出力フォルダでのファイル名）
+            該当するファイルは新しいファイル名を割り当てず、前回のファイル名でコピーする
+        task_scan: scan_task の結果（カメラ選択ダイアログで作成したもの）
+            指定した場合はフォルダの列挙、カメラ構成と対応関係、ツールコメントの取得を省略する
+        telemetry: .txtファイルの読み込みを記録する ExportTelemetry
+        report: 処理時間と件数を記録する RunReport（run_reportモジュール参照）
+
+    Returns:
+        実行計画（キャンセルされた場合はNone）
     """
     # デフォルトのテンプレートを設定
     if filename_templates is None:
-        filename_templates = {
-            'template1': "{comment}_{index}",
-            'template2': "{comment}_{tool}",
-            'template3': "{original}",
-        }
-    # 追加: cammaster_seq.logの情報を取得
-    log_file_path = os.path.join(os.path.dirname(folder_path), 'cammaster_seq.log')
-    cam_tool_comment_dict = parse_cammaster_log(log_file_path)
-    print("tool_comment=")
-    print(cam_tool_comment_dict)
-    
-    # 指定された拡張子（デフォルトは.txt）のファイルリストを取得
-    def get_file_list(folder_path, extension='.txt'):
-        return [filename for filename in os.listdir(folder_path) if filename.endswith(extension)]
-
-    # ファイル名からカメラ番号とDIV番号を抽出
-    def find_cam_and_div(filename):
-        numbers = re.findall(r'\d+', filename)
-        return [int(num) for num in numbers[:2]]
-    
-    # カラー画像の時にDIVを修正するため使用
-    def adjust_save_CAM_list(save_CAM_list):
-    # リストが空でないことを確認
-        if not save_CAM_list:
-            return save_CAM_list
-
-        # 1つ目の要素からスタート
-        adjusted_list = [save_CAM_list[0]]
-
-        for i in range(1, len(save_CAM_list)):
-            current_X, current_Y = save_CAM_list[i]
-            previous_X, previous_Y = adjusted_list[-1]  # 調整後のリストの最後の要素
-
-            if current_X == previous_X:  # X_i = X_(i+1) の場合
-                if current_Y != previous_Y + 1:  # Y_(i+1) と Y_i の差が1でない場合
-                    current_Y = previous_Y + 1  # Y_(i+1) を Y_i + 1 に調整
-            # 調整後の値をリストに追加
-            adjusted_list.append([current_X, current_Y])
-        return adjusted_list
-    
-    # 最初のファイルを処理して保存すべきカメラ番号をリストアップ
-    def process_first_file(file_path):
-        save_CAM_list = []
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if '.DIV' in line:  # DIVが含まれる行を処理
-                    save_CAM_list.append(find_cam_and_div(line))
-        return save_CAM_list
-
-    # 各ファイルの内容を処理して画像情報を収集
-    def process_file(file_path, img_info_dict, file_name_list):
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if 'Comment=' in line:  # コメント行を抽出
-                    img_info_dict['comment'] = line.replace('Comment=', '').strip()
-                if 'Locked=' in line:  # ロック状態を抽出
-                    img_info_dict['lockMode'] = line.replace('Locked=', '').strip()
-                if 'FILE=' in line:  # 画像ファイル名を抽出
-                    file_name = line.replace('FILE=', '').strip()
-                    if should_save_file(img_info_dict, file_name):  # 保存条件を満たすか確認
-                        file_name_list.append(file_name)
+        filename_templates = DEFAULT_FILENAME_TEMPLATES
+    source = as_image_source(folder_path)
+    if task_scan is not None and not task_scan.is_for(source):
+        # 別のimgフォルダを調べた結果は使用しない
+        task_scan = None
+
+    # 追加: cammaster_seq.logの情報を取得（ログが変更されていなければ前回の解析結果を使用）
+    if task_scan is not None and task_scan.tool_comments is not None:
+        cam_tool_comment_dict = task_scan.tool_comments
+    else:
+        with report_span(report, "tool_comments"):
+            cam_tool_comment_dict = load_tool_comments(source)
+    logger.debug("tool_comment=%s", cam_tool_comment_dict)
+    # 画像ごとのメッセージは DEBUG の場合だけ出力する（判定もループの外で1回だけ行う）
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
     # 画像ファイルを保存するかどうかを判定
     def should_save_file(img_info_dict, file_name):
@@ -232,61 +395,72 @@ def process_images(folder_path, output_folder, save_mode, save_cam, output_file_
             return True  # ロックされている画像のみ保存
         return False
 
-    def is_image_capture_format(text):
-        """
-        入力された文字列が「画像取込XY」の形式に一致するかどうかを判定します。
-        """
-        if not isinstance(text, str):
-            return False  # 文字列でない場合はFalseを返す
-        # 正規表現パターン
-        pattern = r"画像取込\d{2}"
-        # 一致するかどうかを確認
-        match = re.fullmatch(pattern, text)
-        
-        return match is not None
-
-    # ファイルを指定フォルダにコピー
-    def copy_files(img_info_dict, output_folder, folder_path):
+    # 1つの.txtファイルに含まれる画像のコピージョブを作成
+    def plan_files(img_info_dict, cam_selection, tool_comments):
         for i, file_name in enumerate(img_info_dict['fileNameList'], 1):
             # カメラ番号とDIV番号を取得
-            cam_div = find_cam_and_div(file_name)
+            cam_div = parse_file_cam_div(file_name)
             cam = cam_div[0] if len(cam_div) > 0 else ''
             div = cam_div[1] if len(cam_div) > 1 else ''
-            
-            print(cam_tool_comment_dict.get(get_converted_from_original(cam_div, mapping_BA)))
-            tool_comment = cam_tool_comment_dict.get(get_converted_from_original(cam_div, mapping_BA))
-            print(f"tool_comment={tool_comment}")
-            
+
+            if save_cam == '1':
+                # 指定されたカメラ番号に一致するか確認
+                if cam_div not in cam_selection:
+                    continue
+
+            tool_comment = tool_comments.get(cam_div)
+            if debug_enabled:
+                logger.debug("%s: cam_div=%s tool_comment=%s", file_name, cam_div, tool_comment)
+
+            # 完了済みのコピーは前回のファイル名のままスキップする
+            if completed and file_name in completed:
+                plan.completed_jobs.append(CopyJob(
+                    source_name=file_name,
+                    dest_name=completed[file_name],
+                    cam=cam,
+                    div=div,
+                    comment=img_info_dict.get('comment', ''),
+                    tool_comment=tool_comment,
+                    index=i,
+                ))
+                continue
+
+            # 変更された画像は前回のファイルを上書きする
+            if overwrite and file_name in overwrite:
+                plan.jobs.append(CopyJob(
+                    source_name=file_name,
+                    dest_name=overwrite[file_name],
+                    cam=cam,
+                    div=div,
+                    comment=img_info_dict.get('comment', ''),
+                    tool_comment=tool_comment,
+                    index=i,
+                ))
+                continue
+
             # テンプレートを使用してファイル名を生成
             new_file_name = generate_new_file_name(img_info_dict, file_name, i, tool_comment, cam, div)
             original_file_name = file_name.replace(".bmp", "")  # 元のファイル名を取得
-            print(f"newfilename={new_file_name}")
-            while os.path.exists(os.path.join(output_folder, f"{new_file_name}.bmp")):
-                new_file_name = f"{new_file_name}_{original_file_name}"
-            shutil.copy(os.path.join(folder_path, file_name), os.path.join(output_folder, f"{new_file_name}.bmp"))
-
-    # 特定のカメラ番号のファイルを選んでコピー
-    def copy_select_files(img_info_dict, output_folder, folder_path, adjust_CAM_list, mapping_BA, save_CAM_list):
-        for i, file_name in enumerate(img_info_dict['fileNameList'], 1):
-            # カメラ番号とDIV番号を取得
-            cam_div = find_cam_and_div(file_name)
-            cam = cam_div[0] if len(cam_div) > 0 else ''
-            div = cam_div[1] if len(cam_div) > 1 else ''
-            
-            print("test")
-            print(cam_div)
-            if is_element_in_2d_array(list(get_converted_from_original(cam_div, mapping_BA)), save_CAM_list):  # 指定されたカメラ番号に一致するか確認
-                print(cam_tool_comment_dict.get(get_converted_from_original(cam_div, mapping_BA)))
-                tool_comment = cam_tool_comment_dict.get(get_converted_from_original(cam_div, mapping_BA))
-                
-                # テンプレートを使用してファイル名を生成
-                new_file_name = generate_new_file_name(img_info_dict, file_name, i, tool_comment, cam, div)
-                original_file_name = file_name.replace(".bmp", "")  # 元のファイル名を取得
-                while os.path.exists(os.path.join(output_folder, f"{new_file_name}.bmp")):
-                    new_file_name = f"{new_file_name}_{original_file_name}"
-                shutil.copy(os.path.join(folder_path, file_name), os.path.join(output_folder, f"{new_file_name}.bmp"))
+            if debug_enabled:
+                logger.debug("newfilename=%s", new_file_name)
+            new_file_name = name_registry.reserve(new_file_name, original_file_name, extension)
+            plan.jobs.append(CopyJob(
+                source_name=file_name,
+                dest_name=f"{new_file_name}{extension}",
+                cam=cam,
+                div=div,
+                comment=img_info_dict.get('comment', ''),
+                tool_comment=tool_comment,
+                index=i,
+            ))
 
     # 新しいファイル名を生成（テンプレート対応）
+    # テンプレートは画像ごとに解析せず、最初に1回だけ解析する
+    compiled_templates = {
+        key: compile_template(filename_templates.get(key, default))
+        for key, default in DEFAULT_FILENAME_TEMPLATES.items()
+    }
+
     def generate_new_file_name(img_info_dict, file_name, index, tool_comment, cam, div):
         """
         テンプレートを使用してファイル名を生成
@@ -306,83 +480,63 @@ def process_images(folder_path, output_folder, save_mode, save_cam, output_file_
         if comment:
             if is_image_capture_format(tool_comment):
                 # 条件1: コメントあり + 画像取込XX形式
-                template = filename_templates.get('template1', "{comment}_{index}")
+                template = compiled_templates['template1']
             else:
                 # 条件2: コメントあり + その他のツールコメント
-                template = filename_templates.get('template2', "{comment}_{tool}")
+                template = compiled_templates['template2']
         else:
             # 条件3: コメントなし
-            template = filename_templates.get('template3', "{original}")
+            template = compiled_templates['template3']
         
         # テンプレートを適用
-        return apply_filename_template(
-            template=template,
-            comment=comment,
-            tool_comment=tool_comment,
-            original_name=original_name,
-            cam=cam,
-            div=div,
-            index=index
-        )
-
-    def create_mapping(original_list, converted_list):
-        # converted_listの各要素に対応するoriginal_listの要素を記憶する辞書を作成
-        mapping_AB = {}  # converted_list -> original_list のマッピング
-        mapping_BA = {}  # original_list -> converted_list のマッピング
-        
-        for original, converted in zip(original_list, converted_list):
-            mapping_AB[tuple(converted)] = tuple(original)
-            mapping_BA[tuple(original)] = tuple(converted)
-            
-        return mapping_AB, mapping_BA
-
-    def get_original_from_converted(converted_element, mapping_AB):
-        # converted_listの要素からoriginal_listの要素を取得する
-        return mapping_AB.get(tuple(converted_element), None)
-
-    def get_converted_from_original(original_element, mapping_BA):
-        # original_listの要素からconverted_listの要素を取得する
-        return mapping_BA.get(tuple(original_element), None)
-    
-    # 2D配列内に特定の要素が含まれるかチェック
-    def is_element_in_2d_array(target, array_2d):
-        return any(target == element for element in array_2d)
-
-    # ファイルリストを取得
-    file_list = get_file_list(folder_path)
+        return template.render(comment, tool_comment, original_name, cam, div, index)
+
+    # 全ての.txtファイルの解析結果を取得（キャッシュがあれば.txtファイルは開かない）
+    with report_span(report, "metadata"):
+        loaded = load_metadata_records(source, use_metadata_index, metadata_index, progress_callback, cancel_check, metadata_workers, task_scan, telemetry, report)
+    if loaded is None:
+        return None
+    file_list, records = loaded
     first_file = file_list[0] if file_list else None
-    save_CAM_list = []
-    
+    if task_scan is None:
+        # 読み込んだ解析結果からカメラ構成と対応関係を求める（追加の読み込みは発生しない）
+        task_scan = build_task_scan(source, file_list, records[first_file] if first_file else None,
+                                    tool_comments=cam_tool_comment_dict)
+    cam_selection = frozenset()
+    tool_comments = {}
+
     total_files = len(file_list)
-    processed_count = 0
+    plan = ExportPlan(source=source, output_folder=output_folder,
+                      metadata_file_count=total_files, jpeg_quality=jpeg_quality)
+    # JPEGに直接変換する場合は.jpgのファイル名で衝突を判定する
+    extension = ".bmp" if jpeg_quality is None else ".jpg"
+
+    # 出力フォルダの既存ファイル名と計画済みのファイル名を管理
+    if name_registry is None:
+        name_registry = NameRegistry.from_folder(output_folder)
 
     # 各ファイルを処理
     for filename in file_list:
-        # キャンセルチェック
-        if cancel_check and cancel_check():
-            print("画像処理がキャンセルされました")
-            if progress_callback:
-                progress_callback(processed_count, total_files, "キャンセルされました")
-            return
-        
-        # 進捗を報告
-        if progress_callback:
-            progress_callback(processed_count, total_files, f"処理中: {filename}")
-        file_path = os.path.join(folder_path, filename)
+        record = records[filename]
         img_info_dict = {'fileName': filename.replace('.txt', '')}
-        file_name_list = []
+        if record.comment is not None:
+            img_info_dict['comment'] = record.comment
+        if record.lock_mode is not None:
+            img_info_dict['lockMode'] = record.lock_mode
         
         # 最初のファイルについて、ツールコメントを取得
         if filename == first_file:
-            save_CAM_list = process_first_file(file_path)
-            print("save_CAM_list=")
-            print(save_CAM_list)
-            adjust_CAM_list = adjust_save_CAM_list(save_CAM_list)
-            print("adjust_CAM_list=")
-            print(adjust_CAM_list)
-            # 対応関係を作成
-            mapping_AB, mapping_BA = create_mapping(save_CAM_list, adjust_CAM_list)
-            print(f"変換要素：{list(get_original_from_converted([1,1],mapping_AB))}")
+            save_CAM_list = task_scan.cam_list
+            logger.debug("save_CAM_list=%s", save_CAM_list)
+            adjust_CAM_list = task_scan.adjusted_cam_list
+            logger.debug("adjust_CAM_list=%s", adjust_CAM_list)
+            # 対応関係（scan_task で作成済み）
+            mapping_AB, mapping_BA = task_scan.mapping_AB, task_scan.mapping_BA
+            logger.debug("変換要素：%s", get_original_from_converted([1, 1], mapping_AB))
+            # 元の (カメラ番号, DIV番号) からツールコメントを直接引けるようにする
+            tool_comments = {
+                original: cam_tool_comment_dict.get(converted) for original, converted in mapping_BA.items()
+            }
         
         if filename == first_file and save_cam == '1':  # 最初のファイルを処理し、カメラ番号を選択
             if preselected_cam_list is not None:
@@ -391,23 +545,212 @@ def process_images(folder_path, output_folder, save_mode, save_cam, output_file_
             else:
                 # カメラリストが渡されていない場合は全てのカメラを選択
                 save_CAM_list = adjust_CAM_list
+            cam_selection = compile_cam_selection(save_CAM_list, mapping_BA)
 
-        process_file(file_path, img_info_dict, file_name_list)
-        img_info_dict['fileNameList'] = file_name_list
+        # 保存条件を満たす画像ファイルを抽出
+        img_info_dict['fileNameList'] = [
+            file_name for file_name in record.files if should_save_file(img_info_dict, file_name)
+        ]
+
+        if save_cam in ('0', '1'):
+            plan_files(img_info_dict, cam_selection, tool_comments)
+
+    return plan
+
+
+def execute_plan(plan, progress_callback=None, cancel_check=None, copy_executor=None, copy_workers=None, journal=None, output_listing=None, telemetry=None):
+    """
+    実行計画に従ってファイルをコピーする（実行フェーズ）
+
+    Args:
+        plan: plan_images で作成した実行計画
+        progress_callback: 進捗を報告するコールバック関数 (current, total, message) -> None
+        cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+        copy_executor: コピーを実行するエグゼキュータ（copy_executorモジュール参照）
+            Noneの場合は copy_workers に応じて生成し、処理終了時に閉じる
+        copy_workers: コピーの並列数（Noneの場合はデフォルト値、1の場合は逐次コピー）
+        journal: 完了したコピーを記録する ExportJournal（Noneの場合は記録しない）
+        output_listing: 出力フォルダの FolderListing（指定した場合は完了したコピーを追加する）
+        telemetry: 読み込み・書き込みのバイト数と時間、残り時間を記録する ExportTelemetry
+
+    Returns:
+        全てのコピーが完了した場合はTrue、キャンセルされた場合はFalse
+    """
+    total_files = plan.file_count
+    action = "コピー中" if plan.jpeg_quality is None else "圧縮中"
+    source_stats = plan.source_stats() if journal is not None or telemetry is not None else {}
+    if telemetry is not None:
+        telemetry.set_planned(plan.total_bytes)
+
+    def journal_recorder(job):
+        # コピー完了時にワーカースレッドから呼ばれる
+        if journal is None and output_listing is None and telemetry is None:
+            return None
+
+        def on_complete():
+            if telemetry is not None:
+                telemetry.job_done(source_stats.get(job.source_name, (0, None))[0])
+            if journal is not None:
+                size, stamp = source_stats.get(job.source_name, (0, None))
+                journal.record(plan.source_folder, job.source_name, job.dest_name,
+                               size, stamp, plan.jpeg_quality)
+            if output_listing is not None:
+                output_listing.add(job.dest_name)
+        return on_complete
+
+    # コピーエグゼキュータを準備（外部から渡された場合は呼び出し元で閉じる）
+    owns_executor = copy_executor is None
+    executor = copy_executor if copy_executor is not None else create_copy_executor(copy_workers, cancel_check)
+
+    try:
+        for processed_count, job in enumerate(plan.jobs):
+            # キャンセルチェック
+            if cancel_check and cancel_check():
+                logger.info("画像処理がキャンセルされました")
+                executor.cancel()
+                if progress_callback:
+                    progress_callback(processed_count, total_files, "キャンセルされました")
+                return False
+
+            # 進捗を報告
+            if progress_callback:
+                progress_callback(processed_count, total_files, f"{action}: {job.dest_name}")
+            executor.submit(plan.source_path(job), plan.dest_path(job), plan.jpeg_quality,
+                            on_complete=journal_recorder(job), telemetry=telemetry)
+
+        # 依頼済みのコピーが全て終わるまで待つ
+        executor.wait()
+        if cancel_check and cancel_check():
+            logger.info("画像処理がキャンセルされました")
+            if progress_callback:
+                progress_callback(executor.copied_count, total_files, "キャンセルされました")
+            return False
+    except BaseException:
+        executor.cancel()
+        raise
+    finally:
+        if owns_executor:
+            executor.close()
 
-        if save_cam == '0':
-            copy_files(img_info_dict, output_folder, folder_path)
-        elif save_cam == '1':
-            copy_select_files(img_info_dict, output_folder, folder_path, adjust_CAM_list, mapping_BA,save_CAM_list)
-        
-        # 進捗を更新
-        processed_count += 1
-        if progress_callback:
-            progress_callback(processed_count, total_files, f"完了: {filename}")
-    
     # 処理完了を報告
     if progress_callback:
         progress_callback(total_files, total_files, "処理完了")
+    return True
+
+
+# 画像を処理するためのメイン関数
+def process_images(folder_path, output_folder, save_mode, save_cam, output_file_path=None, preselected_cam_list=None, progress_callback=None, filename_templates=None, cancel_check=None, copy_executor=None, copy_workers=None, dry_run=False, name_registry=None, jpeg_quality=None, use_metadata_index=True, metadata_index=None, metadata_workers=None, resume=False, sync=False, write_journal=True, task_scan=None, output_listing=None, telemetry=None, report=None):
+    """
+    画像を処理してコピーするメイン関数
+
+    計画フェーズ（plan_images）で全てのコピージョブを作成してから、
+    実行フェーズ（execute_plan）でコピーする。
+
+    完了したコピーは出力フォルダのジャーナル（export_journalモジュール参照）に記録する。
+    resume=True の場合はジャーナルに記録された完了済みのコピーをスキップし、
+    残りのファイルだけをコピーする（中断した処理の再開）。
+    sync=True の場合はさらに、前回から変更された画像を前回のファイル名で上書きする
+    （差分同期。追加・変更された画像だけをコピーする）。
+    
+    Args:
+        folder_path: imgフォルダのパス、または ImageSource
+            （ZipImageSource を渡すとタスクファイルを展開せずに直接読み出して保存する）
+        progress_callback: 進捗を報告するコールバック関数 (current, total, message) -> None
+        filename_templates: ファイル名テンプレートの辞書
+            - template1: コメントあり + 画像取込XX形式
+            - template2: コメントあり + その他
+            - template3: コメントなし
+        cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+        copy_executor: コピーを実行するエグゼキュータ（copy_executorモジュール参照）
+            Noneの場合は copy_workers に応じて生成し、処理終了時に閉じる
+        copy_workers: コピーの並列数（Noneの場合はデフォルト値、1の場合は逐次コピー）
+        dry_run: Trueの場合は計画のみ作成し、コピーは行わない
+        name_registry: 出力フォルダのファイル名レジストリ（複数タスクで共有する場合に指定）
+        jpeg_quality: 指定した場合は元のBMPを1回だけ読み込み、JPEGに変換して直接保存する
+            （出力フォルダにBMPは作成されないため、後から convert_bmp_to_jpeg を呼ぶ必要はない）
+        use_metadata_index: Falseの場合は.txtファイルの解析結果のキャッシュを使用しない
+        metadata_index: 使用するキャッシュ（Noneの場合はアプリケーション共通のキャッシュ）
+        metadata_workers: .txtファイルの読み込み並列数（Noneの場合はデフォルト値、1の場合は逐次読み込み）
+        resume: Trueの場合はジャーナルに記録された完了済みのコピーをスキップする
+        sync: Trueの場合は追加・変更された画像だけをコピーする（変更された画像は前回のファイルを上書き）
+        write_journal: Falseの場合は完了したコピーをジャーナルに記録しない
+        task_scan: カメラ選択ダイアログで作成した scan_task の結果（plan_images参照）
+        output_listing: 出力フォルダの FolderListing（folder_listingモジュール参照）
+            name_registry を指定しない場合はこの列挙結果でファイル名の衝突を判定し、
+            完了したコピーを追加する（呼び出し元は出力フォルダを列挙し直さずに作成したファイルを確認できる）
+        telemetry: 解析・コピー・圧縮のバイト数と処理速度を記録する ExportTelemetry（export_telemetryモジュール参照）
+            ProgressChannel に同じものを渡すと進捗ダイアログに処理速度と残り時間を表示できる
+        report: 計画・コピーの処理時間と件数を記録する RunReport（run_reportモジュール参照）
+            バイト数は telemetry の計測値を呼び出し元で RunReport.add_telemetry に渡して記録する
+
+    Returns:
+        実行計画（キャンセルされた場合はNone）
+    """
+    source = as_image_source(folder_path)
+    if name_registry is None and output_listing is not None:
+        name_registry = NameRegistry.from_listing(output_listing)
+    source_stats = None
+
+    # 再開・差分同期の場合は、ジャーナルの記録と比較してコピーするものを決める
+    completed = None
+    overwrite = None
+    if resume or sync:
+        if name_registry is None:
+            name_registry = NameRegistry.from_folder(output_folder)
+        with report_span(report, "journal"):
+            source_stats = source.file_stats()
+            completed, changed = ExportJournal(output_folder).compare(
+                source.location, source_stats, jpeg_quality, name_registry)
+        if sync:
+            overwrite = changed
+            logger.info("差分同期: 変更なし %d件、変更あり %d件", len(completed), len(changed))
+        else:
+            logger.info("完了済みのコピー: %d件", len(completed))
+
+    with report_span(report, "plan"):
+        plan = plan_images(
+            source, output_folder, save_mode, save_cam,
+            preselected_cam_list=preselected_cam_list,
+            progress_callback=progress_callback,
+            filename_templates=filename_templates,
+            cancel_check=cancel_check,
+            name_registry=name_registry,
+            jpeg_quality=jpeg_quality,
+            use_metadata_index=use_metadata_index,
+            metadata_index=metadata_index,
+            metadata_workers=metadata_workers,
+            completed=completed,
+            overwrite=overwrite,
+            task_scan=task_scan,
+            telemetry=telemetry,
+            report=report,
+        )
+    if plan is None:
+        return None
+    if source_stats is not None:
+        plan.set_source_stats(source_stats)
+    if report is not None:
+        report.count("jobs", plan.file_count)
+        report.count("jobs_skipped", plan.skipped_count)
+
+    logger.info("コピー対象: %s", plan.summary())
+    if dry_run:
+        return plan
+
+    if progress_callback:
+        progress_callback(0, plan.file_count, f"コピー開始: {plan.summary()}")
+    journal = ExportJournal(output_folder) if write_journal else None
+    try:
+        with report_span(report, "copy"):
+            copied = execute_plan(plan, progress_callback=progress_callback, cancel_check=cancel_check,
+                                  copy_executor=copy_executor, copy_workers=copy_workers, journal=journal,
+                                  output_listing=output_listing, telemetry=telemetry)
+        if not copied:
+            return None
+    finally:
+        if journal is not None:
+            journal.close()
+    return plan
 
 # 外部ファイルから呼び出された場合の処理
 if __name__ == "__main__":
@@ -416,6 +759,7 @@ if __name__ == "__main__":
         output_folder = sys.argv[2]
         save_mode = sys.argv[3]
         save_cam = sys.argv[4]
+        setup_logging()
         process_images(folder_path, output_folder, save_mode, save_cam)
     else:
         print("引数が足りません。")
@@ -0,0 +1,136 @@
+"""
+タスクファイル（.ziq, .zit, .zii）をZIPアーカイブとして扱うモジュール
+
+アーカイブの中央ディレクトリ（メンバー一覧）からimgフォルダの位置を特定し、
+メンバーの一覧とサイズ・CRCを提供する。
+
+画像の保存ではアーカイブを展開せず、ZipImageSource（image_sourceモジュール参照）が
+計画に含まれる画像だけをアーカイブから直接読み出す。extract_all はタスクファイルの内容を
+フォルダとして取り出したい場合（utils.extract_task_file）にだけ使用する。
+"""
+import os
+import zipfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Constants
+
+CAMMASTER_LOG_NAME = "cammaster_seq.log"
+
+
+class TaskArchive:
+    """タスクファイルのメンバー一覧を保持し、imgフォルダのファイルを特定するクラス"""
+
+    def __init__(self, task_file_path: str):
+        """
+        初期化（中央ディレクトリを読み込んでimgフォルダの位置を特定する）
+
+        Args:
+            task_file_path: タスクファイルのパス
+        """
+        self.task_file_path = task_file_path
+        with zipfile.ZipFile(task_file_path, "r") as zip_ref:
+            infos = zip_ref.infolist()
+        # メンバー名の区切り文字を "/" に統一したもの -> ZipInfo
+        self._members: Dict[str, zipfile.ZipInfo] = {
+            info.filename.replace("\\", "/"): info for info in infos
+        }
+        self.img_prefix = self._find_img_prefix(self._members)
+
+    @staticmethod
+    def _find_img_prefix(member_names: Iterable[str]) -> Optional[str]:
+        # viscotech配下で最も浅い位置にあるimgフォルダを探す（従来のos.walkと同じく上位を優先）
+        candidates = set()
+        for name in member_names:
+            parts = name.split("/")
+            if not parts or parts[0] != Constants.VISCO_TECH_FOLDER:
+                continue
+            # 最後の要素はファイル名（ディレクトリエントリの場合は空文字）
+            for i, part in enumerate(parts[1:-1], 1):
+                if part == Constants.IMG_FOLDER:
+                    candidates.add("/".join(parts[:i + 1]) + "/")
+                    break
+        if not candidates:
+            return None
+        return min(candidates, key=lambda prefix: (prefix.count("/"), prefix))
+
+    @property
+    def log_member(self) -> Optional[str]:
+        """imgフォルダと同じ階層にある cammaster_seq.log のメンバー名"""
+        if self.img_prefix is None:
+            return None
+        name = self.img_prefix[:-len(Constants.IMG_FOLDER) - 1] + CAMMASTER_LOG_NAME
+        return name if name in self._members else None
+
+    def img_member_names(self, extension: Optional[str] = None) -> List[str]:
+        """
+        imgフォルダ直下のファイル名の一覧を返す
+
+        Args:
+            extension: 拡張子で絞り込む場合に指定（例: ".txt"）
+
+        Returns:
+            ファイル名（imgフォルダからの相対名）のリスト
+        """
+        if self.img_prefix is None:
+            return []
+        names = []
+        for member in self._members:
+            if not member.startswith(self.img_prefix):
+                continue
+            name = member[len(self.img_prefix):]
+            if not name or "/" in name:
+                continue
+            if extension is None or name.endswith(extension):
+                names.append(name)
+        return names
+
+    def member_info(self, member: str) -> Optional[zipfile.ZipInfo]:
+        """
+        メンバー名（区切り文字は "/"）に対応する ZipInfo を返す
+
+        Args:
+            member: メンバー名
+        """
+        return self._members.get(member)
+
+    def img_folder_path(self, output_folder: str) -> Optional[str]:
+        """
+        展開先でのimgフォルダのパスを返す
+
+        Args:
+            output_folder: 展開先フォルダ
+        """
+        if self.img_prefix is None:
+            return None
+        return os.path.join(output_folder, *self.img_prefix.rstrip("/").split("/"))
+
+    def file_stats(self, file_names: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        imgフォルダ内のファイルの展開後サイズとCRCを返す（中央ディレクトリの情報を使用）
+
+        Args:
+            file_names: ファイル名（imgフォルダからの相対名）のリスト
+
+        Returns:
+            ファイル名 -> (サイズ, CRC) の辞書
+        """
+        stats = {}
+        for name in file_names:
+            info = self._members.get(f"{self.img_prefix}{name}")
+            if info is not None:
+                stats[name] = (info.file_size, info.CRC)
+        return stats
+
+    def extract_all(self, output_folder: str) -> Optional[str]:
+        """
+        全てのメンバーを展開する
+
+        Args:
+            output_folder: 展開先フォルダ
+
+        Returns:
+            imgフォルダのパス（見つからない場合はNone）
+        """
+        with zipfile.ZipFile(self.task_file_path, "r") as zip_ref:
+            zip_ref.extractall(output_folder)
+        return self.img_folder_path(output_folder)
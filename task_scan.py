@@ -0,0 +1,41 @@
+"""
+タスクのimgフォルダを1回だけ調べた結果（TaskScan）を定義するモジュール
+
+カメラ選択ダイアログの表示に必要な情報（.txtファイル一覧、カメラ構成、対応関係、ツールコメント）を
+まとめて保持し、そのまま process_images に渡す。共有VTVなど遅い共有フォルダでも
+ダイアログの表示と保存処理でフォルダの列挙や最初の.txtファイルの読み込みを繰り返さない。
+
+TaskScan は save_task_images_CamNum_selection.scan_task で作成する。
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from image_source import ImageSource
+from metadata_parser import MetadataRecord
+
+CamDiv = Tuple[int, int]
+
+
+@dataclass
+class TaskScan:
+    """imgフォルダを調べた結果"""
+
+    source: ImageSource
+    file_list: List[str]                    # .txtファイル名の一覧
+    fingerprint: Optional[str] = None       # .txtファイル一覧のフィンガープリント
+    records: Optional[Dict[str, MetadataRecord]] = None  # 解析結果のキャッシュ（無い場合はNone）
+    first_record: Optional[MetadataRecord] = None        # 最初の.txtファイルの解析結果
+    cam_list: List[List[int]] = field(default_factory=list)          # 最初の.txtファイルのカメラ番号・DIV番号
+    adjusted_cam_list: List[List[int]] = field(default_factory=list)  # adjust_save_CAM_list 適用後
+    mapping_AB: Dict[CamDiv, CamDiv] = field(default_factory=dict)    # 変換後 -> 元 の対応関係
+    mapping_BA: Dict[CamDiv, CamDiv] = field(default_factory=dict)    # 元 -> 変換後 の対応関係
+    tool_comments: Optional[Dict[CamDiv, str]] = None  # cammaster_seq.log のツールコメント（ログが無い場合はNone）
+
+    @property
+    def camera_list(self) -> List[List[int]]:
+        """カメラ選択ダイアログに表示するカメラリスト（get_camera_list と同じ形式）"""
+        return self.adjusted_cam_list
+
+    def is_for(self, source: ImageSource) -> bool:
+        """指定した ImageSource と同じimgフォルダを調べた結果かどうか"""
+        return source is self.source or source.location == self.source.location
@@ -0,0 +1,80 @@
+import io
+import os
+import threading
+
+from PIL import Image
+
+from batch_export import BatchOptions, BatchTask, export_task, unique_tasks
+from export_scheduler import ExportScheduler
+from save_task_images_CamNum_selection import process_images
+
+FILE_COUNT = 5
+
+
+def _bmp_data():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (10, 20, 30)).save(buffer, "BMP")
+    return buffer.getvalue()
+
+
+def _make_img_folder(root):
+    img_folder = os.path.join(root, "img")
+    os.makedirs(img_folder)
+    with open(os.path.join(root, "cammaster_seq.log"), "w", encoding="utf-8") as f:
+        f.write("2024/01/01 00:00:00 (1, 1:0) : 画像取込, name = 画像取込01\n")
+    bmp = _bmp_data()
+    for index in range(FILE_COUNT):
+        name = f"1_1_2401010000{index:02d}.bmp"
+        with open(os.path.join(img_folder, name), "wb") as f:
+            f.write(bmp)
+        with open(os.path.join(img_folder, f"2401010000{index:02d}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Comment=\nLocked=0\nCAM1.DIV1=1\nFILE={name}\n")
+    return img_folder
+
+
+def _export(tmp_path, img_folder, **options):
+    options = BatchOptions(output_folder=str(tmp_path / "out"), copy_workers=1, **options)
+    task = BatchTask(name="task", img_folder=img_folder)
+    with ExportScheduler(max_workers=1) as scheduler:
+        return export_task(task, options, scheduler, threading.Event())
+
+
+def test_copied_counts_saved_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    result = _export(tmp_path, _make_img_folder(str(tmp_path)), jpeg_quality=85)
+    assert result.status == "ok"
+    assert result.copied == FILE_COUNT
+
+
+def test_copied_stops_at_failed_job(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    img_folder = _make_img_folder(str(tmp_path))
+    # 計画の最後のジョブの画像のヘッダーを壊す（JPEGへの変換時にエラーになる）
+    plan = process_images(img_folder, str(tmp_path / "plan"), "0", "0", dry_run=True)
+    broken = os.path.join(img_folder, plan.jobs[-1].source_name)
+    with open(broken, "r+b") as f:
+        f.write(b"XX")
+    result = _export(tmp_path, img_folder, jpeg_quality=85)
+    assert result.status == "error"
+    # 計画は5件、保存できたのは最後のジョブ以外の4件
+    saved = [name for name in os.listdir(result.output_folder) if name.endswith(".jpg")]
+    assert result.copied == len(saved) == FILE_COUNT - 1
+
+
+def test_dry_run_reports_planned_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    result = _export(tmp_path, _make_img_folder(str(tmp_path)), dry_run=True)
+    assert result.status == "dry-run"
+    assert result.copied == FILE_COUNT
+    assert not os.listdir(result.output_folder)
+
+
+def test_unique_tasks_merges_locations_and_renames(tmp_path):
+    tasks = unique_tasks([
+        BatchTask(name="t", task_file=str(tmp_path / "a" / "t.ziq")),
+        BatchTask(name="t", task_file=str(tmp_path / "b" / "t.ziq")),
+        BatchTask(name="T_2", task_file=str(tmp_path / "a" / "T_2.ziq")),
+        BatchTask(name="t", task_file=str(tmp_path / "a" / ".." / "a" / "t.ziq"), priority=5),
+    ])
+    assert [task.name for task in tasks] == ["t", "t_3", "T_2"]
+    assert tasks[0].priority == 5
@@ -0,0 +1,58 @@
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from image_source import ZipImageSource
+
+MEMBER_COUNT = 200
+READS_PER_MEMBER = 5
+THREADS = 8
+
+
+def _member_data(index):
+    return bytes([index % 251]) * (4096 + index)
+
+
+def _make_task_file(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("viscotech/task/g01/01/cammaster_seq.log", "log\n")
+        for index in range(MEMBER_COUNT):
+            archive.writestr(f"viscotech/task/g01/01/img/{index:04d}.bmp", _member_data(index))
+    return str(path)
+
+
+def test_concurrent_reads_from_many_threads(tmp_path):
+    task_file = _make_task_file(tmp_path / "task.ziq")
+    start = threading.Barrier(THREADS)
+
+    def read(index):
+        if index < THREADS:
+            # 最初のメンバーは全スレッドが同時に開く
+            start.wait()
+        with source.copy_source(f"{index % MEMBER_COUNT:04d}.bmp")() as stream:
+            return index, stream.read()
+
+    # スレッドの切り替えを頻繁にし、メンバーを開く・閉じる処理が重なるようにする
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ZipImageSource(task_file) as source:
+            with ThreadPoolExecutor(max_workers=THREADS) as pool:
+                results = list(pool.map(read, range(MEMBER_COUNT * READS_PER_MEMBER)))
+            with source.open_log() as log:
+                assert log.read() == "log\n"
+    finally:
+        sys.setswitchinterval(interval)
+    for index, data in results:
+        assert data == _member_data(index % MEMBER_COUNT)
+
+
+def test_reads_after_close_reopen(tmp_path):
+    source = ZipImageSource(_make_task_file(tmp_path / "task.ziq"))
+    with source.open_binary("0001.bmp") as stream:
+        assert stream.read() == _member_data(1)
+    source.close()
+    with source.open_binary("0002.bmp") as stream:
+        assert stream.read() == _member_data(2)
+    source.close()
@@ -1,12 +1,17 @@
 """
 ユーティリティ関数を定義するモジュール
 """
+import logging
 import os
-import shutil
-import zipfile
 from pathlib import Path
-from typing import Optional
-from PIL import Image
+from typing import Callable, Optional
+
+from folder_listing import FolderListing
+from jpeg_encoder import convert_files
+from run_report import RunReport, report_span
+from task_archive import TaskArchive
+
+logger = logging.getLogger(__name__)
 
 
 def format_value(value: str) -> str:
@@ -25,52 +30,69 @@ def format_value(value: str) -> str:
         return value
 
 
-def convert_bmp_to_jpeg(folder: str, quality: int = 85) -> None:
+def convert_bmp_to_jpeg(folder: str, quality: int = 85,
+                        progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                        cancel_check: Optional[Callable[[], bool]] = None,
+                        listing: Optional[FolderListing] = None,
+                        report: Optional[RunReport] = None) -> None:
     """
     指定フォルダ内のBMPファイルをJPEGに変換し、元のBMPファイルを削除する関数。
     
     Args:
         folder: BMPファイルが含まれるフォルダのパス（出力フォルダと同じ）
         quality: JPEG保存時の圧縮率（1～100）。デフォルトは85。
+        progress_callback: 進捗を報告するコールバック関数 (current, total, message) -> None
+        cancel_check: キャンセル状態をチェックするコールバック関数 () -> bool
+        listing: 出力フォルダの列挙結果（指定した場合はフォルダを列挙せずに使用し、変換結果を反映する）
+        report: 変換時間と変換したファイル数を記録する RunReport
     """
     folder_path = Path(folder)
     
     # フォルダが存在しない場合は何もしない
     if not folder_path.exists():
-        print(f"フォルダ '{folder}' が存在しません。変換をスキップします。")
+        logger.warning("フォルダ '%s' が存在しません。変換をスキップします。", folder)
         return
     
-    converted_count = 0
-    error_count = 0
-    
-    # フォルダ内のすべてのファイルをチェック
-    for bmp_file in folder_path.glob("*.bmp"):
-        try:
-            jpg_file = bmp_file.with_suffix(".jpg")
-            
-            # 画像を開いてJPEGに変換
-            with Image.open(bmp_file) as img:
-                img = img.convert("RGB")  # JPEGはRGBモードをサポート
-                img.save(jpg_file, "JPEG", quality=quality)
-            
-            # 元のBMPファイルを削除
-            bmp_file.unlink()
-            print(f"変換完了: {bmp_file.name} -> {jpg_file.name} (品質={quality})")
-            converted_count += 1
-            
-        except Exception as e:
-            print(f"変換エラー ({bmp_file.name}): {e}")
-            error_count += 1
+    # フォルダ内のすべてのBMPファイルを変換
+    if listing is None:
+        listing = FolderListing.scan(folder, with_stats=False)
+    # 従来の glob("*.bmp") と同じく、Windowsでは拡張子の大文字・小文字を区別せず、"."で始まるファイルは除く
+    bmp_files = [os.path.join(folder, entry.name) for entry in listing.files()
+                 if os.path.normcase(entry.name).endswith(".bmp") and not entry.name.startswith(".")]
+    with report_span(report, "convert"):
+        converted, errors, cancelled = convert_files(
+            bmp_files, quality,
+            progress_callback=progress_callback,
+            cancel_check=cancel_check,
+        )
+    for bmp_file in converted:
+        name = os.path.basename(bmp_file)
+        listing.discard(name)
+        listing.add(os.path.splitext(name)[0] + ".jpg")
+    converted_count = len(converted)
+    error_count = len(errors)
+    if report is not None:
+        report.count("jpegs_encoded", converted_count)
+        report.count("convert_errors", error_count)
     
+    if cancelled:
+        logger.info("圧縮処理がキャンセルされました")
+        if progress_callback:
+            progress_callback(converted_count + error_count, len(bmp_files), "キャンセルされました")
+    elif progress_callback:
+        progress_callback(len(bmp_files), len(bmp_files), "圧縮完了")
     if converted_count > 0:
-        print(f"変換完了: {converted_count}個のファイルを変換しました。")
+        logger.info("変換完了: %d個のファイルを変換しました。(品質=%d)", converted_count, quality)
     if error_count > 0:
-        print(f"警告: {error_count}個のファイルでエラーが発生しました。")
+        logger.warning("%d個のファイルでエラーが発生しました。", error_count)
 
 
 def extract_task_file(task_file_path: str, output_folder: str) -> Optional[str]:
     """
     タスクファイル（.ziq, .zit, .zii）を解凍し、imgフォルダのパスを返す
+
+    タスクファイルはZIP形式のため、出力フォルダへのコピーや.zipへの名前変更は行わず、
+    元の場所のまま開いて展開する。
     
     Args:
         task_file_path: タスクファイルのパス
@@ -80,35 +102,12 @@ def extract_task_file(task_file_path: str, output_folder: str) -> Optional[str]:
         imgフォルダのパス（見つからない場合はNone）
     """
     try:
-        output_path = Path(output_folder)
-        
-        # ファイルを指定されたフォルダにコピー
-        copied_file_path = shutil.copy2(task_file_path, output_folder)
-        
-        # コピーしたファイルのパスを.zipに変更
-        zip_file_path = Path(copied_file_path).with_suffix(".zip")
-        Path(copied_file_path).rename(zip_file_path)
-        
-        # .zipファイルを解凍
-        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
-            zip_ref.extractall(output_folder)
-        
-        # 解凍が完了したら元の.zipファイルを削除
-        zip_file_path.unlink()
-        
-        # viscotechフォルダのパスを取得
-        viscotech_folder_path = output_path / "viscotech"
-        
-        # imgフォルダのパスを再帰的に検索
-        for walk_root, dirs, files in os.walk(viscotech_folder_path):
-            if "img" in dirs:
-                img_folder_path = Path(walk_root) / "img"
-                return str(img_folder_path)
-        
-        return None
+        # タスクファイルをZIPとして直接開いて解凍（zipfileは拡張子を問わない）
+        # imgフォルダの位置は展開後に探索せず、アーカイブのメンバー名から特定する
+        return TaskArchive(task_file_path).extract_all(output_folder)
         
     except Exception as e:
-        print(f"タスクファイルの解凍エラー: {e}")
+        logger.error("タスクファイルの解凍エラー: %s", e)
         raise
 
 